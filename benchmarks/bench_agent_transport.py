@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+远程代理传输基准测试
+对比PTY逐行文本传输与tail_agent.py压缩帧传输的线上字节数和本地解码吞吐；
+另外验证文件tail在读到第一行之前断线，重连后从原起点继续而不是跳到新的末尾
+"""
+
+import io
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.line_reader import ChannelFrameReader, ChannelLineReader  # noqa: E402
+from src.remote_tail import FileTail  # noqa: E402
+from src.tail_agent import encode_frame  # noqa: E402
+
+PROBES = ["FlowHandlePacket", "DetectRun", "AppLayerParse", "StreamTcpPacket"]
+
+
+class FakeChannel:
+    """模拟paramiko通道，recv每次最多返回nbytes字节"""
+
+    def __init__(self, data):
+        self.stream = io.BytesIO(data)
+
+    def recv(self, nbytes):
+        return self.stream.read(nbytes)
+
+
+def make_lines(count):
+    """生成重复度较高的dtraceattach风格输出"""
+    rng = random.Random(7)
+    return [
+        f"[{rng.randint(1000, 1100)}] probe=uprobe func={rng.choice(PROBES)} "
+        f"latency_ns={rng.randint(200, 90000)} tid=3372788 comm=Suricata-Main"
+        for _ in range(count)
+    ]
+
+
+def pty_path(lines):
+    """原方式：PTY把换行转成\\r\\n，逐行文本传输"""
+    data = "".join(line + "\r\n" for line in lines).encode("utf-8")
+    start = time.perf_counter()
+    reader = ChannelLineReader(FakeChannel(data))
+    received = sum(len(batch) for batch in reader.iter_batches())
+    return len(data), received, 0.0, time.perf_counter() - start
+
+
+def agent_path(lines, batch_size=500):
+    """代理方式：每batch_size行压缩为一帧"""
+    start = time.perf_counter()
+    encoded = [line.encode("utf-8") for line in lines]
+    data = b"".join(
+        encode_frame(encoded[i : i + batch_size])
+        for i in range(0, len(encoded), batch_size)
+    )
+    encode_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    reader = ChannelFrameReader(FakeChannel(data))
+    received = sum(len(batch) for batch in reader.iter_batches())
+    return len(data), received, encode_time, time.perf_counter() - start
+
+
+class FakeSSH:
+    """模拟stat命令，返回远程文件当前的inode与大小"""
+
+    def __init__(self, inode, size):
+        self.inode = inode
+        self.size = size
+
+    def execute_command(self, command):
+        return {"success": True, "stdout": f"{self.inode} {self.size}\n", "stderr": ""}
+
+
+def check_resume_before_first_line():
+    """首次启动后尚未读到任何行就断线，期间文件增长了500字节"""
+    ssh = FakeSSH(inode=42, size=1000)
+    tail = FileTail("/var/log/suricata.log")
+    first = tail.build_command(ssh)
+    position = tail.position()
+    ssh.size = 1500
+    restart = tail.build_command(ssh)
+    # 重读的是起点前的换行符，应被去重；之后的行从起点开始交付
+    delivered = tail.process(["0:", "1:第一行"])
+    return first.split(" -f ")[0], restart.split(" -f ")[0], position, delivered
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    lines = make_lines(count)
+    print(f"样本: {count} 行")
+    print(
+        f"{'方式':<6} {'线上字节':>12} {'行数':>8} {'远端编码(秒)':>12} {'本地解码(秒)':>12}"
+    )
+    for name, func in (("PTY", pty_path), ("代理", agent_path)):
+        wire, received, encode_time, decode_time = func(lines)
+        print(
+            f"{name:<6} {wire:>12} {received:>8} {encode_time:>12.3f} {decode_time:>12.3f}"
+            f"  ({received / decode_time:,.0f} 行/秒)"
+        )
+
+    first, restart, position, delivered = check_resume_before_first_line()
+    print(f"读到第一行前断线: 首次 {first}, 重连 {restart}, 检查点 {position}")
+    print(f"重连后交付: {delivered}")
+
+
+if __name__ == "__main__":
+    main()
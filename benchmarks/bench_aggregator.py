@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+流式聚合基准测试
+对比dtraceattach输出逐行落盘与流式聚合（按探针计数+log2延迟直方图，抽样1%原始行）
+的处理速度与输出字节数，并检查汇总中的总数与输入一致
+"""
+
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.aggregator import StreamAggregator  # noqa: E402
+from src.log_parser import to_ndjson  # noqa: E402
+
+LINES = 500_000
+PROBES = ["flow_handle", "stream_reassemble", "detect", "output_log", "decode"]
+
+
+def make_lines():
+    random.seed(1)
+    return [
+        f"[4242] {1000 + i / 1000:.6f}: func={random.choice(PROBES)} "
+        f"latency={int(random.lognormvariate(8, 1.5))} tid={i % 8}"
+        for i in range(LINES)
+    ]
+
+
+def main():
+    lines = make_lines()
+    raw_bytes = sum(len(line.encode("utf-8")) + 1 for line in lines)
+
+    aggregator = StreamAggregator(interval=1, window=10, sample=0.01)
+    started = time.perf_counter()
+    kept = []
+    summaries = []
+    for i in range(0, LINES, 1000):
+        kept += aggregator.process(lines[i : i + 1000])
+        # 按批次模拟时间推进，每5万行输出一次汇总
+        if (i + 1000) % 50_000 == 0:
+            summaries.append(aggregator.summary(force=True))
+    elapsed = time.perf_counter() - started
+
+    output_bytes = sum(len(line.encode("utf-8")) + 1 for line in kept)
+    output_bytes += sum(len(to_ndjson(summary)) + 1 for summary in summaries)
+    totals = sum(aggregator.get_stats()["totals"].values())
+
+    print(f"输入: {LINES} 行, {raw_bytes / 1024 / 1024:.1f} MB")
+    print(f"聚合: {LINES / elapsed:,.0f} 行/秒, 每行 {elapsed / LINES * 1e6:.2f} µs")
+    print(
+        f"输出: {len(kept)} 行抽样 + {len(summaries)} 条汇总, "
+        f"{output_bytes / 1024:.1f} KB ({output_bytes / raw_bytes:.2%})"
+    )
+    print(f"总数精确: {'是' if totals == LINES else '否'} ({totals})")
+    latest = summaries[-1]["probes"]["detect"]["window_latency"]
+    print(f"detect 最近窗口延迟: {latest}")
+
+
+if __name__ == "__main__":
+    main()
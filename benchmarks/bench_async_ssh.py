@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+异步SSH接口基准测试
+模拟SSE推送节拍，对比规则操作直接调用阻塞接口与调用异步接口时的事件循环延迟
+"""
+
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.ssh_manager import SSHManager  # noqa: E402
+
+TICK = 0.01  # SSE推送间隔
+OPERATION_DELAY = 0.2  # 模拟一次规则读写的远程耗时
+
+
+def make_manager():
+    """构造不连接远程主机的SSHManager，读写操作以sleep模拟"""
+    ssh = SSHManager("127.0.0.1", 22, "root", "box")
+
+    def read_file(file_path, handle=None):
+        time.sleep(OPERATION_DELAY)
+        return "alert tcp any any -> any any (sid:1;)"
+
+    ssh.read_file = read_file
+    return ssh
+
+
+async def sse_ticker(lags, stop):
+    """每TICK秒醒来一次，记录实际醒来时间相对预期的延迟"""
+    while not stop.is_set():
+        expected = time.perf_counter() + TICK
+        await asyncio.sleep(TICK)
+        lags.append(time.perf_counter() - expected)
+
+
+async def run(name, operation):
+    lags = []
+    stop = asyncio.Event()
+    ticker = asyncio.create_task(sse_ticker(lags, stop))
+    await asyncio.sleep(0.1)
+    for _ in range(5):
+        await operation()
+    stop.set()
+    await ticker
+    lags_ms = sorted(lag * 1000 for lag in lags)
+    p99 = lags_ms[min(len(lags_ms) - 1, int(len(lags_ms) * 0.99))]
+    median = statistics.median(lags_ms)
+    print(
+        f"{name:<8} 节拍 {len(lags_ms):>4}  中位延迟 {median:7.2f} ms"
+        f"  p99 {p99:8.2f} ms  最大 {lags_ms[-1]:8.2f} ms"
+    )
+
+
+async def main():
+    ssh = make_manager()
+
+    async def blocking():
+        ssh.read_file("/data/su7/rules/suricata.rules")
+
+    async def non_blocking():
+        await ssh.aread_file("/data/su7/rules/suricata.rules")
+
+    await run("阻塞调用", blocking)
+    await run("异步调用", non_blocking)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+SSE广播基准测试
+以1、100、500个订阅者测量每个事件的发布+消费开销，检查每个订阅者都收到全部事件（含每个事件一次的SSE编码）；
+另外加入一个处理很慢的订阅者，检查其被丢弃/断开时不影响其他订阅者
+"""
+
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.broadcast import DISCONNECT, BroadcastHub  # noqa: E402
+from src.line_queue import DROP_OLDEST  # noqa: E402
+
+EVENTS = 5000
+BURST = 50  # 每次事件循环迭代发布的事件数（对应一批收集结果）
+
+
+async def consume(subscriber, counts, delay=0.0):
+    while True:
+        event = await subscriber.get()
+        if event is None:
+            return
+        if b'"type": "gap"' not in event:
+            counts[subscriber.id] = counts.get(subscriber.id, 0) + 1
+        if delay:
+            await asyncio.sleep(delay)
+
+
+async def run(count, policy, slow=False):
+    hub = BroadcastHub(maxsize=1000, policy=policy)
+    counts = {}
+    tasks = [
+        asyncio.create_task(consume(hub.subscribe(), counts)) for _ in range(count)
+    ]
+    if slow:
+        slow_subscriber = hub.subscribe()
+        tasks.append(asyncio.create_task(consume(slow_subscriber, counts, 0.01)))
+    await asyncio.sleep(0)
+
+    event = {
+        "timestamp": "2026-10-16T10:00:00",
+        "content": "当前流",
+        "type": "suricata",
+    }
+    started = time.perf_counter()
+    for i in range(0, EVENTS, BURST):
+        hub.publish_many([event] * BURST)
+        await asyncio.sleep(0)
+    # 等待快速订阅者取完
+    while any(
+        s.items for s in hub.subscribers.values() if not (slow and s is slow_subscriber)
+    ):
+        await asyncio.sleep(0)
+    elapsed = time.perf_counter() - started
+
+    stats = hub.get_stats()
+    for subscriber in list(hub.subscribers.values()):
+        hub.unsubscribe(subscriber)
+    await asyncio.gather(*tasks)
+
+    fast = [counts.get(i, 0) for i in range(1, count + 1)]
+    complete = all(n == EVENTS for n in fast)
+    print(
+        f"订阅者 {count:>3}{' +慢' if slow else '   '} {policy:<11}"
+        f"  每事件 {elapsed / EVENTS * 1e6:8.1f} µs"
+        f"  ({elapsed / EVENTS / (count + slow) * 1e6:5.2f} µs/订阅者)"
+        f"  快订阅者收全: {'是' if complete else '否'}"
+        f"  丢弃 {stats['dropped']:>5}  断开 {stats['disconnected']}"
+    )
+
+
+async def main():
+    print(f"{EVENTS} 个事件，每批 {BURST} 个")
+    for count in (1, 100, 500):
+        await run(count, DROP_OLDEST)
+    await run(100, DROP_OLDEST, slow=True)
+    await run(100, DISCONNECT, slow=True)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+富化流水线基准测试
+以NDJSON输出（正则解析+序列化）处理Suricata行，比较不同进程数下的吞吐，
+并检查每个日志源的输出顺序与提交顺序一致
+"""
+
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.enrich import OUTPUT_NDJSON, EnrichPipeline, enrich_lines  # noqa: E402
+
+BATCHES = 400
+BATCH_SIZE = 1000
+SOURCES = ("suricata", "suricata2")
+
+
+def make_batch(source, index):
+    return [
+        f"[1234 - W#01] 2026-10-16 10:00:00 Info: flow: 当前流: "
+        f"192.168.1.{i % 250}:443 -> 10.0.0.8:{51234 + i} seq={index * BATCH_SIZE + i} "
+        f"pkts={i % 97} bytes={i * 13} app=tls"
+        for i in range(BATCH_SIZE)
+    ]
+
+
+def run(workers):
+    pipeline = EnrichPipeline(workers)
+    batches = [make_batch(SOURCES[i % 2], i) for i in range(BATCHES)]
+    received = {source: [] for source in SOURCES}
+
+    # 预热进程池（spawn启动子进程的时间不计入）
+    if workers:
+        list(pipeline.pool.map(abs, range(workers * 2)))
+
+    started = time.perf_counter()
+    for i, batch in enumerate(batches):
+        source = SOURCES[i % 2]
+        pipeline.submit(
+            source,
+            enrich_lines,
+            (
+                source,
+                batch,
+                "2026-10-16 10:00:00.000",
+                OUTPUT_NDJSON,
+                source,
+                "suricata",
+            ),
+            lambda entries, source=source, i=i: received[source].append(i),
+        )
+    pipeline.close()
+    elapsed = time.perf_counter() - started
+
+    ordered = all(order == sorted(order) for order in received.values())
+    total = sum(len(order) for order in received.values())
+    stats = pipeline.get_stats()
+    print(
+        f"进程数 {workers:>2}: {BATCHES * BATCH_SIZE / elapsed:>10,.0f} 行/秒"
+        f"  进程池 {stats['pooled']:>3} 批, 本线程 {stats['inline']:>3} 批"
+        f"  交付 {total} 批, 顺序{'正确' if ordered else '错误'}"
+    )
+
+
+def main():
+    print(f"CPU数: {os.cpu_count()}, {BATCHES} 批 x {BATCH_SIZE} 行")
+    for workers in (0, 1, 2, 4, 8):
+        if workers <= (os.cpu_count() or 1) * 2:
+            run(workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地文件tail基准测试
+向日志文件一次写入大量数据（突发）后通知tail任务，比较：
+- 一次读到末尾：文本方式读取全部新增内容后切分（旧的读取方式）
+- 分块读取：二进制按块读取，每次唤醒有读取上限（FileTailer）
+统计事件循环的最大停顿（另一个任务每毫秒计时）和读取期间的内存峰值；
+另外验证写到一半的行不会被拆成两条，以及轮转前写入、尚未读取的行不会丢失
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import aiofiles  # noqa: E402
+
+from src.file_tailer import FileTailer  # noqa: E402
+from src.log_parser import read_entry  # noqa: E402
+
+BURST_BYTES = 64 * 1024 * 1024
+LINE = "[**] [2026-10-16 10:00:00.123] Suricata: 当前流: 192.168.1.10:443 -> 10.0.0.8:51234\n"
+
+
+def write_burst(path):
+    line = LINE.encode("utf-8")
+    count = BURST_BYTES // len(line)
+    with open(path, "ab") as f:
+        for _ in range(count // 1000):
+            f.write(line * 1000)
+    return count // 1000 * 1000
+
+
+async def measure(read):
+    """运行read()，返回(耗时, 事件循环最大停顿, 内存峰值)"""
+    stalls = []
+    done = False
+
+    async def ticker():
+        last = time.perf_counter()
+        while not done:
+            await asyncio.sleep(0.001)
+            now = time.perf_counter()
+            stalls.append(now - last)
+            last = now
+
+    tick = asyncio.create_task(ticker())
+    await asyncio.sleep(0.01)
+    tracemalloc.start()
+    start = time.perf_counter()
+    await read()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    done = True
+    await tick
+    return elapsed, max(stalls), peak
+
+
+async def read_to_end(path, counter):
+    """旧方式：文本读取全部新增内容"""
+    async with aiofiles.open(path, "r", encoding="utf-8") as f:
+        content = await f.read()
+    entries = [read_entry(line.strip(), "suricata") for line in content.split("\n")]
+    counter["lines"] += sum(1 for line in entries if line["content"])
+
+
+async def read_chunked(tailer, path, counter, received):
+    tailer.notify(path)
+    await received.wait()
+    tailer.stop()
+
+
+async def check_partial_line(path):
+    lines = []
+    open(path, "w").close()
+    tailer = FileTailer({path: "suricata"}, lambda entries: lines.extend(entries))
+    tailer.start()
+    data = "前半行 abc 后半行\n".encode("utf-8")
+    # 在多字节字符中间切开
+    with open(path, "ab") as f:
+        f.write(data[:4])
+    tailer.notify(path)
+    await asyncio.sleep(0.05)
+    with open(path, "ab") as f:
+        f.write(data[4:])
+    tailer.notify(path)
+    await asyncio.sleep(0.05)
+    tailer.stop()
+    return [entry["content"] for entry in lines]
+
+
+async def check_rotation(path):
+    """写入、轮转（重命名后新建）、再写入，期间不读取，最后只通知一次"""
+    lines = []
+    open(path, "w").close()
+    tailer = FileTailer({path: "suricata"}, lambda entries: lines.extend(entries))
+    tailer.start()
+    with open(path, "ab") as f:
+        f.write("轮转前第一行\n轮转前第二行\n".encode("utf-8"))
+    os.rename(path, path + ".1")
+    with open(path, "ab") as f:
+        f.write("轮转后第一行\n".encode("utf-8"))
+    tailer.notify(path)
+    await asyncio.sleep(0.05)
+    tailer.stop()
+    return [entry["content"] for entry in lines]
+
+
+async def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "suricata.log")
+
+        open(path, "w").close()
+        expected = write_burst(path)
+        print(f"突发写入: {os.path.getsize(path) / 1e6:.1f} MB, {expected} 行")
+
+        counter = {"lines": 0}
+        elapsed, stall, peak = await measure(lambda: read_to_end(path, counter))
+        print(
+            f"一次读到末尾: {elapsed:.2f} s, 事件循环最大停顿 {stall * 1000:.0f} ms, "
+            f"内存峰值 {peak / 1e6:.1f} MB, {counter['lines']} 行"
+        )
+
+        # tail任务从空文件开始跟随，突发写入完成后只通知一次
+        counter = {"lines": 0}
+        received = asyncio.Event()
+
+        def publish(entries):
+            counter["lines"] += len(entries)
+            if counter["lines"] >= expected:
+                received.set()
+
+        open(path, "w").close()
+        tailer = FileTailer({path: "suricata"}, publish)
+        tailer.start()
+        write_burst(path)
+        elapsed, stall, peak = await measure(
+            lambda: read_chunked(tailer, path, counter, received)
+        )
+        stats = tailer.get_stats()["files"][os.path.abspath(path)]
+        print(
+            f"分块读取:     {elapsed:.2f} s, 事件循环最大停顿 {stall * 1000:.0f} ms, "
+            f"内存峰值 {peak / 1e6:.1f} MB, {counter['lines']} 行 "
+            f"(读取 {stats['reads']} 次, 分 {stats['deferred'] + 1} 轮)"
+        )
+
+        print(f"半行写入: {await check_partial_line(path)}")
+        print(f"写入-轮转-写入: {await check_rotation(path)}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+时间索引基准测试
+生成一个带索引的收集文件（模拟数小时的日志），对比全文件扫描与索引定位
+查询"最近5分钟"和任意时间区间的耗时
+"""
+
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.log_index import INDEX_ENTRY, LogIndex, index_path  # noqa: E402
+from src.log_parser import collected_time  # noqa: E402
+from src.timestamp import format_timestamp  # noqa: E402
+
+LINE = "16/10/2026 -- 10:00:00 - <Info> - 当前流: 192.168.1.10:443 -> 10.0.0.8:51234"
+
+
+def build(path, lines, rate):
+    """按每秒rate行生成收集文件和索引（与BatchWriter写入的格式一致）"""
+    start = time.time() - lines / rate
+    offset = 0
+    last_index = 0.0
+    with open(path, "wb") as f, open(index_path(path), "wb") as idx:
+        chunk = []
+        for i in range(lines):
+            now = start + i / rate
+            if now - last_index >= 1.0:
+                f.write(b"".join(chunk))
+                chunk = []
+                idx.write(INDEX_ENTRY.pack(int(now * 1000), offset))
+                last_index = now
+            data = f"[**] [{format_timestamp(now)}] Suricata: {LINE}\n".encode()
+            chunk.append(data)
+            offset += len(data)
+        f.write(b"".join(chunk))
+    return start
+
+
+def scan(path, start, end):
+    """无索引时的做法：从头读取整个文件并按时间过滤"""
+    low, high = format_timestamp(start), format_timestamp(end)
+    result = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            ts = collected_time(line)
+            if ts and low <= ts <= high:
+                result.append(line)
+    return result
+
+
+def run(name, func):
+    begin = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - begin
+    print(f"{name:<24} {len(result):>8} 行  {elapsed * 1000:10.2f} ms")
+
+
+def main():
+    lines = int(sys.argv[1]) if len(sys.argv) > 1 else 2000000
+    rate = 200
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "suricata_logs.log"
+        start = build(path, lines, rate)
+        now = time.time()
+        size = path.stat().st_size
+        print(
+            f"文件: {lines} 行, {size / 1024 / 1024:.1f} MB, "
+            f"索引 {index_path(path).stat().st_size} 字节"
+        )
+
+        index = LogIndex(path)
+        middle = start + (now - start) / 2
+        run("扫描 最近5分钟", lambda: scan(path, now - 300, now))
+        run("索引 最近5分钟", lambda: index.read_range(now - 300, now))
+        run("扫描 中间1分钟", lambda: scan(path, middle, middle + 60))
+        run("索引 中间1分钟", lambda: index.read_range(middle, middle + 60))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+行读取器基准测试
+对比原先逐字符读取 (stdout.read(1)) 与按块读取 (ChannelLineReader) 的吞吐
+"""
+
+import io
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.line_reader import ChannelLineReader  # noqa: E402
+
+
+SAMPLE_LINE = (
+    "[3372788] 16/10/2026 -- 10:00:00 - <Info> - 当前流: 192.168.1.10:443 -> "
+    "10.0.0.8:51234 proto=TCP app=tls pkts=42 bytes=38211\r\n"
+)
+
+
+class FakeChannel:
+    """模拟paramiko通道，recv每次最多返回nbytes字节"""
+
+    def __init__(self, data):
+        self.stream = io.BytesIO(data)
+
+    def recv(self, nbytes):
+        return self.stream.read(nbytes)
+
+
+def legacy_read(data):
+    """原tail_worker的逐字符读取方式"""
+    stdout = io.BytesIO(data)
+    count = 0
+    line = ""
+    while True:
+        char = stdout.read(1)
+        if not char:
+            break
+        char = char.decode("utf-8", errors="ignore")
+        if char == "\n":
+            if line.strip():
+                count += 1
+            line = ""
+        else:
+            line += char
+    return count
+
+
+def chunked_read(data):
+    """ChannelLineReader按块读取"""
+    reader = ChannelLineReader(FakeChannel(data))
+    count = 0
+    for lines in reader.iter_batches():
+        count += len(lines)
+    return count
+
+
+def run(name, func, data):
+    start = time.perf_counter()
+    lines = func(data)
+    elapsed = time.perf_counter() - start
+    print(
+        f"{name:<10} {lines:>8} 行  {elapsed:8.3f} 秒  "
+        f"{lines / elapsed:>12.0f} 行/秒  {len(data) / elapsed / 1024 / 1024:>8.2f} MB/秒"
+    )
+
+
+def main():
+    line_count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    data = SAMPLE_LINE.encode("utf-8") * line_count
+    print(f"样本: {line_count} 行, {len(data) / 1024 / 1024:.2f} MB")
+    run("逐字符", legacy_read, data)
+    run("按块", chunked_read, data)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+日志解析基准测试
+测量收集阶段解析并编码为NDJSON的吞吐，与纯文本格式化对比
+"""
+
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.log_parser import parse_line, to_ndjson  # noqa: E402
+from src.timestamp import format_timestamp  # noqa: E402
+
+SURICATA_LINES = [
+    "[3372788] 16/10/2026 -- 10:00:00 - (flow-manager.c:812) <Info> (FlowManager) "
+    f"-- 当前流: 192.168.1.{i % 250}:443 -> 10.0.0.8:{50000 + i % 1000} "
+    f"proto=TCP pkts={i % 97} bytes={i * 13}"
+    for i in range(1000)
+]
+DTRACE_LINES = [
+    f"[3372788] {1000 + i * 0.001:.6f}: FlowHandlePacket: tid={i % 8} "
+    f"latency_ns={i * 37 % 100000}"
+    for i in range(1000)
+]
+
+
+def text(source, lines, count):
+    for i in range(count):
+        f"[**] [{format_timestamp()}] {source}: {lines[i % len(lines)]}"
+
+
+def parse_only(source, lines, count):
+    collected = format_timestamp()
+    for i in range(count):
+        parse_line(source, lines[i % len(lines)], collected)
+
+
+def ndjson(source, lines, count):
+    collected = format_timestamp()
+    for i in range(count):
+        to_ndjson(parse_line(source, lines[i % len(lines)], collected))
+
+
+def run(name, func, source, lines, count):
+    start = time.perf_counter()
+    func(source, lines, count)
+    elapsed = time.perf_counter() - start
+    print(
+        f"{name:<20} {count / elapsed:>12,.0f} 行/秒  {elapsed / count * 1e6:6.2f} µs/行"
+    )
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    print(f"样本: {count} 行")
+    for source, lines in (("suricata", SURICATA_LINES), ("dtrace", DTRACE_LINES)):
+        run(f"{source} 文本", text, source, lines, count)
+        run(f"{source} 解析", parse_only, source, lines, count)
+        run(f"{source} 解析+NDJSON", ndjson, source, lines, count)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+端到端延迟基准测试
+对比两种收集器模式下，一行日志从收集回调到被SSE消费者取出的延迟：
+- 文件模式：BatchWriter写文件 -> 文件变化通知 -> 读取新增内容 -> 推送
+- 进程内模式：收集回调直接推送，文件只作归档
+文件变化通知优先使用watchdog，未安装时以10ms轮询代替
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.batch_writer import BatchWriter  # noqa: E402
+from src.log_parser import read_entry  # noqa: E402
+from src.timestamp import format_timestamp  # noqa: E402
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:
+    Observer = None
+
+LINE = "16/10/2026 -- 10:00:00 - <Info> - 当前流: 192.168.1.10:443 -> 10.0.0.8:51234"
+
+
+class FileFollower:
+    """模拟服务端的文件监控：发现变化后读取新增内容并推送"""
+
+    def __init__(self, path, publish):
+        self.path = path
+        self.publish = publish
+        self.offset = 0
+        self.lock = threading.Lock()
+        self.running = True
+
+    def read_new(self):
+        with self.lock:
+            size = os.path.getsize(self.path)
+            if size <= self.offset:
+                return
+            with open(self.path, "rb") as f:
+                f.seek(self.offset)
+                data = f.read(size - self.offset)
+            self.offset = size
+        lines = data.decode("utf-8").strip().split("\n")
+        self.publish([read_entry(line, "suricata") for line in lines if line])
+
+    def start(self):
+        if Observer is not None:
+            follower = self
+
+            class Handler(FileSystemEventHandler):
+                def on_modified(self, event):
+                    if os.path.abspath(event.src_path) == str(follower.path):
+                        follower.read_new()
+
+            self.observer = Observer()
+            self.observer.schedule(Handler(), str(self.path.parent))
+            self.observer.start()
+        else:
+            threading.Thread(target=self._poll, daemon=True).start()
+
+    def _poll(self):
+        while self.running:
+            self.read_new()
+            time.sleep(0.01)
+
+    def stop(self):
+        self.running = False
+        if Observer is not None:
+            self.observer.stop()
+            self.observer.join()
+
+
+async def measure(mode, count, interval):
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+
+    def publish(entries):
+        loop.call_soon_threadsafe(lambda: [queue.put_nowait(e) for e in entries])
+
+    tmp = tempfile.TemporaryDirectory()
+    path = Path(tmp.name).resolve() / "suricata_logs.log"
+    path.touch()
+    writer = BatchWriter()
+    follower = None
+    if mode == "file":
+        follower = FileFollower(path, publish)
+        follower.start()
+
+    sent = {}
+
+    def produce():
+        for seq in range(count):
+            sent[seq] = time.perf_counter()
+            entries = [f"[**] [{format_timestamp()}] Suricata: {LINE} seq={seq}"]
+            writer.write_many(path, entries)
+            if mode == "inprocess":
+                publish([read_entry(entry, "suricata") for entry in entries])
+            time.sleep(interval)
+
+    producer = threading.Thread(target=produce)
+    producer.start()
+
+    latencies = []
+    while len(latencies) < count:
+        entry = await queue.get()
+        seq = int(entry["content"].rsplit("seq=", 1)[1])
+        latencies.append(time.perf_counter() - sent[seq])
+
+    producer.join()
+    if follower:
+        follower.stop()
+    writer.close()
+    tmp.cleanup()
+
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2] * 1000
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000
+    print(
+        f"{mode:<10} p50 {p50:8.2f} ms  p99 {p99:8.2f} ms  "
+        f"最大 {latencies[-1] * 1000:8.2f} ms"
+    )
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    interval = 0.005
+    notify = "watchdog" if Observer is not None else "10ms轮询"
+    print(f"样本: {count} 行, 间隔 {interval * 1000:.0f} ms, 文件通知: {notify}")
+    asyncio.run(measure("file", count, interval))
+    asyncio.run(measure("inprocess", count, interval))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+SSE编码基准测试
+以1、10、100个订阅者比较每个事件的CPU时间：
+- 逐连接编码：每个连接的生成器各自json.dumps并格式化每个事件，逐个写出
+- 编码一次：发布时编码为bytes帧，各连接共享，积压的帧合并为一次写入
+写入以累加字节数代替，事件每批BURST个发布，模拟持续推送
+"""
+
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.broadcast import BroadcastHub  # noqa: E402
+
+EVENTS = 20000
+BURST = 20
+EVENT = {
+    "timestamp": "2026-10-16T10:00:00.123",
+    "content": "[**] [2026-10-16 10:00:00.123] Suricata: 当前流: "
+    "192.168.1.10:443 -> 10.0.0.8:51234 pkts=12 bytes=5120",
+    "type": "suricata",
+    "source": "SURICATA",
+}
+
+
+class Counter:
+    def __init__(self):
+        self.bytes = 0
+        self.writes = 0
+
+    def write(self, data):
+        self.bytes += len(data)
+        self.writes += 1
+
+
+async def per_connection(count):
+    """旧实现：每个连接一个队列，生成器内逐事件序列化"""
+    queues = [asyncio.Queue() for _ in range(count)]
+    counter = Counter()
+
+    async def stream(queue):
+        while True:
+            event = await queue.get()
+            if event is None:
+                return
+            counter.write(f"data: {json.dumps(event)}\n\n".encode("utf-8"))
+
+    tasks = [asyncio.create_task(stream(queue)) for queue in queues]
+    for _ in range(0, EVENTS, BURST):
+        for _ in range(BURST):
+            event = dict(EVENT)
+            for queue in queues:
+                queue.put_nowait(event)
+        await asyncio.sleep(0)
+    for queue in queues:
+        queue.put_nowait(None)
+    await asyncio.gather(*tasks)
+    return counter
+
+
+async def encode_once(count):
+    """新实现：发布时编码一次，积压的帧合并写出"""
+    hub = BroadcastHub(maxsize=EVENTS)
+    counter = Counter()
+
+    async def stream(subscriber):
+        while True:
+            frames = await subscriber.get_frames()
+            if frames is None:
+                return
+            counter.write(frames)
+
+    tasks = [asyncio.create_task(stream(hub.subscribe())) for _ in range(count)]
+    await asyncio.sleep(0)
+    for _ in range(0, EVENTS, BURST):
+        hub.publish_many([dict(EVENT) for _ in range(BURST)])
+        await asyncio.sleep(0)
+    while any(s.items for s in hub.subscribers.values()):
+        await asyncio.sleep(0)
+    for subscriber in list(hub.subscribers.values()):
+        hub.unsubscribe(subscriber)
+    await asyncio.gather(*tasks)
+    return counter
+
+
+def measure(func, count):
+    started = time.process_time()
+    counter = asyncio.run(func(count))
+    cpu = time.process_time() - started
+    return cpu / EVENTS * 1e6, counter
+
+
+def main():
+    print(f"{EVENTS} 个事件，每批 {BURST} 个")
+    for count in (1, 10, 100):
+        old_cpu, old = measure(per_connection, count)
+        new_cpu, new = measure(encode_once, count)
+        print(
+            f"订阅者 {count:>3}:  逐连接编码 {old_cpu:8.1f} µs/事件 ({old.writes:>7} 次写入)"
+            f"  编码一次 {new_cpu:7.1f} µs/事件 ({new.writes:>6} 次写入)"
+            f"  {old_cpu / new_cpu:5.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+tail引擎基准测试
+分别以1、10、50个并发tail对比两种引擎：
+- 线程引擎：每个tail一个线程，recv带1秒超时循环
+- 多路复用引擎：所有通道注册到一个selectors事件循环
+SSH通道用本地管道模拟（fileno()为管道读端），测量空闲和持续写入两个阶段的
+CPU时间与主动上下文切换次数（包含模拟写入线程自身的开销，两种引擎相同）
+"""
+
+import os
+import resource
+import select
+import socket
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.remote_tail import CommandTail  # noqa: E402
+from src.ssh_manager import SSHManager  # noqa: E402
+from src.tail_mux import TailMultiplexer  # noqa: E402
+
+LINE = "16/10/2026 -- 10:00:00 - <Info> - 当前流: 192.168.1.10:443 -> 10.0.0.8:51234\n"
+LINES_PER_SEC = 20000  # 所有tail合计的写入速率
+PHASE_SECONDS = 3
+
+
+class PipeChannel:
+    """以管道模拟的SSH通道，提供tail引擎用到的接口"""
+
+    def __init__(self):
+        self.read_fd, self.write_fd = os.pipe()
+        self.timeout = None
+        self.closed = False
+
+    def fileno(self):
+        return self.read_fd
+
+    def settimeout(self, timeout):
+        self.timeout = timeout
+
+    def setblocking(self, blocking):
+        os.set_blocking(self.read_fd, blocking)
+        self.timeout = None if blocking else 0.0
+
+    def recv(self, size):
+        if self.timeout:
+            ready, _, _ = select.select([self.read_fd], [], [], self.timeout)
+            if not ready:
+                raise socket.timeout()
+        try:
+            return os.read(self.read_fd, size)
+        except BlockingIOError:
+            raise socket.timeout()
+
+    def close(self):
+        # 描述符号会被复用，重复关闭可能关掉其他对象的描述符
+        if self.closed:
+            return
+        self.closed = True
+        for fd in (self.read_fd, self.write_fd):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+
+class PipeClient:
+    """模拟SSHClient：exec_command返回管道通道"""
+
+    def __init__(self):
+        self.channels = []
+
+    def get_transport(self):
+        return self
+
+    def is_active(self):
+        return True
+
+    def exec_command(self, command, get_pty=False):
+        channel = PipeChannel()
+        self.channels.append(channel)
+
+        class Stdout:
+            pass
+
+        stdout = Stdout()
+        stdout.channel = channel
+        return None, stdout, None
+
+
+def make_manager(count):
+    ssh = SSHManager("127.0.0.1", 22, "root", "box", max_channels=count + 4)
+    ssh.client = PipeClient()
+    ssh.connected = True
+    return ssh
+
+
+def writer(client, count, stop):
+    """按合计速率向各管道轮流写入行"""
+    data = LINE.encode("utf-8")
+    interval = 0.01
+    per_tick = max(LINES_PER_SEC * interval // count, 1)
+    while not stop.is_set():
+        started = time.monotonic()
+        for channel in client.channels:
+            try:
+                os.write(channel.write_fd, data * int(per_tick))
+            except OSError:
+                pass
+        stop.wait(max(interval - (time.monotonic() - started), 0))
+
+
+def measure(seconds):
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    cpu = time.process_time()
+    time.sleep(seconds)
+    after = resource.getrusage(resource.RUSAGE_SELF)
+    return time.process_time() - cpu, after.ru_nvcsw - usage.ru_nvcsw
+
+
+def run(engine, count):
+    ssh = make_manager(count)
+    multiplexer = None
+    if engine == "多路复用":
+        multiplexer = TailMultiplexer()
+        ssh.multiplexer = multiplexer
+
+    delivered = [0]
+
+    def callback(lines):
+        delivered[0] += len(lines)
+
+    threads_before = threading.active_count()
+    for i in range(count):
+        ssh.start_tail(CommandTail(f"tail-{i}"), callback, batch=True)
+    while len(ssh.client.channels) < count:
+        time.sleep(0.01)
+    time.sleep(0.2)
+    thread_count = threading.active_count() - threads_before
+
+    idle_cpu, idle_switches = measure(PHASE_SECONDS)
+
+    stop = threading.Event()
+    producer = threading.Thread(target=writer, args=(ssh.client, count, stop))
+    producer.start()
+    busy_cpu, busy_switches = measure(PHASE_SECONDS)
+    stop.set()
+    producer.join()
+    time.sleep(0.2)
+
+    threads = list(ssh.tail_threads)
+    ssh.stop_tail_command()
+    if multiplexer is not None:
+        multiplexer.stop()
+    for thread in threads:
+        thread.join()
+    for channel in ssh.client.channels:
+        channel.close()
+
+    print(
+        f"{engine:<6} tail数 {count:>3}  线程 {thread_count:>3}"
+        f"  空闲CPU {idle_cpu * 1000:7.1f} ms  空闲切换 {idle_switches:>5}"
+        f"  写入CPU {busy_cpu * 1000:7.1f} ms  写入切换 {busy_switches:>6}"
+        f"  {delivered[0] / PHASE_SECONDS:>8.0f} 行/秒"
+    )
+
+
+def main():
+    print(f"每阶段 {PHASE_SECONDS} 秒，写入阶段合计 {LINES_PER_SEC} 行/秒")
+    for count in (1, 10, 50):
+        for engine in ("线程", "多路复用"):
+            run(engine, count)
+
+
+if __name__ == "__main__":
+    main()
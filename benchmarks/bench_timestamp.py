@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+时间戳格式化基准测试
+对比每行datetime.now().strftime()与缓存秒级前缀的TimestampFormatter
+"""
+
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.timestamp import TimestampFormatter  # noqa: E402
+
+LINE = "16/10/2026 -- 10:00:00 - <Info> - 当前流: 192.168.1.10:443 -> 10.0.0.8:51234"
+
+
+def legacy(count):
+    """原回调中的格式化方式"""
+    for _ in range(count):
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+        f"[**] [{timestamp}] Suricata: {LINE}"
+
+
+def cached(count):
+    formatter = TimestampFormatter()
+    for _ in range(count):
+        f"[**] [{formatter.format()}] Suricata: {LINE}"
+
+
+def run(name, func, count):
+    start = time.perf_counter()
+    func(count)
+    elapsed = time.perf_counter() - start
+    print(
+        f"{name:<10} {count / elapsed:>12,.0f} 条/秒  {elapsed / count * 1e9:8.0f} ns/条"
+    )
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500000
+    print(f"样本: {count} 条")
+    run("strftime", legacy, count)
+    run("缓存前缀", cached, count)
+
+
+if __name__ == "__main__":
+    main()
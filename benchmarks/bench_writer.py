@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+写入器基准测试
+对比逐行打开/追加/关闭文件与BatchWriter批量写入的吞吐
+"""
+
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.batch_writer import FSYNC_INTERVAL, BatchWriter  # noqa: E402
+
+LINE = (
+    "[**] [2026-10-16 10:00:00.123] Suricata: 16/10/2026 -- 10:00:00 - <Info> - "
+    "当前流: 192.168.1.10:443 -> 10.0.0.8:51234 proto=TCP"
+)
+
+
+def legacy_write(path, count):
+    """原write_to_file：每行加锁、打开、写入、关闭"""
+    lock = threading.Lock()
+    for _ in range(count):
+        with lock:
+            with open(path, "a") as f:
+                f.write(LINE + "\n")
+
+
+def batch_write(path, count, **kwargs):
+    writer = BatchWriter(**kwargs)
+    for _ in range(count):
+        writer.write(path, LINE)
+    writer.close()
+
+
+def run(name, func, count, **kwargs):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "bench.log"
+        start = time.perf_counter()
+        func(path, count, **kwargs)
+        elapsed = time.perf_counter() - start
+        size = path.stat().st_size
+    print(f"{name:<16} {count / elapsed:>12,.0f} 行/秒  ({size / 1024 / 1024:.1f} MB)")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    print(f"样本: {count} 行")
+    run("逐行打开关闭", legacy_write, count)
+    run("批量写入", batch_write, count)
+    run("批量写入+fsync", batch_write, count, fsync=FSYNC_INTERVAL)
+
+
+if __name__ == "__main__":
+    main()
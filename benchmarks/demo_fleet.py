@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多主机收集演示
+用本地子进程代替SSH连接模拟多台传感器：每台“主机”是一个目录，远程命令在该目录中
+用bash执行。各主机以不同节奏写入suricata.log，FleetCollector把它们收集到各自的
+目录，并归并为按时间排序的merged.log
+"""
+
+import os
+import random
+import select
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.fleet import FleetCollector  # noqa: E402
+from src.log_parser import collected_time  # noqa: E402
+from src.source_registry import HostConfig, SourceConfig  # noqa: E402
+from src.ssh_manager import SSHManager  # noqa: E402
+
+HOSTS = 4
+SECONDS = 4
+LATENESS = 1.0
+
+
+class LocalChannel:
+    """以子进程模拟的SSH通道"""
+
+    def __init__(self, process):
+        self.process = process
+        self.fd = process.stdout.fileno()
+        self.timeout = None
+
+    def fileno(self):
+        return self.fd
+
+    def settimeout(self, timeout):
+        self.timeout = timeout
+
+    def setblocking(self, blocking):
+        os.set_blocking(self.fd, blocking)
+        self.timeout = None if blocking else 0.0
+
+    def recv(self, size):
+        if self.timeout:
+            ready, _, _ = select.select([self.fd], [], [], self.timeout)
+            if not ready:
+                raise socket.timeout()
+        try:
+            return os.read(self.fd, size)
+        except BlockingIOError:
+            raise socket.timeout()
+
+    def recv_exit_status(self):
+        return self.process.wait()
+
+    def close(self):
+        if self.process.poll() is None:
+            os.killpg(self.process.pid, signal.SIGTERM)
+            self.process.wait()
+
+
+class LocalStream:
+    def __init__(self, stream, channel=None):
+        self.stream = stream
+        self.channel = channel
+
+    def read(self):
+        return self.stream.read()
+
+
+class LocalClient:
+    """模拟SSHClient：在主机目录中执行命令"""
+
+    def __init__(self, root):
+        self.root = root
+
+    def get_transport(self):
+        return self
+
+    def is_active(self):
+        return True
+
+    def exec_command(self, command, get_pty=False, timeout=None):
+        process = subprocess.Popen(
+            ["bash", "-c", command],
+            cwd=self.root,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT if get_pty else subprocess.PIPE,
+            start_new_session=True,
+        )
+        channel = LocalChannel(process)
+        stderr = LocalStream(process.stderr) if process.stderr else None
+        return None, LocalStream(process.stdout, channel), stderr
+
+
+def make_manager(host):
+    ssh = SSHManager(host.hostname, host.port, host.username, host.private_key_path)
+    ssh.client = LocalClient(host.hostname)
+    ssh.connected = True
+    return ssh
+
+
+def produce(path, host, stop):
+    """以随机间隔追加日志行"""
+    count = 0
+    with open(path, "a", encoding="utf-8") as f:
+        while not stop.is_set():
+            count += 1
+            f.write(
+                f"16/10/2026 -- 10:00:00 - <Info> - 当前流: {host} 第{count}行 "
+                f"192.168.1.10:443 -> 10.0.0.8:51234\n"
+            )
+            f.flush()
+            stop.wait(random.uniform(0.001, 0.02))
+    return count
+
+
+def main():
+    base = Path(tempfile.mkdtemp())
+    hosts = []
+    for i in range(HOSTS):
+        root = base / f"sensor{i}"
+        root.mkdir()
+        (root / "suricata.log").touch()
+        hosts.append(HostConfig(f"sensor{i}", str(root)))
+
+    fleet = FleetCollector(
+        hosts,
+        [SourceConfig("suricata", path="suricata.log", filter={"include": ["当前流"]})],
+        log_dir=base / "logs",
+        parallel=2,
+        merge=True,
+        lateness=LATENESS,
+        ssh_factory=make_manager,
+        install_signals=False,
+    )
+    started = time.monotonic()
+    fleet.start()
+    print(f"{HOSTS} 台主机启动耗时 {time.monotonic() - started:.2f} 秒 (并行度 2)")
+    time.sleep(1)
+
+    stop = threading.Event()
+    counts = {}
+    threads = []
+    for host in hosts:
+        path = Path(host.hostname) / "suricata.log"
+
+        def run(path=path, name=host.name):
+            counts[name] = produce(path, name, stop)
+
+        thread = threading.Thread(target=run)
+        thread.start()
+        threads.append(thread)
+    time.sleep(SECONDS)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    time.sleep(1)
+    fleet.stop()
+
+    for host in hosts:
+        lines = (base / "logs" / host.name / "suricata_logs.log").read_text("utf-8")
+        collected = sum("当前流" in line for line in lines.splitlines())
+        print(f"{host.name}: 写入 {counts[host.name]} 行, 收集 {collected} 行")
+
+    merged = (base / "logs" / "merged.log").read_text("utf-8").splitlines()
+    times = [collected_time(line.split("] ", 1)[1]) for line in merged]
+    ordered = all(a <= b for a, b in zip(times, times[1:]))
+    print(
+        f"归并流: {len(merged)} 行, 按时间有序: {'是' if ordered else '否'}, "
+        f"统计: {fleet.merged.get_stats()}"
+    )
+    print(f"输出目录: {base / 'logs'}")
+
+
+if __name__ == "__main__":
+    main()
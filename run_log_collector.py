@@ -1,10 +1,17 @@
+from src.fleet import FleetCollector
 from src.log_collector import LogCollector
+from src.source_registry import load_hosts
 
 
 def main():
-    collector = LogCollector()
+    # 配置了多台主机时每台主机一个连接，分别收集
+    _, hosts = load_hosts()
+    if len(hosts) > 1:
+        collector = FleetCollector.from_config()
+    else:
+        collector = LogCollector.from_config()
     collector.start_collection()
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -4,12 +4,21 @@
 日志监控与规则管理系统 - 服务器入口
 """
 
+import argparse
 import uvicorn
 import sys
 
 
 def main():
     """启动服务器"""
+    parser = argparse.ArgumentParser(description="日志监控与规则管理系统")
+    parser.add_argument(
+        "--inprocess",
+        action="store_true",
+        help="在服务进程内运行日志收集器，日志直接推送到页面，文件仅作归档",
+    )
+    args = parser.parse_args()
+
     print("=" * 60)
     print("🚀 启动日志监控与规则管理系统")
     print("=" * 60)
@@ -19,13 +28,17 @@ def main():
     print("  ✓ 远程规则重载功能")
     print("  ✓ 日志过滤和分类显示")
     print("=" * 60)
+    print(f"收集器模式: {'进程内' if args.inprocess else '文件监控'}")
     print("访问地址: http://localhost:8000")
     print("按 Ctrl+C 停止服务")
     print("=" * 60)
 
     try:
         # 导入应用
-        from src.enhanced_log_watcher import app
+        from src.enhanced_log_watcher import app, configure_collector
+
+        if args.inprocess:
+            configure_collector("inprocess")
 
         # 启动服务器
         uvicorn.run(app, host="0.0.0.0", port=8000, reload=False, log_level="info")
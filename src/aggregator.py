@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+流式聚合
+对dtraceattach这类高频输出，不再逐行落盘，而是在收集阶段解析每行，
+按探针/函数累计计数和log2延迟直方图（可合并），按固定间隔输出最近窗口的汇总；
+原始行只按配置的比例抽样保留，总数始终精确统计
+"""
+
+import threading
+import time
+from collections import deque
+
+from src.log_parser import PARSERS
+
+
+class Log2Histogram:
+    """以2的幂为桶边界的直方图，桶b包含[2^(b-1), 2^b)，0与负值计入桶0
+
+    两个直方图按桶相加即可合并，窗口汇总由各间隔的直方图合并得到
+    """
+
+    def __init__(self):
+        self.buckets = {}
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+
+    def add(self, value):
+        bucket = int(value).bit_length() if value > 0 else 0
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def merge(self, other):
+        for bucket, count in other.buckets.items():
+            self.buckets[bucket] = self.buckets.get(bucket, 0) + count
+        self.count += other.count
+        self.total += other.total
+        if other.count:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+
+    def quantile(self, q):
+        """分位数的估计值（所在桶的上界，不超过最大值）"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                return min((1 << bucket) - 1, self.max) if bucket else 0
+        return self.max
+
+    def as_dict(self):
+        if not self.count:
+            return {"count": 0}
+        return {
+            "count": self.count,
+            "avg": round(self.total / self.count, 1),
+            "min": self.min,
+            "p50": self.quantile(0.5),
+            "p90": self.quantile(0.9),
+            "p99": self.quantile(0.99),
+            "max": self.max,
+        }
+
+
+class IntervalStats:
+    """一个汇总间隔内各探针的计数与延迟直方图"""
+
+    def __init__(self, start):
+        self.start = start
+        self.counts = {}
+        self.latency = {}
+
+    def merge(self, other):
+        for probe, count in other.counts.items():
+            self.counts[probe] = self.counts.get(probe, 0) + count
+        for probe, histogram in other.latency.items():
+            self.latency.setdefault(probe, Log2Histogram()).merge(histogram)
+
+
+class StreamAggregator:
+    """单个日志源的流式聚合
+
+    process()返回抽样保留的原始行；summary()在到达汇总间隔时返回汇总记录，
+    记录包含最近一个间隔和最近window秒的各探针统计，以及启动以来的精确总数
+    """
+
+    def __init__(
+        self,
+        parser="dtrace",
+        interval=10,
+        window=60,
+        sample=0.01,
+        latency_field="latency",
+        max_probes=1000,
+    ):
+        if parser not in PARSERS:
+            raise Exception(f"未知的解析器: {parser}")
+        if not 0 <= sample <= 1:
+            raise Exception(f"抽样比例必须在0到1之间: {sample}")
+        self.parse = PARSERS[parser]
+        self.interval = interval  # 汇总输出间隔（秒）
+        self.window = window  # 滚动窗口长度（秒）
+        self.sample = sample  # 保留的原始行比例
+        self.latency_field = latency_field  # 行中表示延迟的字段
+        self.max_probes = max_probes  # 探针数上限，超出的计入"other"
+
+        self.lock = threading.Lock()
+        now = time.time()
+        self.current = IntervalStats(now)
+        self.history = deque(maxlen=max(int(window // interval), 1))
+        self.credit = 0.0  # 抽样累计，按比例均匀保留而不是随机
+
+        # 启动以来的精确总数
+        self.lines = 0
+        self.sampled = 0
+        self.unparsed = 0  # 没有探针/函数名的行
+        self.totals = {}
+
+    def probe_name(self, fields):
+        name = fields.get("function")
+        if name is None:
+            return None
+        if name not in self.totals and len(self.totals) >= self.max_probes:
+            return "other"
+        return name
+
+    def process(self, lines):
+        """累计一批行，返回抽样保留的原始行"""
+        kept = []
+        with self.lock:
+            counts = self.current.counts
+            latency = self.current.latency
+            for line in lines:
+                _, fields = self.parse(line)
+                probe = self.probe_name(fields)
+                if probe is None:
+                    self.unparsed += 1
+                else:
+                    counts[probe] = counts.get(probe, 0) + 1
+                    self.totals[probe] = self.totals.get(probe, 0) + 1
+                    value = fields.get(self.latency_field)
+                    if isinstance(value, (int, float)):
+                        histogram = latency.get(probe)
+                        if histogram is None:
+                            histogram = latency[probe] = Log2Histogram()
+                        histogram.add(value)
+
+                self.credit += self.sample
+                if self.credit >= 1:
+                    self.credit -= 1
+                    kept.append(line)
+
+            self.lines += len(lines)
+            self.sampled += len(kept)
+        return kept
+
+    def summary(self, now=None, force=False):
+        """到达汇总间隔（或force）时结束当前间隔并返回汇总记录，否则返回None"""
+        now = now or time.time()
+        with self.lock:
+            if not force and now - self.current.start < self.interval:
+                return None
+            finished = self.current
+            self.current = IntervalStats(now)
+            self.history.append(finished)
+
+            window = IntervalStats(self.history[0].start)
+            for stats in self.history:
+                window.merge(stats)
+            elapsed = max(now - finished.start, 1e-9)
+            window_elapsed = max(now - window.start, 1e-9)
+
+            probes = {}
+            for probe in sorted(window.counts, key=window.counts.get, reverse=True):
+                record = {
+                    "count": finished.counts.get(probe, 0),
+                    "rate": round(finished.counts.get(probe, 0) / elapsed, 1),
+                    "window_count": window.counts[probe],
+                    "window_rate": round(window.counts[probe] / window_elapsed, 1),
+                    "total": self.totals[probe],
+                }
+                if probe in finished.latency:
+                    record["latency"] = finished.latency[probe].as_dict()
+                if probe in window.latency:
+                    record["window_latency"] = window.latency[probe].as_dict()
+                probes[probe] = record
+
+            return {
+                "interval": round(elapsed, 3),
+                "window": round(window_elapsed, 3),
+                "lines": self.lines,
+                "sampled": self.sampled,
+                "unparsed": self.unparsed,
+                "probes": probes,
+            }
+
+    def get_stats(self):
+        with self.lock:
+            return {
+                "lines": self.lines,
+                "sampled": self.sampled,
+                "unparsed": self.unparsed,
+                "probes": len(self.totals),
+                "totals": dict(self.totals),
+            }
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+断点补齐
+收集器重启时，远程文件在停机期间新增的字节区间按固定大小切块，
+通过多个独立通道并行读取，再按顺序拼接成行交付；
+补齐结束的位置交给实时tail作为起点，边界处由tail按偏移去重
+"""
+
+import shlex
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from src.remote_tail import LINE_START
+
+
+class Backfill:
+    """从检查点补齐单个远程文件"""
+
+    def __init__(
+        self,
+        ssh,
+        path,
+        log_filter=None,
+        mode=LINE_START,
+        chunk_size=4 * 1024 * 1024,
+        parallel=4,
+    ):
+        self.ssh = ssh
+        self.path = path
+        self.log_filter = log_filter
+        self.mode = mode  # 返回和交付的位置使用的偏移含义
+        self.chunk_size = chunk_size
+        self.parallel = parallel
+
+        # 统计
+        self.bytes = 0
+        self.lines = 0
+        self.chunks = 0
+        self.elapsed = 0.0
+
+    def _position(self, inode, last_start, next_byte):
+        offset = last_start if self.mode == LINE_START else next_byte
+        return {"path": self.path, "inode": inode, "offset": offset, "mode": self.mode}
+
+    def run(self, state, deliver):
+        """补齐检查点之后的数据，返回实时tail的起始位置
+
+        deliver(lines, position)接收一批行以及交付这批行后的恢复位置
+        """
+        started = time.monotonic()
+        result = self.ssh.execute_command(f"stat -c '%i %s' {shlex.quote(self.path)}")
+        if not result["success"]:
+            raise Exception(f"获取文件状态失败: {result['stderr'].strip()}")
+        inode, size = (int(value) for value in result["stdout"].split())
+
+        if inode != state["inode"] or size < state["offset"]:
+            # 轮转前旧文件中未读的部分无法定位，从新文件开头补齐
+            print(f"{self.path}在停机期间已轮转或截断，从新文件开头补齐")
+            start, skip_first = 0, False
+        elif state["mode"] == LINE_START:
+            # 检查点所在的行已经交付过（-1表示从文件开头读取且没有交付过的行）
+            start, skip_first = max(state["offset"], 0), state["offset"] >= 0
+        else:
+            start, skip_first = state["offset"], False
+
+        last_start = start if skip_first else start - 1  # 最后一个完整行的起点
+        next_byte = start  # 最后一个完整行之后的偏移
+        offsets = iter(range(start, size, self.chunk_size))
+        pending = deque()
+
+        with ThreadPoolExecutor(
+            max_workers=self.parallel, thread_name_prefix="backfill"
+        ) as pool:
+
+            def submit_next():
+                offset = next(offsets, None)
+                if offset is not None:
+                    length = min(self.chunk_size, size - offset)
+                    pending.append(
+                        pool.submit(self.ssh.read_bytes, self.path, offset, length)
+                    )
+
+            # 预取的块数有上限，内存占用与停机时长无关
+            for _ in range(self.parallel * 2):
+                submit_next()
+
+            carry = b""  # 跨块的不完整行
+            position = start
+            while pending:
+                data = pending.popleft().result()
+                submit_next()
+                self.chunks += 1
+                self.bytes += len(data)
+
+                parts = (carry + data).split(b"\n")
+                carry = parts.pop()
+                lines = []
+                # position始终是carry在文件中的起点
+                for part in parts:
+                    line_start = position
+                    position += len(part) + 1
+                    last_start = line_start
+                    if skip_first and line_start == start:
+                        continue
+                    line = part.decode("utf-8", errors="replace").strip()
+                    if line:
+                        lines.append(line)
+                next_byte = position
+
+                if self.log_filter and lines:
+                    lines = self.log_filter.apply(lines)
+                self.lines += len(lines)
+                deliver(lines, self._position(inode, last_start, next_byte))
+
+        # 文件末尾不完整的行留给实时tail读取
+        self.elapsed = time.monotonic() - started
+        return self._position(inode, last_start, next_byte)
+
+    def get_stats(self):
+        return {
+            "path": self.path,
+            "bytes": self.bytes,
+            "lines": self.lines,
+            "chunks": self.chunks,
+            "elapsed": round(self.elapsed, 3),
+            "bytes_per_sec": round(self.bytes / self.elapsed, 1) if self.elapsed else 0,
+        }
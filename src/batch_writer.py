@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批量写入器
+每个输出文件保持一个长期打开的句柄，行先在内存中累积，
+按缓冲大小、时间间隔或关闭时统一写入（group commit），可选fsync策略；
+设置rotate_bytes后在写入路径上检查大小，超过阈值立即封存为分段；
+设置index后同时维护稀疏时间索引（见log_index.py）
+"""
+
+import os
+import threading
+import time
+from pathlib import Path
+
+from src.log_index import INDEX_ENTRY, index_path
+from src.segments import SegmentCompressor, SegmentManifest
+from src.timestamp import format_timestamp
+
+FSYNC_NEVER = "never"  # 交给操作系统
+FSYNC_INTERVAL = "interval"  # 距上次fsync超过fsync_interval秒时fsync
+FSYNC_ALWAYS = "always"  # 每次写入后fsync
+FSYNC_POLICIES = (FSYNC_NEVER, FSYNC_INTERVAL, FSYNC_ALWAYS)
+
+
+class OutputFile:
+    """单个输出文件的句柄与缓冲"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.lock = threading.Lock()
+        self.handle = None
+        self.buffer = bytearray()
+        self.size = 0  # 文件当前大小（含缓冲中未写入的字节）
+        self.last_fsync = time.monotonic()
+
+        # 当前分段信息（用于清单）
+        self.manifest = SegmentManifest(path)
+        self.lines = None  # 行数，None表示尚未统计已有文件
+        self.started = None  # 首行写入时间，续写已有文件时未知
+        self.ended = None  # 最后一次写入时间
+
+        # 稀疏时间索引
+        self.index_path = index_path(path)
+        self.index_handle = None
+        self.index_buffer = bytearray()
+        self.index_time = 0.0  # 上一条索引的写入时间
+        self.index_lines = 0  # 上一条索引之后写入的行数
+
+    def open(self):
+        if self.handle is None:
+            self.handle = open(self.path, "ab")
+            self.size = os.fstat(self.handle.fileno()).st_size + len(self.buffer)
+
+    def close(self):
+        if self.handle is not None:
+            self.handle.close()
+            self.handle = None
+        if self.index_handle is not None:
+            self.index_handle.close()
+            self.index_handle = None
+
+
+class BatchWriter:
+    """批量写入器 - 按大小、时间或关闭刷新缓冲"""
+
+    def __init__(
+        self,
+        flush_bytes=64 * 1024,
+        flush_interval=0.05,
+        fsync=FSYNC_NEVER,
+        fsync_interval=1.0,
+        rotate_bytes=None,
+        compress=True,
+        index=False,
+        index_every=1000,
+        index_interval=1.0,
+    ):
+        if fsync not in FSYNC_POLICIES:
+            raise Exception(f"未知的fsync策略: {fsync}")
+        self.flush_bytes = flush_bytes
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        # 文件达到rotate_bytes时封存，封存的分段由后台线程压缩
+        self.rotate_bytes = rotate_bytes
+        self.compressor = SegmentCompressor() if rotate_bytes and compress else None
+        # 每index_every行或每index_interval秒记录一条 (时间, 偏移) 索引
+        self.index = index
+        self.index_every = index_every
+        self.index_interval = index_interval
+
+        self.files = {}  # {路径: OutputFile}
+        self.files_lock = threading.Lock()
+        self.closed = threading.Event()
+        self.flush_thread = threading.Thread(
+            target=self._flush_worker, name="batch-writer", daemon=True
+        )
+        self.flush_thread.start()
+
+        # 统计
+        self.lines = 0
+        self.bytes = 0
+        self.flushes = 0
+        self.fsyncs = 0
+        self.errors = 0
+        self.rotations = 0
+
+    def _get(self, path):
+        key = str(path)
+        output = self.files.get(key)
+        if output is None:
+            with self.files_lock:
+                output = self.files.setdefault(key, OutputFile(path))
+        return output
+
+    def _open(self, output):
+        """打开文件；启用轮转时统计已有文件的行数（仅首次）"""
+        output.open()
+        if output.lines is None:
+            output.lines = self._count_lines(output.path) if self.rotate_bytes else 0
+            if self.compressor:
+                self.compressor.recover(output.manifest)
+            if self.index:
+                self._check_index(output)
+
+    def _index(self, output, count):
+        """需要时为即将写入的这批行记录索引条目（需持有output.lock）"""
+        now = time.time()
+        if (
+            output.index_lines >= self.index_every
+            or now - output.index_time >= self.index_interval
+        ):
+            output.index_buffer += INDEX_ENTRY.pack(int(now * 1000), output.size)
+            output.index_time = now
+            output.index_lines = 0
+        output.index_lines += count
+
+    @staticmethod
+    def _check_index(output):
+        """丢弃与当前文件不匹配的旧索引（例如文件在外部被替换）"""
+        try:
+            data = output.index_path.read_bytes()
+        except FileNotFoundError:
+            return
+        if len(data) % INDEX_ENTRY.size or (
+            data
+            and INDEX_ENTRY.unpack_from(data, len(data) - INDEX_ENTRY.size)[1]
+            > output.size
+        ):
+            output.index_path.unlink()
+
+    @staticmethod
+    def _count_lines(path):
+        count = 0
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                count += chunk.count(b"\n")
+        return count
+
+    def write(self, path, line):
+        """追加一行（不含换行符）"""
+        self.write_many(path, [line])
+
+    def write_many(self, path, lines):
+        """追加多行，缓冲超过flush_bytes时立即写入"""
+        data = "".join(line + "\n" for line in lines).encode("utf-8")
+        output = self._get(path)
+        with output.lock:
+            self._open(output)
+            if self.index:
+                self._index(output, len(lines))
+            output.buffer += data
+            output.size += len(data)
+            self.lines += len(lines)
+            self.bytes += len(data)
+            if self.rotate_bytes:
+                output.lines += len(lines)
+                output.ended = format_timestamp()
+                if output.size == len(data):
+                    output.started = output.ended
+                if output.size >= self.rotate_bytes:
+                    self._rotate_file(output)
+                    return
+            if len(output.buffer) >= self.flush_bytes:
+                self._flush_file(output)
+
+    def _flush_file(self, output):
+        """将缓冲写入文件（需持有output.lock）"""
+        if not output.buffer:
+            return
+        try:
+            output.open()
+            output.handle.write(output.buffer)
+            output.handle.flush()
+            del output.buffer[:]
+            self.flushes += 1
+
+            # 索引在数据之后写入，条目指向的偏移总是已落盘
+            if output.index_buffer:
+                if output.index_handle is None:
+                    output.index_handle = open(output.index_path, "ab")
+                output.index_handle.write(output.index_buffer)
+                output.index_handle.flush()
+                del output.index_buffer[:]
+
+            now = time.monotonic()
+            if self.fsync == FSYNC_ALWAYS or (
+                self.fsync == FSYNC_INTERVAL
+                and now - output.last_fsync >= self.fsync_interval
+            ):
+                os.fsync(output.handle.fileno())
+                output.last_fsync = now
+                self.fsyncs += 1
+        except Exception as e:
+            self.errors += 1
+            print(f"写入文件 {output.path} 失败: {e}")
+
+    def flush(self, path=None):
+        """立即写入指定文件（默认全部）的缓冲"""
+        outputs = [self._get(path)] if path else list(self.files.values())
+        for output in outputs:
+            with output.lock:
+                self._flush_file(output)
+
+    def _flush_worker(self):
+        while not self.closed.wait(self.flush_interval):
+            self.flush()
+
+    def _rotate_file(self, output):
+        """封存当前文件为分段并登记到清单（需持有output.lock）"""
+        if output.size == 0:
+            return
+        self._flush_file(output)
+        output.close()
+        backup_path = self._segment_path(output.path)
+        output.path.rename(backup_path)
+        # 索引只对应当前文件，分段按清单中的时间范围查找
+        output.index_path.unlink(missing_ok=True)
+        output.index_time = 0.0
+        output.index_lines = 0
+
+        output.manifest.add(
+            {
+                "file": backup_path.name,
+                "start": output.started,
+                "end": output.ended,
+                "lines": output.lines,
+                "bytes": output.size,
+                "compressed": False,
+            }
+        )
+        if self.compressor:
+            self.compressor.submit(output.manifest, backup_path)
+
+        output.size = 0
+        output.lines = 0
+        output.started = None
+        output.ended = None
+        self.rotations += 1
+
+    @staticmethod
+    def _segment_path(path):
+        """分段文件名: <名称>_<时间><后缀>，同一秒内多次封存时追加序号"""
+        stamp = time.strftime("%Y%m%d_%H%M%S")
+        candidate = path.with_name(f"{path.stem}_{stamp}{path.suffix}")
+        index = 1
+        while (
+            candidate.exists() or candidate.with_name(candidate.name + ".gz").exists()
+        ):
+            candidate = path.with_name(f"{path.stem}_{stamp}_{index}{path.suffix}")
+            index += 1
+        return candidate
+
+    def close(self):
+        """写入所有缓冲并关闭句柄"""
+        self.closed.set()
+        self.flush_thread.join(timeout=5)
+        for output in list(self.files.values()):
+            with output.lock:
+                self._flush_file(output)
+                if output.handle is not None and self.fsync != FSYNC_NEVER:
+                    os.fsync(output.handle.fileno())
+                output.close()
+        if self.compressor:
+            self.compressor.close()
+
+    def get_stats(self):
+        return {
+            "files": len(self.files),
+            "lines": self.lines,
+            "bytes": self.bytes,
+            "flushes": self.flushes,
+            "fsyncs": self.fsyncs,
+            "errors": self.errors,
+            "buffered": sum(len(output.buffer) for output in self.files.values()),
+            "rotations": self.rotations,
+            "compressor": self.compressor.get_stats() if self.compressor else None,
+        }
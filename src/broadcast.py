@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+SSE广播
+每个事件只发布一次，由广播中心放入每个订阅者自己的有界队列；
+没有订阅者时事件直接丢弃，不会堆积。订阅者处理过慢时按策略处理：
+丢弃最旧的事件并在流中插入缺口标记，或断开该订阅者（浏览器会自动重连）。
+事件在发布时编码一次为不可变的SSE帧（bytes），所有订阅者共享同一个对象；
+订阅者一次取出队列中积压的全部帧，合并为一次写入。
+每个事件分配单调递增的ID（SSE的id字段），最近history个事件保存在环形缓冲区中：
+客户端重连时带上最后收到的ID，从缓冲区补发断线期间的事件；
+另外每个日志源（事件的type）各有一个环形缓冲区，最近的历史按日志源直接从内存读取，
+繁忙的日志源不会把安静日志源的历史挤出去。
+ID从启动时刻（微秒）开始计数，重启后不会与之前的ID重复；不属于本次启动的ID按重置处理。
+所有方法都在应用的事件循环线程中调用
+"""
+
+import asyncio
+import itertools
+import json
+import time
+from collections import deque
+from datetime import datetime
+
+from src.line_queue import DROP_OLDEST
+
+DISCONNECT = "disconnect"  # 队列满时断开订阅者
+POLICIES = (DROP_OLDEST, DISCONNECT)
+
+
+def encode_event(event, id=None):
+    """编码为SSE帧，每个事件只执行一次（默认参数的json.dumps走最快的编码路径）"""
+    if id is None:
+        return f"data: {json.dumps(event)}\n\n".encode("utf-8")
+    return f"id: {id}\ndata: {json.dumps(event)}\n\n".encode("utf-8")
+
+
+class Subscriber:
+    """一个SSE连接的有界队列"""
+
+    def __init__(self, id, maxsize):
+        self.id = id
+        self.maxsize = maxsize
+        self.items = deque()
+        self.waiter = asyncio.Event()
+        self.closed = False
+        self.connected_at = time.time()
+
+        # 统计
+        self.received = 0  # 放入队列的事件数（含之后被丢弃的）
+        self.sent = 0
+        self.writes = 0  # 合并后的写入次数
+        self.dropped = 0
+        self.gap = 0  # 尚未告知客户端的丢弃数
+        self.gap_reason = "推送过慢"
+
+    def gap_marker(self):
+        """缺口标记帧，格式与日志条目一致，前端按普通条目显示"""
+        marker = {
+            "timestamp": datetime.now().isoformat(),
+            "content": f"[{self.gap_reason}，已跳过 {self.gap} 条日志]",
+            "type": "gap",
+            "source": "SYSTEM",
+            "dropped": self.gap,
+        }
+        self.gap = 0
+        self.gap_reason = "推送过慢"
+        return encode_event(marker)
+
+    async def wait(self):
+        """等待有可取的帧；被断开时返回False"""
+        while not self.items and not self.gap:
+            if self.closed:
+                return False
+            self.waiter.clear()
+            await self.waiter.wait()
+        return not self.closed
+
+    async def get(self):
+        """取出下一帧；被断开时返回None"""
+        if not await self.wait():
+            return None
+        if self.gap:
+            # 被丢弃的是最旧的事件，缺口标记排在剩余事件之前
+            return self.gap_marker()
+        self.sent += 1
+        return self.items.popleft()
+
+    async def get_frames(self, max_frames=1000):
+        """取出积压的帧（最多max_frames个）合并为一块，用于一次写入；被断开时返回None"""
+        if not await self.wait():
+            return None
+        frames = []
+        if self.gap:
+            frames.append(self.gap_marker())
+        items = self.items
+        count = min(len(items), max_frames)
+        for _ in range(count):
+            frames.append(items.popleft())
+        self.sent += count
+        self.writes += 1
+        return frames[0] if len(frames) == 1 else b"".join(frames)
+
+    def get_stats(self):
+        return {
+            "id": self.id,
+            "connected_at": self.connected_at,
+            "lag": len(self.items),  # 已发布但尚未发送的事件数
+            "received": self.received,
+            "sent": self.sent,
+            "writes": self.writes,
+            "dropped": self.dropped,
+        }
+
+
+class BroadcastHub:
+    """广播中心 - 每个订阅者一个有界队列，事件发布一次"""
+
+    def __init__(
+        self, maxsize=1000, policy=DROP_OLDEST, history=5000, source_history=None
+    ):
+        if policy not in POLICIES:
+            raise Exception(f"未知的慢订阅者策略: {policy}")
+        self.maxsize = maxsize
+        self.policy = policy
+        self.subscribers = {}
+        self.ids = itertools.count(1)
+        # 最近的事件 [事件ID, 事件, SSE帧]，帧在首次需要时编码
+        self.history = deque(maxlen=history)
+        # 每个日志源最近的事件，用于历史查询
+        self.source_history = source_history or history
+        self.sources = {}
+        # 本次启动的第一个事件ID；重启后的ID从更晚的时刻开始，不会与重启前的重复
+        self.first_id = time.time_ns() // 1000
+        self.last_id = self.first_id - 1  # 最后一个事件的ID
+
+        # 统计
+        self.published = 0
+        self.encoded = 0
+        self.dropped = 0
+        self.disconnected = 0  # 因处理过慢被断开的订阅者数
+        self.total_subscribers = 0
+        self.replayed = 0  # 重连时从缓冲区补发的事件数
+
+    def subscribe(self, last_event_id=None):
+        """新建订阅者；带last_event_id时先补发缓冲区中该ID之后的事件"""
+        subscriber = Subscriber(next(self.ids), self.maxsize)
+        if last_event_id is not None:
+            self.replay(subscriber, last_event_id)
+        self.subscribers[subscriber.id] = subscriber
+        self.total_subscribers += 1
+        return subscriber
+
+    def replay(self, subscriber, last_event_id):
+        if not self.first_id - 1 <= last_event_id <= self.last_id:
+            # 不属于本次启动的ID（服务已重启），无法对应到缓冲区，告知客户端后从头开始
+            subscriber.items.append(self.reset_marker())
+            return
+        if last_event_id == self.last_id:
+            return
+        missed = [r for r in self.history if r[0] > last_event_id]
+        # 早于缓冲区或超出订阅者队列长度的部分无法补发，用缺口标记告知
+        skipped = self.last_id - last_event_id - len(missed)
+        if len(missed) > subscriber.maxsize:
+            skipped += len(missed) - subscriber.maxsize
+            missed = missed[-subscriber.maxsize :]
+        if skipped:
+            subscriber.gap = skipped
+            subscriber.gap_reason = "断线期间的日志超出缓存"
+        subscriber.items.extend(self.frame(r) for r in missed)
+        subscriber.received += len(missed)
+        self.replayed += len(missed)
+
+    @staticmethod
+    def reset_marker():
+        """重置标记帧，格式与日志条目一致，前端按普通条目显示"""
+        return encode_event(
+            {
+                "timestamp": datetime.now().isoformat(),
+                "content": "[服务已重启，断线期间的日志无法补发]",
+                "type": "gap",
+                "source": "SYSTEM",
+                "dropped": None,
+            }
+        )
+
+    def frame(self, record):
+        """缓冲区中事件的SSE帧，没有订阅者时发布的事件在这里补编码"""
+        if record[2] is None:
+            record[2] = encode_event(record[1], record[0])
+            self.encoded += 1
+        return record[2]
+
+    def recent(self, limit=None, since_id=None, source=None):
+        """缓冲区中的最近事件（按发布顺序），用于不读磁盘的历史查询
+
+        指定source时从该日志源自己的缓冲区读取（不支持since_id）
+        """
+        if source is not None:
+            events = list(self.sources.get(source, ()))
+        else:
+            events = [
+                event
+                for id, event, _ in self.history
+                if since_id is None or id > since_id
+            ]
+        return events[-limit:] if limit else events
+
+    def unsubscribe(self, subscriber):
+        subscriber.closed = True
+        subscriber.waiter.set()
+        self.subscribers.pop(subscriber.id, None)
+
+    def publish(self, event):
+        """发布一个事件到所有订阅者并保存到缓冲区，没有订阅者时不编码"""
+        self.published += 1
+        self.last_id += 1
+        record = [self.last_id, event, None]
+        self.history.append(record)
+        recent = self.sources.get(event.get("type"))
+        if recent is None:
+            recent = self.sources[event.get("type")] = deque(
+                maxlen=self.source_history
+            )
+        recent.append(event)
+        if not self.subscribers:
+            return
+        frame = self.frame(record)
+        slow = []
+        for subscriber in self.subscribers.values():
+            items = subscriber.items
+            if len(items) >= subscriber.maxsize:
+                if self.policy == DISCONNECT:
+                    slow.append(subscriber)
+                    continue
+                items.popleft()
+                subscriber.dropped += 1
+                subscriber.gap += 1
+                self.dropped += 1
+            items.append(frame)
+            subscriber.received += 1
+            subscriber.waiter.set()
+
+        for subscriber in slow:
+            self.disconnected += 1
+            self.unsubscribe(subscriber)
+
+    def publish_many(self, events):
+        for event in events:
+            self.publish(event)
+
+    def get_stats(self):
+        subscribers = [s.get_stats() for s in self.subscribers.values()]
+        return {
+            "policy": self.policy,
+            "maxsize": self.maxsize,
+            "history": len(self.history),
+            "source_history": {
+                source: len(events) for source, events in self.sources.items()
+            },
+            "last_id": self.last_id,
+            "replayed": self.replayed,
+            "subscribers": len(subscribers),
+            "total_subscribers": self.total_subscribers,
+            "published": self.published,
+            "encoded": self.encoded,
+            "dropped": self.dropped,
+            "disconnected": self.disconnected,
+            "max_lag": max((s["lag"] for s in subscribers), default=0),
+            "clients": subscribers,
+        }
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+SSH通道调度器
+在共享的SSH传输上限制同时打开的通道数，并区分交互（规则加载/保存/重载）
+与流式（tail）两条优先级通道，互相保证预留额度，避免彼此饿死。
+长期占用额度但可以随时关闭的通道（如池中空闲的SFTP会话）通过reclaim回收：
+请求无法立即分配时先调用reclaim释放这些通道，再排队等待
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+
+INTERACTIVE = "interactive"
+STREAMING = "streaming"
+LANES = (INTERACTIVE, STREAMING)
+
+
+class ChannelScheduler:
+    """通道调度器 - 交互通道优先，但不能占用流式通道的预留额度，反之亦然"""
+
+    def __init__(self, max_channels=10, reserved=None, reclaim=None):
+        self.max_channels = max_channels  # OpenSSH服务端MaxSessions默认为10
+        self.reclaim = reclaim  # 释放空闲通道的函数，在持有cond时调用（cond可重入）
+        self.reserved = {INTERACTIVE: 2, STREAMING: 2}
+        if reserved:
+            self.reserved.update(reserved)
+        if sum(self.reserved.values()) > max_channels:
+            raise Exception("预留通道数之和不能超过最大通道数")
+
+        self.cond = threading.Condition()
+        self.active = {lane: 0 for lane in LANES}
+        self.waiting = {lane: 0 for lane in LANES}
+
+        # 排队统计
+        self.granted = {lane: 0 for lane in LANES}
+        self.queued = {lane: 0 for lane in LANES}  # 需要排队才获得通道的次数
+        self.timeouts = {lane: 0 for lane in LANES}
+        self.reclaims = 0
+        self.wait_time = {lane: 0.0 for lane in LANES}
+        self.max_wait = {lane: 0.0 for lane in LANES}
+        self.max_waiting = {lane: 0 for lane in LANES}
+
+    def _other(self, lane):
+        return STREAMING if lane == INTERACTIVE else INTERACTIVE
+
+    def capacity(self, lane):
+        """lane最多能同时占用的通道数（另一条通道的预留额度不可占用）"""
+        return self.max_channels - self.reserved[self._other(lane)]
+
+    def _can_grant(self, lane):
+        """判断当前是否可以为lane分配一个通道（需持有cond）"""
+        total = sum(self.active.values())
+        other = self._other(lane)
+
+        # 另一条通道尚未用满的预留额度不可占用
+        other_unused = max(self.reserved[other] - self.active[other], 0)
+        if total + 1 > self.max_channels - other_unused:
+            return False
+
+        # 有交互请求排队时，流式请求只能使用自己的预留额度
+        if (
+            lane == STREAMING
+            and self.waiting[INTERACTIVE]
+            and self.active[STREAMING] >= self.reserved[STREAMING]
+        ):
+            return False
+        return True
+
+    def acquire(self, lane, timeout=None):
+        """获取一个通道额度，超时抛出异常"""
+        if lane not in LANES:
+            raise Exception(f"未知的通道类型: {lane}")
+
+        start = time.monotonic()
+        with self.cond:
+            if not self._can_grant(lane) and self.reclaim is not None:
+                self.reclaims += 1
+                self.reclaim()
+            if not self._can_grant(lane):
+                self.queued[lane] += 1
+                self.waiting[lane] += 1
+                self.max_waiting[lane] = max(self.max_waiting[lane], self.waiting[lane])
+                try:
+                    if not self.cond.wait_for(
+                        lambda: self._can_grant(lane), timeout=timeout
+                    ):
+                        self.timeouts[lane] += 1
+                        raise Exception(f"等待SSH通道超时 ({lane})")
+                finally:
+                    self.waiting[lane] -= 1
+                    # 排队者减少可能使其他通道可以分配
+                    self.cond.notify_all()
+
+            waited = time.monotonic() - start
+            self.active[lane] += 1
+            self.granted[lane] += 1
+            self.wait_time[lane] += waited
+            self.max_wait[lane] = max(self.max_wait[lane], waited)
+
+    def release(self, lane):
+        """归还通道额度"""
+        with self.cond:
+            self.active[lane] -= 1
+            self.cond.notify_all()
+
+    @contextmanager
+    def lease(self, lane, timeout=None):
+        """在with块内持有一个通道额度"""
+        self.acquire(lane, timeout)
+        try:
+            yield
+        finally:
+            self.release(lane)
+
+    def get_stats(self):
+        """获取调度与排队统计"""
+        with self.cond:
+            return {
+                "max_channels": self.max_channels,
+                "reserved": dict(self.reserved),
+                "reclaims": self.reclaims,
+                "lanes": {
+                    lane: {
+                        "active": self.active[lane],
+                        "waiting": self.waiting[lane],
+                        "max_waiting": self.max_waiting[lane],
+                        "granted": self.granted[lane],
+                        "queued": self.queued[lane],
+                        "timeouts": self.timeouts[lane],
+                        "avg_wait_ms": round(
+                            self.wait_time[lane] / self.granted[lane] * 1000, 2
+                        )
+                        if self.granted[lane]
+                        else 0.0,
+                        "max_wait_ms": round(self.max_wait[lane] * 1000, 2),
+                    }
+                    for lane in LANES
+                },
+            }
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+采集检查点
+把各远程文件已经落盘的读取位置（inode与字节偏移）保存到本地状态文件，
+收集器重启后据此补齐停机期间的数据。状态文件先写临时文件并fsync，再原子替换，
+进程在任何时刻崩溃都只会留下旧的或新的完整状态
+"""
+
+import json
+import os
+import threading
+from pathlib import Path
+
+
+class CheckpointStore:
+    """各日志源的检查点 {日志源名称: {"path", "inode", "offset", "mode"}}"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.lock = threading.Lock()
+        self.states = self.load()
+        self.saves = 0
+
+    def load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)["sources"]
+        except FileNotFoundError:
+            return {}
+        except (ValueError, KeyError) as e:
+            print(f"检查点文件 {self.path} 无法解析，忽略: {e}")
+            return {}
+
+    def get(self, name):
+        return self.states.get(name)
+
+    def update(self, name, position):
+        with self.lock:
+            self.states[name] = dict(position)
+
+    def save(self):
+        """原子写入状态文件"""
+        with self.lock:
+            tmp_path = self.path.with_name(self.path.name + ".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"sources": self.states}, f, ensure_ascii=False, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+            self.saves += 1
@@ -1,30 +1,54 @@
 import asyncio
 import os
+import threading
+import time
 from pathlib import Path
-from typing import AsyncGenerator
-import json
-from datetime import datetime
+from typing import AsyncGenerator, Optional
 
 from fastapi import FastAPI, Request, HTTPException
 from fastapi.responses import StreamingResponse, HTMLResponse
 from fastapi.staticfiles import StaticFiles
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
-import aiofiles
 from pydantic import BaseModel
 
+from src.broadcast import BroadcastHub
+from src.file_tailer import FileTailer, read_last_lines
+from src.line_queue import DROP_OLDEST
+from src.log_collector import LogCollector
+from src.log_index import read_range
+from src.log_parser import read_entry
+from src.source_registry import load_config
 from src.ssh_manager import get_ssh_manager
 
 app = FastAPI(title="日志实时监控与规则管理系统")
 
-# 日志文件路径
-DTRACE_LOG_FILE = "logs/dtrace_logs.log"
-SURICATA_LOG_FILE = "logs/suricata_logs.log"
+# 日志文件路径：按收集器配置中声明的日志源生成 {文件路径: 日志源名称}
+_options, _sources = load_config()
+LOG_DIR = _options.get("log_dir", "logs")
+LOG_FILES = {os.path.join(LOG_DIR, source.output): source.name for source in _sources}
 
 # 全局变量
-current_dtrace_size = 0
-current_suricata_size = 0
-log_queue = asyncio.Queue()
+# 每个SSE连接一个有界队列，队列满时丢弃最旧的事件并插入缺口标记
+# （也可以设为broadcast.DISCONNECT断开过慢的连接）
+STREAM_QUEUE_SIZE = 1000
+STREAM_OVERFLOW = DROP_OLDEST
+# 最近HISTORY_SIZE个事件保存在内存中，用于断线重连补发；
+# 每个日志源另外保存最近SOURCE_HISTORY_SIZE个事件，用于历史查询
+HISTORY_SIZE = 5000
+SOURCE_HISTORY_SIZE = 1000
+hub = BroadcastHub(
+    STREAM_QUEUE_SIZE, STREAM_OVERFLOW, HISTORY_SIZE, SOURCE_HISTORY_SIZE
+)
+# 连续推送时每个连接每个间隔最多写一次，积压的帧合并写出
+STREAM_TICK = 0.02
+app_loop = None  # 应用的事件循环，其他线程通过publish推送条目
+
+# 收集器模式："file"由独立的收集进程写文件、本服务监控文件；
+# "inprocess"在本服务内运行收集器，条目直接推送，文件只作为归档
+collector_mode = "file"
+collector_options = {}
+collector = None
 
 # SSH管理器
 ssh_manager = None
@@ -35,110 +59,92 @@ class RuleEditRequest(BaseModel):
 
 
 class LogFileHandler(FileSystemEventHandler):
-    """文件监控处理器 - 支持多个日志文件"""
+    """文件监控处理器 - 只通知tail任务，读取在应用的事件循环中进行"""
 
-    def __init__(self, log_files: dict):
-        self.log_files = log_files  # {file_path: file_type}
+    def __init__(self, tailer: FileTailer):
+        self.tailer = tailer
         super().__init__()
 
     def on_modified(self, event):
         """当文件被修改时触发"""
-        if event.event_type == "modified" and not event.is_directory:
-            abs_path = os.path.abspath(event.src_path)
-
-            # 检查是否是我们监控的文件
-            for log_file, log_type in self.log_files.items():
-                if abs_path == os.path.abspath(log_file):
-                    print(f"检测到{log_type}日志文件修改: {event.src_path}")
-                    # 创建新的事件循环来运行异步任务
-                    loop = asyncio.new_event_loop()
-                    asyncio.set_event_loop(loop)
-                    try:
-                        loop.run_until_complete(
-                            self.read_new_content(log_file, log_type)
-                        )
-                    finally:
-                        loop.close()
-                    break
-
-    async def read_new_content(self, log_file: str, log_type: str):
-        """读取文件新增内容"""
-        global current_dtrace_size, current_suricata_size
-
-        try:
-            if not os.path.exists(log_file):
-                return
-
-            # 获取当前文件大小
-            new_size = os.path.getsize(log_file)
-
-            # 根据文件类型获取当前大小
-            if log_type == "dtrace":
-                current_size = current_dtrace_size
-            else:  # suricata
-                current_size = current_suricata_size
-
-            if new_size > current_size:
-                # 读取新增内容
-                async with aiofiles.open(log_file, "r", encoding="utf-8") as f:
-                    await f.seek(current_size)
-                    new_content = await f.read()
-
-                    # 按行分割并发送每一行
-                    lines = new_content.strip().split("\n")
-                    for line in lines:
-                        if line.strip():  # 忽略空行
-                            await log_queue.put(
-                                {
-                                    "timestamp": datetime.now().isoformat(),
-                                    "content": line.strip(),
-                                    "type": log_type,
-                                    "source": log_type.upper(),
-                                }
-                            )
-
-                # 更新文件大小
-                if log_type == "dtrace":
-                    current_dtrace_size = new_size
-                else:
-                    current_suricata_size = new_size
+        if not event.is_directory:
+            self.tailer.notify(event.src_path)
 
-        except Exception as e:
-            print(f"读取{log_type}文件时出错: {e}")
+    def on_created(self, event):
+        """轮转后新建的日志文件"""
+        if not event.is_directory:
+            self.tailer.notify(event.src_path)
 
+    def on_moved(self, event):
+        """以重命名方式替换的日志文件"""
+        if not event.is_directory:
+            self.tailer.notify(event.dest_path)
 
-def setup_file_watcher():
-    """设置文件监控"""
-    global current_dtrace_size, current_suricata_size
 
+def publish(entries):
+    """把一批日志条目推送到流式管道，可在任意线程调用"""
+    if app_loop is None or not entries:
+        return
+    app_loop.call_soon_threadsafe(_enqueue, entries)
+
+
+def _enqueue(entries):
+    hub.publish_many(entries)
+
+
+def configure_collector(mode="file", **options):
+    """设置收集器模式，需在应用启动前调用；options传给LogCollector"""
+    global collector_mode, collector_options
+    if mode not in ("file", "inprocess"):
+        raise Exception(f"未知的收集器模式: {mode}")
+    collector_mode = mode
+    collector_options = options
+
+
+def load_recent_history(per_file=SOURCE_HISTORY_SIZE):
+    """启动时读取各日志文件末尾，返回按时间排序的最近条目（可在线程中调用）
+
+    每个文件各取最近per_file行，不按总数截断，安静的日志源也有自己的历史
+    """
+    entries = []
+    for log_file, log_type in LOG_FILES.items():
+        if os.path.exists(log_file):
+            lines = read_last_lines(log_file, per_file)
+            entries.extend(read_entry(line, log_type) for line in lines)
+    entries.sort(key=lambda x: x["timestamp"])
+    return entries
+
+
+def setup_file_watcher():
+    """设置文件监控，返回(observer, tailer)；需在事件循环中调用"""
     # 监控的日志文件
-    log_files = {DTRACE_LOG_FILE: "dtrace", SURICATA_LOG_FILE: "suricata"}
+    log_files = LOG_FILES
+    os.makedirs(LOG_DIR, exist_ok=True)
 
-    # 确保日志文件存在并获取初始大小
+    # 确保日志文件存在
     for log_file, log_type in log_files.items():
         if not os.path.exists(log_file):
             Path(log_file).touch()
             print(f"创建{log_type}日志文件: {log_file}")
 
-        size = os.path.getsize(log_file)
-        if log_type == "dtrace":
-            current_dtrace_size = size
-        else:
-            current_suricata_size = size
-
-        print(f"开始监控{log_type}日志文件: {log_file} (初始大小: {size} 字节)")
+    # 一个长期的tail任务读取所有文件，从各文件当前末尾开始
+    tailer = FileTailer(log_files, _enqueue)
+    tailer.start()
+    for path, state in tailer.states.items():
+        print(
+            f"开始监控{state.log_type}日志文件: {path} (初始大小: {state.offset} 字节)"
+        )
 
     # 设置文件监控
-    event_handler = LogFileHandler(log_files)
+    event_handler = LogFileHandler(tailer)
     observer = Observer()
 
     # 监控logs目录
-    log_dir = os.path.dirname(DTRACE_LOG_FILE)
-    print(f"监控目录: {log_dir}")
-    observer.schedule(event_handler, path=log_dir, recursive=False)
+    print(f"监控目录: {LOG_DIR}")
+    observer.schedule(event_handler, path=LOG_DIR, recursive=False)
     observer.start()
 
-    return observer
+    return observer, tailer
 
 
 def get_ssh_connection():
@@ -149,25 +155,59 @@ def get_ssh_connection():
     return ssh_manager
 
 
-# 启动时设置文件监控
-observer = setup_file_watcher()
+observer = None
+tailer = None
+
 
+@app.on_event("startup")
+async def startup_event():
+    """应用启动：文件模式下监控日志文件，进程内模式下启动收集器"""
+    global app_loop, observer, tailer, collector
+    app_loop = asyncio.get_running_loop()
+    # 读文件在线程中进行，填入最近事件缓冲区在事件循环中进行
+    history = await asyncio.to_thread(load_recent_history)
+    hub.publish_many(history)
+    print(f"从日志文件载入最近 {len(history)} 条历史")
 
-async def log_stream() -> AsyncGenerator[str, None]:
-    """SSE日志流生成器"""
+    if collector_mode == "inprocess":
+        collector = LogCollector.from_config(
+            install_signals=False, sink=publish, **collector_options
+        )
+        threading.Thread(
+            target=collector.start_collection, name="log-collector", daemon=True
+        ).start()
+        print("收集器以进程内模式运行，日志文件仅作归档")
+    else:
+        observer, tailer = setup_file_watcher()
+
+
+async def log_stream(
+    last_event_id: Optional[int] = None,
+) -> AsyncGenerator[bytes, None]:
+    """SSE日志流生成器，每个连接订阅广播中心
+
+    事件在发布时已编码为SSE帧，这里只合并积压的帧并写出；
+    带last_event_id（重连）时先补发缓冲区中之后的事件
+    """
+    subscriber = hub.subscribe(last_event_id)
     try:
         while True:
-            # 等待新的日志消息
-            log_data = await log_queue.get()
+            # 等待新的日志消息，被断开（处理过慢）时结束
+            frames = await subscriber.get_frames()
+            if frames is None:
+                print(f"日志流{subscriber.id}处理过慢，已断开")
+                break
+            yield frames
 
-            # 格式化为SSE格式
-            sse_data = f"data: {json.dumps(log_data)}\n\n"
-            yield sse_data
+            # 写入后等待一个间隔，期间到达的事件在下一次合并写出
+            await asyncio.sleep(STREAM_TICK)
 
     except asyncio.CancelledError:
         print("日志流已断开")
     except Exception as e:
         print(f"日志流错误: {e}")
+    finally:
+        hub.unsubscribe(subscriber)
 
 
 @app.get("/")
@@ -481,6 +521,7 @@ async def get_index():
         let isConnected = false;
         let currentFilter = 'all';
         let logCount = 0;
+        let lastEventId = '';
         
         const logContainer = document.getElementById('logContainer');
         const statusIndicator = document.getElementById('statusIndicator');
@@ -570,7 +611,10 @@ async def get_index():
                 eventSource.close();
             }
             
-            eventSource = new EventSource('/logs/stream');
+            // 重连时带上最后收到的事件ID，服务端补发断线期间的日志
+            eventSource = new EventSource(
+                lastEventId ? `/logs/stream?last_event_id=${lastEventId}` : '/logs/stream'
+            );
             
             eventSource.onopen = function(event) {
                 console.log('SSE连接已建立');
@@ -578,6 +622,9 @@ async def get_index():
             };
             
             eventSource.onmessage = function(event) {
+                if (event.lastEventId) {
+                    lastEventId = event.lastEventId;
+                }
                 try {
                     const logData = JSON.parse(event.data);
                     addLogEntry(logData);
@@ -689,10 +736,19 @@ async def get_index():
 
 
 @app.get("/logs/stream")
-async def stream_logs(request: Request):
-    """SSE端点，流式传输日志"""
+async def stream_logs(request: Request, last_event_id: Optional[str] = None):
+    """SSE端点，流式传输日志
+
+    浏览器自动重连时在Last-Event-ID头中带上最后收到的事件ID，
+    页面自行重建连接时通过last_event_id参数传递
+    """
+    last_event_id = request.headers.get("last-event-id") or last_event_id
+    try:
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        last_event_id = None
     return StreamingResponse(
-        log_stream(),
+        log_stream(last_event_id),
         media_type="text/plain",
         headers={
             "Cache-Control": "no-cache",
@@ -702,43 +758,30 @@ async def stream_logs(request: Request):
     )
 
 
+@app.get("/logs/subscribers")
+async def get_stream_subscribers():
+    """SSE订阅者统计：连接数、每个连接的积压和丢弃数"""
+    return hub.get_stats()
+
+
 @app.get("/logs/history")
-async def get_log_history():
-    """获取历史日志"""
+async def get_log_history(limit: int = 50):
+    """获取历史日志：各日志源最近limit条，从内存中各日志源的缓冲区读取
+
+    limit超过每个日志源在内存中保存的条数时从日志文件末尾读取
+    """
     try:
         logs = []
+        if limit > hub.source_history:
+            for log_file, log_type in LOG_FILES.items():
+                if os.path.exists(log_file):
+                    lines = await asyncio.to_thread(read_last_lines, log_file, limit)
+                    logs.extend(read_entry(line, log_type) for line in lines)
+        else:
+            for source in list(hub.sources):
+                logs.extend(hub.recent(limit, source=source))
 
-        # 读取DTrace日志
-        if os.path.exists(DTRACE_LOG_FILE):
-            async with aiofiles.open(DTRACE_LOG_FILE, "r", encoding="utf-8") as f:
-                content = await f.read()
-                lines = [line.strip() for line in content.split("\n") if line.strip()]
-                for line in lines[-50:]:  # 最近50条
-                    logs.append(
-                        {
-                            "timestamp": datetime.now().isoformat(),
-                            "content": line,
-                            "type": "dtrace",
-                            "source": "DTRACE",
-                        }
-                    )
-
-        # 读取Suricata日志
-        if os.path.exists(SURICATA_LOG_FILE):
-            async with aiofiles.open(SURICATA_LOG_FILE, "r", encoding="utf-8") as f:
-                content = await f.read()
-                lines = [line.strip() for line in content.split("\n") if line.strip()]
-                for line in lines[-50:]:  # 最近50条
-                    logs.append(
-                        {
-                            "timestamp": datetime.now().isoformat(),
-                            "content": line,
-                            "type": "suricata",
-                            "source": "SURICATA",
-                        }
-                    )
-
-        # 按时间排序
+        # 按日志的真实时间排序
         logs.sort(key=lambda x: x["timestamp"])
 
         return {"logs": logs}
@@ -746,6 +789,28 @@ async def get_log_history():
         return {"error": f"读取日志失败: {str(e)}"}
 
 
+@app.get("/logs/range")
+async def get_log_range(
+    start: Optional[float] = None, end: Optional[float] = None, minutes: float = 5
+):
+    """按时间范围查询日志（epoch秒），未指定start时返回最近minutes分钟"""
+    try:
+        if start is None:
+            end = end or time.time()
+            start = end - minutes * 60
+
+        logs = []
+        for log_file, log_type in LOG_FILES.items():
+            # 通过时间索引定位，文件读取放到线程中避免阻塞事件循环
+            lines = await asyncio.to_thread(read_range, log_file, start, end)
+            logs.extend(read_entry(line, log_type) for line in lines)
+
+        logs.sort(key=lambda x: x["timestamp"])
+        return {"logs": logs}
+    except Exception as e:
+        return {"error": f"读取日志失败: {str(e)}"}
+
+
 @app.get("/rules/load")
 async def load_rules():
     """加载远程规则文件"""
@@ -754,7 +819,7 @@ async def load_rules():
         if not ssh.connected:
             raise HTTPException(status_code=500, detail="SSH连接未建立")
 
-        content = ssh.read_file("/data/su7/rules/suricata.rules")
+        content = await ssh.aread_file("/data/su7/rules/suricata.rules")
         return {"success": True, "content": content}
     except Exception as e:
         return {"success": False, "error": str(e)}
@@ -768,7 +833,7 @@ async def save_rules(request: RuleEditRequest):
         if not ssh.connected:
             raise HTTPException(status_code=500, detail="SSH连接未建立")
 
-        ssh.write_file("/data/su7/rules/suricata.rules", request.content)
+        await ssh.awrite_file("/data/su7/rules/suricata.rules", request.content)
         return {"success": True, "message": "规则保存成功"}
     except Exception as e:
         return {"success": False, "error": str(e)}
@@ -782,7 +847,7 @@ async def reload_rules():
         if not ssh.connected:
             raise HTTPException(status_code=500, detail="SSH连接未建立")
 
-        result = ssh.execute_command("/data/su7/bin/suricatasc -c reload-rules")
+        result = await ssh.aexecute_command("/data/su7/bin/suricatasc -c reload-rules")
 
         if result["success"]:
             # 检查返回结果是否包含成功信息
@@ -807,12 +872,30 @@ async def reload_rules():
         return {"success": False, "error": str(e)}
 
 
+@app.get("/ssh/stats")
+async def get_ssh_stats():
+    """获取SSH连接的性能统计"""
+    ssh = get_ssh_connection()
+    return {
+        "connected": ssh.connected,
+        "connection": ssh.get_connection_stats(),
+        "sftp": ssh.get_sftp_stats(),
+        "channels": ssh.get_scheduler_stats(),
+    }
+
+
 @app.on_event("shutdown")
 async def shutdown_event():
     """应用关闭时清理资源"""
+    if collector:
+        # 在线程中停止，等待队列和写入缓冲处理完
+        await asyncio.to_thread(collector.stop)
+
     if observer:
         observer.stop()
         observer.join()
+    if tailer:
+        tailer.stop()
 
     global ssh_manager
     if ssh_manager:
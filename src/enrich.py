@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+富化流水线
+把一批原始行解析并格式化为输出条目（正则解析、NDJSON序列化）是CPU密集的，
+受GIL限制收集器只能用一个核。该阶段把整批行（而不是单行）交给进程池处理，
+结果按各日志源提交的顺序交付；进程池未启用或已满时在当前线程中直接处理
+"""
+
+import multiprocessing
+import threading
+from collections import deque
+from concurrent.futures import BrokenExecutor, Future, ProcessPoolExecutor
+
+from src.log_parser import parse_line, to_ndjson
+
+OUTPUT_TEXT = "text"
+OUTPUT_NDJSON = "ndjson"
+
+
+def enrich_lines(name, lines, collected, output_format, label, parser):
+    """默认的富化函数：一批行 -> 输出条目（在工作进程中执行，必须是模块级函数）
+
+    collected为提交时的收集时间，条目时间不受排队影响
+    """
+    if output_format == OUTPUT_TEXT:
+        prefix = f"[**] [{collected}] {label}: "
+        return [prefix + line for line in lines]
+    return [to_ndjson(parse_line(name, line, collected, parser)) for line in lines]
+
+
+class EnrichPipeline:
+    """富化阶段 - 进程池并行处理，按key（日志源）保持顺序交付
+
+    workers为0时不创建进程池；进程池中未完成的批次达到max_pending时，
+    新的批次在调用线程中处理，相当于对读取端施加背压
+    """
+
+    def __init__(self, workers=0, max_pending=None):
+        self.workers = workers
+        self.pool = None
+        if workers:
+            # 收集器中已有SSH等线程，使用spawn而不是fork创建工作进程
+            self.pool = ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        self.max_pending = max_pending or workers * 4
+        self.broken = False  # 工作进程异常退出后不再使用进程池
+        self.queues = {}  # key -> (deque[(Future, func, args, on_done)], 交付锁)
+        self.lock = threading.Lock()
+        self.in_flight = 0
+
+        # 统计
+        self.submitted = 0
+        self.pooled = 0
+        self.inline = 0  # 在调用线程中处理的批次数
+        self.errors = 0
+
+    def submit(self, key, func, args, on_done):
+        """提交一批：func(*args)的结果按同一key的提交顺序交给on_done(result)
+
+        func为None表示没有需要处理的数据（例如只携带恢复位置），结果为空列表
+        """
+        self.submitted += 1
+        use_pool = False
+        if func is not None and self.pool is not None and not self.broken:
+            with self.lock:
+                use_pool = self.in_flight < self.max_pending
+                if use_pool:
+                    self.in_flight += 1
+
+        if use_pool:
+            self.pooled += 1
+            try:
+                future = self.pool.submit(func, *args)
+            except BrokenExecutor as e:
+                future = Future()
+                future.set_exception(e)
+        else:
+            # 在调用线程中处理，结果包装为已完成的Future，与进程池结果统一交付
+            future = Future()
+            try:
+                if func is not None:
+                    self.inline += 1
+                future.set_result(func(*args) if func is not None else [])
+            except Exception as e:
+                future.set_exception(e)
+
+        with self.lock:
+            if key not in self.queues:
+                self.queues[key] = (deque(), threading.Lock())
+            self.queues[key][0].append((future, func, args, on_done))
+        if use_pool:
+            # 若future已完成，回调会立即在当前线程中执行
+            future.add_done_callback(lambda _: self._finished(key))
+        else:
+            self._deliver(key)
+
+    def _finished(self, key):
+        with self.lock:
+            self.in_flight -= 1
+        self._deliver(key)
+
+    def _deliver(self, key):
+        """按顺序交付key已完成的批次；队首未完成时停止，等它完成后再继续"""
+        queue, lock = self.queues[key]
+        # 持有该key的锁调用回调，保证同一日志源的交付不会交错
+        with lock:
+            while queue and queue[0][0].done():
+                future, func, args, on_done = queue.popleft()
+                try:
+                    try:
+                        result = future.result()
+                    except BrokenExecutor as e:
+                        # 进程池不可用：这一批改在当前线程处理，之后的批次不再提交到进程池
+                        if not self.broken:
+                            print(f"富化进程池不可用，改为在本线程处理: {e}")
+                        self.broken = True
+                        self.inline += 1
+                        result = func(*args)
+                    on_done(result)
+                except Exception as e:
+                    self.errors += 1
+                    print(f"[{key}] 富化处理失败: {e}")
+
+    def close(self):
+        """等待所有批次处理完并交付"""
+        if self.pool is not None:
+            self.pool.shutdown(wait=True)
+        for key in list(self.queues):
+            self._deliver(key)
+
+    def get_stats(self):
+        with self.lock:
+            pending = sum(len(queue) for queue, _ in self.queues.values())
+        return {
+            "workers": self.workers,
+            "broken": self.broken,
+            "submitted": self.submitted,
+            "pooled": self.pooled,
+            "inline": self.inline,
+            "in_flight": self.in_flight,
+            "pending": pending,
+            "errors": self.errors,
+        }
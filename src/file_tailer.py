@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地日志文件tail
+由应用事件循环中的一个长期任务读取所有日志文件；文件监控线程只通过
+loop.call_soon_threadsafe通知哪个文件有变化，不在监控线程中创建事件循环或读取。
+两次读取之间到达的多个修改通知合并为一次读取；每个文件保持打开当前inode的句柄并记录已读偏移，
+轮转（inode变化）时与tail -F一样先把旧文件读到末尾再切换到新文件开头，
+轮转前写入但尚未读取的内容不会丢失；截断时从开头读取，已读过的内容不会重复推送。
+文件以二进制方式按块读取，不完整的尾部字节留到下一次读取再切分和增量解码；
+每次唤醒每个文件最多读取max_read_bytes，没读完的留到下一轮，
+突发写入的大量数据不会长时间占用事件循环，内存占用也只与块大小有关
+"""
+
+import asyncio
+import os
+
+from src.line_reader import LineSplitter
+from src.log_parser import read_entry
+
+
+def read_last_lines(path, count, max_bytes=1024 * 1024):
+    """读取文件末尾最多count行（只读最后max_bytes字节），启动时填充最近事件缓冲区"""
+    with open(path, "rb") as f:
+        size = f.seek(0, os.SEEK_END)
+        f.seek(max(size - max_bytes, 0))
+        data = f.read()
+    if size > max_bytes:
+        # 第一行可能不完整
+        data = data[data.find(b"\n") + 1 :]
+    lines = [line.strip() for line in data.decode("utf-8", "ignore").split("\n")]
+    return [line for line in lines if line][-count:]
+
+
+class TailState:
+    """单个文件的读取位置"""
+
+    def __init__(self, log_type, file=None, inode=None, offset=0):
+        self.log_type = log_type
+        self.file = file  # 当前inode的只读句柄，轮转后仍指向旧文件直到读完
+        self.inode = inode
+        self.offset = offset  # 已读取的字节数（含尚未成行的尾部）
+        self.splitter = LineSplitter()
+        self.reads = 0
+        self.bytes = 0
+        self.lines = 0
+        self.deferred = 0  # 达到单次读取上限、留到下一轮的次数
+        self.rotations = 0
+
+
+class FileTailer:
+    """事件循环内的文件tail任务"""
+
+    def __init__(
+        self,
+        log_files,
+        publish,
+        loop=None,
+        chunk_size=64 * 1024,
+        max_read_bytes=1024 * 1024,
+    ):
+        self.log_files = log_files  # {文件路径: 日志类型}
+        self.publish = publish  # 在事件循环线程中调用，参数为一批条目
+        self.loop = loop
+        self.chunk_size = chunk_size  # 每次read的字节数
+        self.max_read_bytes = max_read_bytes  # 每次唤醒每个文件最多读取的字节数
+        self.states = {}
+        self.dirty = set()  # 有修改通知、等待读取的文件
+        self.wakeup = None
+        self.task = None
+
+        # 统计
+        self.notifications = 0
+
+    def start(self):
+        """从各文件当前末尾开始跟随，必须在事件循环中调用"""
+        self.loop = self.loop or asyncio.get_running_loop()
+        self.wakeup = asyncio.Event()
+        for path, log_type in self.log_files.items():
+            f = open(path, "rb")
+            stat = os.fstat(f.fileno())
+            self.states[os.path.abspath(path)] = TailState(
+                log_type, f, stat.st_ino, stat.st_size
+            )
+        self.task = self.loop.create_task(self.run())
+
+    def notify(self, path):
+        """文件有变化（可在任意线程调用）；不是监控的文件时忽略"""
+        path = os.path.abspath(path)
+        if path in self.states:
+            self.loop.call_soon_threadsafe(self._notified, path)
+
+    def _notified(self, path):
+        self.notifications += 1
+        self._mark(path)
+
+    def _mark(self, path):
+        self.dirty.add(path)
+        self.wakeup.set()
+
+    async def run(self):
+        while True:
+            await self.wakeup.wait()
+            self.wakeup.clear()
+            # 取走当前所有待读文件，读取期间的新通知留到下一轮
+            paths, self.dirty = self.dirty, set()
+            for path in paths:
+                try:
+                    await self.read(path)
+                except Exception as e:
+                    print(f"读取{self.states[path].log_type}文件时出错: {e}")
+                # 每个文件读完一轮后让出事件循环，SSE连接的写出不会被突发数据阻塞
+                await asyncio.sleep(0)
+
+    async def read(self, path):
+        """按块读取文件新增内容，每块切出的完整行作为一批推送"""
+        state = self.states[path]
+        try:
+            inode = os.stat(path).st_ino
+        except FileNotFoundError:
+            inode = None  # 轮转过程中新文件尚未创建，创建时会再次通知
+
+        budget = self.max_read_bytes
+        if state.file is not None:
+            size = os.fstat(state.file.fileno()).st_size
+            if inode == state.inode and size < state.offset:
+                # 被截断：从开头读取
+                state.offset = 0
+                state.splitter = LineSplitter()
+                state.rotations += 1
+            # 轮转后旧句柄仍指向旧文件，先读完轮转前写入的内容
+            budget = await self.read_chunks(state, budget)
+            if not budget:
+                self.defer(state, path)
+                return
+            if inode == state.inode:
+                return
+            # 旧文件最后一行可能没有换行符，轮转后不会再写入，直接输出
+            self.emit(state, state.splitter.flush())
+            state.file.close()
+            state.file = None
+
+        if inode is None:
+            return
+        # 切换到新文件，从开头读取
+        try:
+            state.file = open(path, "rb")
+        except FileNotFoundError:
+            return
+        state.inode = os.fstat(state.file.fileno()).st_ino
+        state.offset = 0
+        state.splitter = LineSplitter()
+        state.rotations += 1
+        if not await self.read_chunks(state, budget):
+            self.defer(state, path)
+
+    async def read_chunks(self, state, budget):
+        """从已读偏移按块读到文件末尾，最多读budget字节；返回剩余额度，为0表示没读完"""
+        f = state.file
+        f.seek(state.offset)
+        while budget > 0:
+            data = await self.loop.run_in_executor(
+                None, f.read, min(self.chunk_size, budget)
+            )
+            if not data:
+                return budget
+            state.offset += len(data)
+            state.bytes += len(data)
+            state.reads += 1
+            budget -= len(data)
+            self.emit(state, state.splitter.feed(data))
+        return 0
+
+    def defer(self, state, path):
+        """达到单次读取上限：先处理其他文件和连接，下一轮继续读"""
+        state.deferred += 1
+        self._mark(path)
+
+    def emit(self, state, lines):
+        if not lines:
+            return
+        state.lines += len(lines)
+        # 使用日志自身的时间戳（NDJSON记录或收集时间）
+        self.publish([read_entry(line, state.log_type) for line in lines])
+
+    def stop(self):
+        if self.task:
+            self.task.cancel()
+        for state in self.states.values():
+            if state.file is not None:
+                state.file.close()
+                state.file = None
+
+    def get_stats(self):
+        return {
+            "notifications": self.notifications,
+            "files": {
+                path: {
+                    "type": state.log_type,
+                    "inode": state.inode,
+                    "offset": state.offset,
+                    "pending_bytes": len(state.splitter.buffer),
+                    "reads": state.reads,
+                    "bytes": state.bytes,
+                    "lines": state.lines,
+                    "deferred": state.deferred,
+                    "rotations": state.rotations,
+                }
+                for path, state in self.states.items()
+            },
+        }
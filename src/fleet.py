@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多主机收集
+对配置中的每台传感器使用一个SSH连接和一个LogCollector，同样的日志源写入
+各主机自己的目录（log_dir/<主机名>/）；连接和启动以有界并行度进行。
+可选地把所有主机的条目按时间戳归并为一个全局有序的流（merged.log），
+允许各主机在lateness秒内乱序到达
+"""
+
+import functools
+import heapq
+import itertools
+import logging
+import signal
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from src.batch_writer import BatchWriter
+from src.log_collector import (
+    ENGINE_SELECT,
+    OUTPUT_NDJSON,
+    OUTPUT_TEXT,
+    LogCollector,
+)
+from src.log_parser import to_ndjson
+from src.source_registry import load_config, load_hosts
+from src.ssh_manager import get_ssh_manager
+from src.tail_mux import TailMultiplexer
+from src.timestamp import format_timestamp
+
+LATENESS = 5.0  # 默认允许的乱序时间（秒）
+
+
+class MergedStream:
+    """多主机条目的k路归并
+
+    各主机推入的条目放入以(时间戳, 序号)为键的堆，时间戳早于“当前时间-lateness”
+    的条目按顺序输出；在此之后才到达的更早条目记为迟到，立即输出
+    """
+
+    def __init__(
+        self,
+        path,
+        writer,
+        lateness=LATENESS,
+        output_format=OUTPUT_TEXT,
+        sink=None,
+        interval=0.2,
+    ):
+        self.path = Path(path)
+        self.writer = writer
+        self.lateness = lateness
+        self.output_format = output_format
+        self.sink = sink  # 可选：归并后的条目同时交给sink
+        self.interval = interval
+
+        self.heap = []
+        self.counter = itertools.count()  # 同一时间戳按到达顺序输出
+        self.lock = threading.Lock()
+        self.last = ""  # 最近输出条目的时间戳
+        self.stop_event = threading.Event()
+        self.thread = None
+
+        # 统计
+        self.pushed = 0
+        self.emitted = 0
+        self.late = 0
+        self.max_pending = 0
+
+    def push(self, host, entries):
+        """推入一台主机的一批条目（read_entry格式）"""
+        with self.lock:
+            for entry in entries:
+                heapq.heappush(
+                    self.heap, (entry["timestamp"], next(self.counter), host, entry)
+                )
+            self.pushed += len(entries)
+            self.max_pending = max(self.max_pending, len(self.heap))
+
+    def format(self, host, entry):
+        if self.output_format == OUTPUT_NDJSON:
+            return to_ndjson({"host": host, **entry})
+        return f"[{host}] {entry['content']}"
+
+    def flush(self, final=False):
+        """输出已经超过乱序窗口的条目，final为True时输出全部"""
+        # 条目时间戳为ISO格式，直接按字符串比较
+        watermark = format_timestamp(time.time() - self.lateness).replace(" ", "T")
+        ready = []
+        with self.lock:
+            while self.heap and (final or self.heap[0][0] <= watermark):
+                timestamp, _, host, entry = heapq.heappop(self.heap)
+                if timestamp < self.last:
+                    self.late += 1
+                else:
+                    self.last = timestamp
+                ready.append((host, entry))
+        if not ready:
+            return
+
+        self.writer.write_many(
+            self.path, [self.format(host, entry) for host, entry in ready]
+        )
+        self.emitted += len(ready)
+        if self.sink is not None:
+            self.sink([{**entry, "host": host} for host, entry in ready])
+
+    def start(self):
+        def flush_worker():
+            while not self.stop_event.wait(self.interval):
+                self.flush()
+
+        self.thread = threading.Thread(target=flush_worker, daemon=True)
+        self.thread.start()
+
+    def close(self):
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join(timeout=3)
+        self.flush(final=True)
+
+    def get_stats(self):
+        return {
+            "lateness": self.lateness,
+            "pushed": self.pushed,
+            "emitted": self.emitted,
+            "pending": len(self.heap),
+            "max_pending": self.max_pending,
+            "late": self.late,
+        }
+
+
+class FleetCollector:
+    """多主机日志收集器 - 每台主机一个SSH连接和一个LogCollector"""
+
+    def __init__(
+        self,
+        hosts,
+        sources=None,
+        log_dir="logs",
+        parallel=8,
+        merge=False,
+        lateness=LATENESS,
+        ssh_factory=get_ssh_manager,
+        sink=None,
+        install_signals=True,
+        **options,
+    ):
+        self.hosts = hosts
+        self.source_configs = sources
+        self.log_dir = Path(log_dir)
+        self.log_dir.mkdir(exist_ok=True)
+        self.parallel = parallel  # 同时连接和启动的主机数上限
+        self.ssh_factory = ssh_factory  # host -> SSHManager，测试时可替换
+        self.options = options  # 传给各主机LogCollector的参数
+        self.running = True
+        self.collectors = {}
+
+        logging.basicConfig(
+            level=logging.INFO,
+            format="%(asctime)s - %(levelname)s - %(message)s",
+            handlers=[
+                logging.FileHandler(self.log_dir / "collector.log"),
+                logging.StreamHandler(),
+            ],
+        )
+        self.logger = logging.getLogger(__name__)
+
+        # 所有主机共用一个多路复用引擎
+        self.multiplexer = None
+        if options.get("tail_engine") == ENGINE_SELECT:
+            self.multiplexer = TailMultiplexer()
+
+        self.writer = None
+        self.merged = None
+        if merge:
+            self.writer = BatchWriter()
+            self.merged = MergedStream(
+                self.log_dir / "merged.log",
+                self.writer,
+                lateness,
+                options.get("output_format", OUTPUT_TEXT),
+                sink,
+            )
+
+        if install_signals:
+            signal.signal(signal.SIGINT, self.signal_handler)
+            signal.signal(signal.SIGTERM, self.signal_handler)
+
+    @classmethod
+    def from_config(cls, path=None, **overrides):
+        """按配置文件创建，[fleet]段为多主机参数，[collector]段传给各主机"""
+        options, sources = load_config(path)
+        fleet_options, hosts = load_hosts(path)
+        return cls(hosts, sources, **{**options, **fleet_options, **overrides})
+
+    def signal_handler(self, signum, frame):
+        self.logger.info(f"收到退出信号 {signum}，正在停止所有主机的收集...")
+        self.stop()
+        sys.exit(0)
+
+    def start_host(self, host, names=None):
+        """连接一台主机并启动其收集，失败时返回None"""
+        try:
+            ssh = self.ssh_factory(host)
+            sink = None
+            if self.merged is not None:
+                sink = functools.partial(self.merged.push, host.name)
+            collector = LogCollector(
+                log_dir=self.log_dir / host.name,
+                sources=self.source_configs,
+                install_signals=False,
+                sink=sink,
+                ssh=ssh,
+                host=host.name,
+                multiplexer=self.multiplexer,
+                **self.options,
+            )
+        except Exception as e:
+            self.logger.error(f"✗ 主机{host.name}初始化失败: {e}")
+            return None
+        if not collector.start(names):
+            collector.stop()
+            return None
+        return collector
+
+    def start(self, names=None):
+        """以有界并行度连接并启动所有主机，返回成功启动的主机数"""
+        if self.merged is not None:
+            self.merged.start()
+        with ThreadPoolExecutor(
+            max_workers=self.parallel, thread_name_prefix="fleet-start"
+        ) as pool:
+            results = pool.map(lambda host: self.start_host(host, names), self.hosts)
+            for host, collector in zip(self.hosts, results):
+                if collector is not None:
+                    self.collectors[host.name] = collector
+        self.logger.info(f"✓ 已启动 {len(self.collectors)}/{len(self.hosts)} 台主机")
+        return len(self.collectors)
+
+    def start_collection(self, names=None):
+        """启动所有主机的收集并运行主循环"""
+        self.logger.info("=" * 80)
+        self.logger.info(f"多主机日志收集启动: {len(self.hosts)} 台主机")
+        self.logger.info(f"日志保存目录: {self.log_dir.absolute()}")
+        self.logger.info("=" * 80)
+
+        if not self.start(names):
+            self.logger.error("✗ 没有可用的主机，退出")
+            self.stop()
+            return
+
+        try:
+            while self.running:
+                time.sleep(1)
+                for collector in self.collectors.values():
+                    collector.periodic()
+        except KeyboardInterrupt:
+            self.logger.info("\n收到键盘中断，正在停止...")
+            self.stop()
+
+    def stop(self):
+        """停止所有主机的收集，最后输出归并流中剩余的条目"""
+        if not self.running:
+            return
+        self.running = False
+        with ThreadPoolExecutor(
+            max_workers=self.parallel, thread_name_prefix="fleet-stop"
+        ) as pool:
+            list(pool.map(LogCollector.stop, self.collectors.values()))
+        if self.multiplexer is not None:
+            self.multiplexer.stop()
+        if self.merged is not None:
+            self.merged.close()
+            self.writer.close()
+
+    def get_stats(self):
+        return {
+            "hosts": {
+                name: collector.get_log_stats()
+                for name, collector in self.collectors.items()
+            },
+            "merged": self.merged.get_stats() if self.merged else None,
+        }
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+有界行队列
+SSH读取线程只负责把行放入各日志源的有界队列，由独立的消费线程批量取出处理，
+慢消费者不再直接阻塞通道读取；队列满时按溢出策略阻塞或丢弃并计数
+"""
+
+import threading
+import time
+from collections import deque
+
+BLOCK = "block"  # 队列满时阻塞读取线程（反压到远程）
+DROP_OLDEST = "drop-oldest"  # 丢弃最旧的行
+DROP_NEWEST = "drop-newest"  # 丢弃新到的行
+POLICIES = (BLOCK, DROP_OLDEST, DROP_NEWEST)
+
+
+class LineQueue:
+    """单个日志源的有界环形队列"""
+
+    def __init__(self, name, maxsize=10000, policy=BLOCK):
+        if policy not in POLICIES:
+            raise Exception(f"未知的溢出策略: {policy}")
+        self.name = name
+        self.maxsize = maxsize
+        self.policy = policy
+        self.items = deque()
+        self.cond = threading.Condition()
+        self.wakeup = None  # 消费线程的唤醒事件
+        self.closed = False
+
+        # 统计
+        self.enqueued = 0
+        self.dequeued = 0
+        self.dropped = 0
+        self.max_depth = 0
+        self.blocked_time = 0.0
+
+    def put_many(self, lines):
+        """放入一批行，按溢出策略处理队列已满的情况"""
+        with self.cond:
+            if self.policy == BLOCK:
+                start = None
+                remaining = lines
+                while remaining and not self.closed:
+                    space = self.maxsize - len(self.items)
+                    if space <= 0:
+                        if start is None:
+                            start = time.monotonic()
+                        self._notify()
+                        self.cond.wait(0.5)
+                        continue
+                    self.items.extend(remaining[:space])
+                    self.enqueued += min(space, len(remaining))
+                    self.max_depth = max(self.max_depth, len(self.items))
+                    remaining = remaining[space:]
+                if start is not None:
+                    self.blocked_time += time.monotonic() - start
+                # 队列已关闭时剩余的行无法放入
+                self.dropped += len(remaining)
+            elif self.policy == DROP_OLDEST:
+                self.items.extend(lines)
+                self.enqueued += len(lines)
+                overflow = len(self.items) - self.maxsize
+                for _ in range(max(overflow, 0)):
+                    self.items.popleft()
+                self.dropped += max(overflow, 0)
+            else:
+                space = max(self.maxsize - len(self.items), 0)
+                self.items.extend(lines[:space])
+                self.enqueued += min(space, len(lines))
+                self.dropped += max(len(lines) - space, 0)
+
+            self.max_depth = max(self.max_depth, len(self.items))
+        self._notify()
+
+    def put(self, line):
+        self.put_many([line])
+
+    def get_batch(self, max_items=1000):
+        """取出最多max_items行（不阻塞）"""
+        with self.cond:
+            count = min(max_items, len(self.items))
+            batch = [self.items.popleft() for _ in range(count)]
+            self.dequeued += count
+            if count:
+                self.cond.notify_all()
+            return batch
+
+    def close(self):
+        """关闭队列，唤醒被阻塞的读取线程"""
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
+    def _notify(self):
+        if self.wakeup is not None:
+            self.wakeup.set()
+
+    def __len__(self):
+        return len(self.items)
+
+    def get_stats(self):
+        with self.cond:
+            return {
+                "depth": len(self.items),
+                "max_depth": self.max_depth,
+                "maxsize": self.maxsize,
+                "policy": self.policy,
+                "enqueued": self.enqueued,
+                "dequeued": self.dequeued,
+                "dropped": self.dropped,
+                "blocked_time": round(self.blocked_time, 3),
+            }
+
+
+class QueueDrainer:
+    """消费线程 - 轮流从各队列批量取出行交给对应的处理函数"""
+
+    def __init__(self, batch_size=1000, name="queue-drainer"):
+        self.batch_size = batch_size
+        self.name = name
+        self.queues = []  # [(队列, 处理函数, 每批最大行数)]
+        self.wakeup = threading.Event()
+        self.running = False
+        self.thread = None
+        self.errors = 0
+
+    def add(self, queue, handler, batch_size=None):
+        """注册队列，handler接收一批行；batch_size默认使用消费线程的设置"""
+        queue.wakeup = self.wakeup
+        self.queues.append((queue, handler, batch_size or self.batch_size))
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self.thread.start()
+
+    def _drain_once(self):
+        """每个队列取一批，返回本轮是否处理了数据"""
+        busy = False
+        for queue, handler, batch_size in self.queues:
+            batch = queue.get_batch(batch_size)
+            if not batch:
+                continue
+            busy = True
+            try:
+                handler(batch)
+            except Exception as e:
+                self.errors += 1
+                print(f"处理{queue.name}队列数据失败: {e}")
+        return busy
+
+    def _run(self):
+        while self.running:
+            self.wakeup.wait(1.0)
+            self.wakeup.clear()
+            while self._drain_once():
+                pass
+
+    def stop(self, timeout=5):
+        """停止消费线程，并处理完队列中剩余的行"""
+        self.running = False
+        for queue, _, _ in self.queues:
+            queue.close()
+        self.wakeup.set()
+        if self.thread:
+            self.thread.join(timeout)
+        while self._drain_once():
+            pass
+
+    def get_stats(self):
+        return {queue.name: queue.get_stats() for queue, _, _ in self.queues}
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+按块读取的行读取器
+从SSH通道按大块读取数据，在字节层面切分行，并使用增量UTF-8解码器，
+保证“当前流”这类多字节中文不会在块边界被截断；
+以及远程代理(tail_agent.py)输出的压缩帧读取器
+"""
+
+import codecs
+import socket
+import struct
+import time
+import zlib
+
+# 与tail_agent.py中的帧格式保持一致: 压缩数据长度, 行数, 下次读取偏移, inode
+FRAME_HEADER = struct.Struct(">IIQQ")
+
+
+class LineSplitter:
+    """字节行切分器 - 不完整的尾部字节保留到下一次输入"""
+
+    def __init__(self, encoding="utf-8", max_line_bytes=1024 * 1024):
+        self.buffer = bytearray()  # 复用的缓冲区，只在尾部追加、头部删除
+        self.decoder = codecs.getincrementaldecoder(encoding)(errors="ignore")
+        self.max_line_bytes = max_line_bytes
+
+    def feed(self, data):
+        """输入一块字节数据，返回其中完整的非空行列表"""
+        self.buffer += data
+
+        end = self.buffer.rfind(b"\n")
+        if end < 0:
+            # 超长的无换行数据强制作为一行输出，增量解码器会保留被截断的多字节字符
+            if len(self.buffer) > self.max_line_bytes:
+                text = self.decoder.decode(bytes(self.buffer))
+                del self.buffer[:]
+                text = text.strip()
+                return [text] if text else []
+            return []
+
+        text = self.decoder.decode(bytes(self.buffer[: end + 1]))
+        del self.buffer[: end + 1]
+        return [line for line in (part.strip() for part in text.split("\n")) if line]
+
+    def flush(self):
+        """输出缓冲区中剩余的最后一行（通道关闭时调用）"""
+        text = self.decoder.decode(bytes(self.buffer), final=True)
+        del self.buffer[:]
+        text = text.strip()
+        return [text] if text else []
+
+
+class ReaderStats:
+    """读取吞吐统计"""
+
+    def __init__(self):
+        self.start_time = time.monotonic()
+        self.lines = 0
+        self.bytes = 0
+        self.chunks = 0
+        self.batches = 0
+
+    def as_dict(self):
+        elapsed = max(time.monotonic() - self.start_time, 1e-9)
+        return {
+            "lines": self.lines,
+            "bytes": self.bytes,
+            "chunks": self.chunks,
+            "batches": self.batches,
+            "elapsed": round(elapsed, 3),
+            "lines_per_sec": round(self.lines / elapsed, 1),
+            "bytes_per_sec": round(self.bytes / elapsed, 1),
+        }
+
+
+class ChannelLineReader:
+    """SSH通道行读取器 - 按块recv并批量产出行"""
+
+    def __init__(self, channel, chunk_size=64 * 1024, batch_size=1024):
+        self.channel = channel
+        self.chunk_size = chunk_size
+        self.batch_size = batch_size
+        self.splitter = LineSplitter()
+        self.stats = ReaderStats()
+
+    def iter_batches(self, stop_event=None):
+        """持续读取通道，每次产出一批行；通道关闭（EOF）或stop_event被设置时结束"""
+        while stop_event is None or not stop_event.is_set():
+            try:
+                data = self.channel.recv(self.chunk_size)
+            except socket.timeout:
+                # 超时是正常的，继续循环
+                continue
+
+            if not data:
+                yield from self.finish()
+                break
+            yield from self.feed(data)
+
+    def feed(self, data):
+        """处理已读到的一块数据，产出其中的完整行（多路复用引擎直接调用）"""
+        self.stats.chunks += 1
+        self.stats.bytes += len(data)
+        lines = self.splitter.feed(data)
+        if lines:
+            yield from self._emit(lines)
+
+    def finish(self):
+        """通道关闭时产出缓冲区中剩余的最后一行"""
+        lines = self.splitter.flush()
+        if lines:
+            yield from self._emit(lines)
+
+    def get_stats(self):
+        return self.stats.as_dict()
+
+    def _emit(self, lines):
+        """按batch_size切分后产出"""
+        self.stats.lines += len(lines)
+        for i in range(0, len(lines), self.batch_size):
+            self.stats.batches += 1
+            yield lines[i : i + self.batch_size]
+
+
+class ChannelFrameReader:
+    """远程代理帧读取器 - 解析长度前缀的zlib压缩帧，每帧产出一批行"""
+
+    def __init__(self, channel, chunk_size=64 * 1024):
+        self.channel = channel
+        self.chunk_size = chunk_size
+        self.buffer = bytearray()
+        self.stats = ReaderStats()
+        self.frames = 0
+        self.raw_bytes = 0  # 解压后的字节数
+        self.offset = None  # 最近一帧携带的下次读取偏移
+        self.inode = None
+
+    def iter_batches(self, stop_event=None):
+        """持续读取通道，每解出一帧产出该帧的行（心跳帧只更新偏移）"""
+        while stop_event is None or not stop_event.is_set():
+            try:
+                data = self.channel.recv(self.chunk_size)
+            except socket.timeout:
+                continue
+            if not data:
+                break
+            yield from self.feed(data)
+
+    def feed(self, data):
+        """处理已读到的一块数据，逐帧产出行（多路复用引擎直接调用）
+
+        每帧的偏移在产出该帧之前更新，调用方处理完一帧再取下一帧
+        """
+        header_size = FRAME_HEADER.size
+        self.stats.chunks += 1
+        self.stats.bytes += len(data)
+        self.buffer += data
+
+        while len(self.buffer) >= header_size:
+            length, count, offset, inode = FRAME_HEADER.unpack_from(self.buffer)
+            if len(self.buffer) < header_size + length:
+                break
+            payload = bytes(self.buffer[header_size : header_size + length])
+            del self.buffer[: header_size + length]
+
+            self.frames += 1
+            self.offset = offset
+            self.inode = inode
+            if not count:
+                yield []
+                continue
+
+            raw = zlib.decompress(payload)
+            self.raw_bytes += len(raw)
+            lines = raw.decode("utf-8", errors="ignore").split("\n")
+            self.stats.lines += len(lines)
+            self.stats.batches += 1
+            yield lines
+
+    def finish(self):
+        """通道关闭时调用；不完整的帧无法解析，直接丢弃"""
+        return iter(())
+
+    def get_stats(self):
+        stats = self.stats.as_dict()
+        stats.update(
+            {
+                "frames": self.frames,
+                "raw_bytes": self.raw_bytes,
+                "compression_ratio": (
+                    round(self.raw_bytes / self.stats.bytes, 2)
+                    if self.stats.bytes
+                    else 0.0
+                ),
+            }
+        )
+        return stats
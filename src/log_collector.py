@@ -6,36 +6,158 @@
 """
 
 import time
-import threading
+import functools
 import signal
 import sys
-from datetime import datetime
+import threading
 from pathlib import Path
 import logging
+from src.aggregator import StreamAggregator
+from src.backfill import Backfill
+from src.batch_writer import FSYNC_NEVER, BatchWriter
+from src.channel_scheduler import STREAMING
+from src.checkpoint import CheckpointStore
+from src.enrich import OUTPUT_NDJSON, OUTPUT_TEXT, EnrichPipeline, enrich_lines
+from src.line_queue import BLOCK, LineQueue, QueueDrainer
+from src.log_index import read_range
+from src.log_parser import read_entry, to_ndjson
+from src.remote_tail import LINE_START, NEXT_BYTE, AgentTail, FileTail
+from src.source_registry import FILE, SourceStats, load_config
 from src.ssh_manager import get_ssh_manager
+from src.tail_mux import TailMultiplexer
+from src.timestamp import format_timestamp
 
+# 输出格式：文本行或结构化的NDJSON（每行一个解析后的JSON记录）
+OUTPUT_FORMATS = (OUTPUT_TEXT, OUTPUT_NDJSON)
+
+# tail引擎
+ENGINE_THREAD = "thread"  # 每个tail一个线程
+ENGINE_SELECT = "select"  # 所有tail共用一个selectors事件循环线程
+TAIL_ENGINES = (ENGINE_THREAD, ENGINE_SELECT)
+
+
+class HostLogAdapter(logging.LoggerAdapter):
+    """多主机收集时在日志消息前加上主机名"""
+
+    def process(self, msg, kwargs):
+        return f"[{self.extra['host']}] {msg}", kwargs
+
+
+class Source:
+    """运行中的日志源：配置、输出文件、队列与统计"""
+
+    def __init__(self, config, log_dir, queue_size, overflow):
+        self.config = config
+        self.name = config.name
+        self.label = config.label
+        self.filter = config.filter
+        self.log_file = log_dir / config.output
+        # SSH读取线程只把行放入有界队列，由消费线程批量写入，慢写入不阻塞读取
+        self.queue = LineQueue(
+            config.name, config.queue_size or queue_size, config.overflow or overflow
+        )
+        self.stats = SourceStats()
+        # 已写入写入器的最新恢复位置（文件源），由检查点定期落盘
+        self.position = None
+        # 流式聚合（可选）：按探针统计并定期输出汇总，原始行只抽样保留
+        self.aggregator = None
+        if config.aggregate:
+            options = {} if config.aggregate is True else dict(config.aggregate)
+            try:
+                self.aggregator = StreamAggregator(
+                    **{"parser": config.parser, **options}
+                )
+            except TypeError as e:
+                raise Exception(f"日志源{config.name}的聚合配置错误: {e}")
 
-class LogCollector:
-    """实时日志收集器"""
 
-    def __init__(self, log_dir="logs"):
-        self.ssh = get_ssh_manager()
+class LogCollector:
+    """实时日志收集器 - 日志源由配置声明，所有日志源共用同一套处理流程"""
+
+    def __init__(
+        self,
+        log_dir="logs",
+        sources=None,
+        use_agent=False,
+        queue_size=10000,
+        overflow=BLOCK,
+        fsync=FSYNC_NEVER,
+        output_format=OUTPUT_TEXT,
+        max_log_size=100 * 1024 * 1024,
+        compress=True,
+        install_signals=True,
+        sink=None,
+        checkpoint_interval=5,
+        backfill_parallel=4,
+        tail_engine=ENGINE_THREAD,
+        ssh=None,
+        host=None,
+        multiplexer=None,
+        enrich_workers=0,
+        enricher=enrich_lines,
+    ):
+        if output_format not in OUTPUT_FORMATS:
+            raise Exception(f"未知的输出格式: {output_format}")
+        if tail_engine not in TAIL_ENGINES:
+            raise Exception(f"未知的tail引擎: {tail_engine}")
+        # 多主机收集时由FleetCollector传入各主机的SSH管理器
+        self.ssh = ssh or get_ssh_manager()
+        self.host = host
+        # 多路复用引擎：所有日志源由一个线程读取，空闲时没有定时唤醒；
+        # 多主机时共用FleetCollector的引擎，由其负责停止
+        self.multiplexer = None
+        self.owns_multiplexer = multiplexer is None
+        if tail_engine == ENGINE_SELECT:
+            self.multiplexer = multiplexer or TailMultiplexer()
+            self.ssh.multiplexer = self.multiplexer
         self.running = True
+        # 消费线程是否还写入队列中的行；停止时先处理完剩余的行再清除
+        self.accepting = True
+        # 使用远程批量代理（需要传感器上有python3），压缩传输并减少逐行开销
+        self.use_agent = use_agent
+        # 结构化输出时在收集阶段解析一次，下游直接使用字段和真实时间戳
+        self.output_format = output_format
+        # 进程内模式：每批条目除写入文件外直接交给sink（如Web服务的推送函数），
+        # 文件只作为归档
+        self.sink = sink
+
         self.threads = []
         self.log_dir = Path(log_dir)
         self.log_dir.mkdir(exist_ok=True)
 
-        # 日志文件路径
-        self.suricata_log_file = self.log_dir / "suricata_logs.log"
-        self.dtrace_log_file = self.log_dir / "dtrace_logs.log"
+        # 批量写入器：每个文件保持打开的句柄，按大小/时间批量写入；
+        # 写入时检查文件大小，超过max_log_size立即轮转，分段在后台压缩；
+        # 同时维护稀疏时间索引，按时间范围查询时直接定位
+        self.writer = BatchWriter(
+            fsync=fsync, rotate_bytes=max_log_size, compress=compress, index=True
+        )
 
-        # 文件锁，确保线程安全写入
-        self.suricata_lock = threading.Lock()
-        self.dtrace_lock = threading.Lock()
+        # 富化阶段：解析和格式化整批交给进程池（enrich_workers为0时在消费线程中处理），
+        # 每个日志源的结果按顺序写入；enricher必须是可被子进程导入的模块级函数
+        self.enrich = EnrichPipeline(enrich_workers)
+        self.enricher = enricher
+
+        # 文件源的读取位置定期保存，重启后先并行补齐停机期间的数据再实时跟随
+        self.checkpoints = CheckpointStore(self.log_dir / "checkpoints.json")
+        self.checkpoint_interval = checkpoint_interval
+        self.backfill_parallel = backfill_parallel
+
+        # 日志源（未指定时读取collector.toml），过滤规则尽量下推到远程
+        if sources is None:
+            _, sources = load_config()
+        self.sources = {
+            config.name: Source(config, self.log_dir, queue_size, overflow)
+            for config in sources
+        }
 
-        # 统计信息
-        self.suricata_count = 0
-        self.dtrace_count = 0
+        # 单个消费线程处理所有日志源的队列
+        self.drainer = QueueDrainer()
+        for source in self.sources.values():
+            self.drainer.add(
+                source.queue,
+                functools.partial(self.source_callback, source.name),
+                source.config.batch_size,
+            )
 
         # 设置日志格式
         logging.basicConfig(
@@ -47,24 +169,48 @@ class LogCollector:
             ],
         )
         self.logger = logging.getLogger(__name__)
+        if host:
+            self.logger = HostLogAdapter(self.logger, {"host": host})
+
+        # 注册信号处理器（嵌入其他服务时由宿主负责退出）
+        if install_signals:
+            signal.signal(signal.SIGINT, self.signal_handler)
+            signal.signal(signal.SIGTERM, self.signal_handler)
 
-        # 注册信号处理器
-        signal.signal(signal.SIGINT, self.signal_handler)
-        signal.signal(signal.SIGTERM, self.signal_handler)
+    @classmethod
+    def from_config(cls, path=None, **overrides):
+        """按配置文件创建收集器，overrides覆盖[collector]段中的参数"""
+        options, sources = load_config(path)
+        return cls(sources=sources, **{**options, **overrides})
 
     def signal_handler(self, signum, frame):
         """信号处理器，用于优雅退出"""
         self.logger.info(f"收到退出信号 {signum}，正在停止日志收集...")
         self.stop()
+        sys.exit(0)
 
     def stop(self):
         """停止日志收集"""
+        if not self.running:
+            return
         self.running = False
         self.logger.info("正在停止所有收集线程...")
 
         # 停止SSH tail命令
         if hasattr(self.ssh, "stop_tail_command"):
             self.ssh.stop_tail_command()
+        if self.multiplexer is not None and self.owns_multiplexer:
+            self.multiplexer.stop()
+
+        # 处理完队列中剩余的行，并写入所有缓冲，最后保存检查点
+        self.drainer.stop()
+        self.accepting = False
+        for source in self.sources.values():
+            if source.aggregator is not None:
+                self.emit_summary(source, force=True)
+        self.enrich.close()
+        self.writer.close()
+        self.save_checkpoints(flush=False)
 
         # 等待线程结束
         for thread in self.threads:
@@ -72,188 +218,428 @@ class LogCollector:
                 thread.join(timeout=3)
 
         self.logger.info("日志收集已停止")
-        self.logger.info(f"Suricata日志: {self.suricata_count} 行")
-        self.logger.info(f"DTrace日志: {self.dtrace_count} 行")
-        sys.exit(0)
-
-    def write_to_file(self, file_path, content, lock):
-        """线程安全地写入文件 - 与auto_add_log.py保持一致的写入方式"""
-        with lock:
-            try:
-                with open(file_path, "a") as f:
-                    f.write(content + "\n")
-            except Exception as e:
-                self.logger.error(f"写入文件 {file_path} 失败: {e}")
+        for source in self.sources.values():
+            self.logger.info(f"{source.label}日志: {source.stats.lines} 行")
+
+    def write_to_file(self, file_path, content):
+        """线程安全地写入文件 - 由批量写入器统一落盘"""
+        self.writer.write(file_path, content)
+
+    def write_marker(self, name, text):
+        """写入收集开始等标记行"""
+        if self.output_format == OUTPUT_TEXT:
+            entry = f"[**] [{format_timestamp()}] {text}"
+        else:
+            collected = format_timestamp()
+            entry = to_ndjson(
+                {
+                    "source": name,
+                    "ts": collected.replace(" ", "T"),
+                    "collected": collected,
+                    "fields": {"marker": True},
+                    "raw": text,
+                }
+            )
+        self.write_to_file(self.sources[name].log_file, entry)
 
-    def suricata_log_callback(self, line):
-        """Suricata日志回调函数"""
-        if not self.running:
+    def source_callback(self, name, lines):
+        """日志源通用回调：一批行统一格式化后批量写入"""
+        if not self.accepting:
             return
 
-        self.suricata_count += 1
-
-        # 生成带时间戳的日志条目，格式与auto_add_log.py一致
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
-        log_entry = f"[**] [{timestamp}] Suricata: {line}"
+        source = self.sources[name]
+        position = None
+        if source.config.type == FILE:
+            # 队列中夹带的恢复位置标记（见deliver）
+            positions = [item for item in lines if not isinstance(item, str)]
+            if positions:
+                position = positions[-1]
+                lines = [item for item in lines if isinstance(item, str)]
+
+        # 流式聚合：所有行计入统计，只写入抽样保留的行
+        kept = lines
+        if lines and source.aggregator is not None:
+            kept = source.aggregator.process(lines)
+            self.emit_summary(source)
+
+        # 富化可能在进程池中完成，同一日志源的批次按提交顺序写入；
+        # 只携带恢复位置的批次也排在之前的批次之后，检查点不会越过未写入的行
+        func = args = None
+        if kept:
+            func = self.enricher
+            args = (
+                name,
+                kept,
+                format_timestamp(),
+                self.output_format,
+                source.label,
+                source.config.parser,
+            )
+        self.enrich.submit(
+            name,
+            func,
+            args,
+            functools.partial(self.write_entries, source, lines, position),
+        )
 
+    def write_entries(self, source, lines, position, entries):
+        """写入富化后的一批条目（按日志源的提交顺序调用）"""
         # 写入本地文件
-        self.write_to_file(self.suricata_log_file, log_entry, self.suricata_lock)
+        if entries:
+            self.writer.write_many(source.log_file, entries)
 
-        # 控制台输出（可选）
-        if self.suricata_count % 10 == 0:  # 每10条日志输出一次状态
-            self.logger.info(f"Suricata日志已收集 {self.suricata_count} 行")
-
-    def dtrace_callback(self, line):
-        """DTrace回调函数"""
-        if not self.running:
+        # 这批行已交给写入器，之后的检查点可以包含该位置
+        if position is not None:
+            source.position = position
+        if not lines:
             return
 
-        self.dtrace_count += 1
-
-        # 生成带时间戳的日志条目，格式与auto_add_log.py一致
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
-        log_entry = f"[**] [{timestamp}] DTrace: {line}"
+        # 进程内模式：同一批条目直接推送，不经过文件和文件监控
+        if self.sink is not None and entries:
+            self.sink([read_entry(entry, source.name) for entry in entries])
 
-        # 写入本地文件
-        self.write_to_file(self.dtrace_log_file, log_entry, self.dtrace_lock)
+        # 控制台输出（可选）：每收集10条日志输出一次状态
+        before = source.stats.lines
+        source.stats.record(lines)
+        if source.stats.lines // 10 > before // 10:
+            self.logger.info(f"{source.label}日志已收集 {source.stats.lines} 行")
 
-        # 控制台输出（可选）
-        if self.dtrace_count % 10 == 0:  # 每10条日志输出一次状态
-            self.logger.info(f"DTrace日志已收集 {self.dtrace_count} 行")
+    def emit_summary(self, source, force=False):
+        """到达汇总间隔时把聚合汇总作为一行写入日志源的输出文件"""
+        summary = source.aggregator.summary(force=force)
+        if summary is None:
+            return
+        collected = format_timestamp()
+        if self.output_format == OUTPUT_TEXT:
+            entry = f"[**] [{collected}] {source.label}汇总: {to_ndjson(summary)}"
+        else:
+            entry = to_ndjson(
+                {
+                    "source": source.name,
+                    "ts": collected.replace(" ", "T"),
+                    "collected": collected,
+                    "fields": {"summary": summary},
+                    "raw": (
+                        f"{source.label}汇总: {summary['lines']} 行, "
+                        f"抽样保留 {summary['sampled']} 行"
+                    ),
+                }
+            )
+        # 排在已提交的富化批次之后写入
+        self.enrich.submit(
+            source.name, None, None, lambda _: self.write_summary(source, entry)
+        )
 
-    def start_suricata_collection(self):
-        """启动Suricata日志收集"""
-        self.logger.info("启动Suricata日志收集...")
+    def write_summary(self, source, entry):
+        self.writer.write(source.log_file, entry)
+        if self.sink is not None:
+            self.sink([read_entry(entry, source.name)])
+
+    def read_range(self, name, start=None, end=None):
+        """按收集时间（epoch秒）查询某个日志源的行，包括已轮转的分段"""
+        log_file = self.sources[name].log_file
+        self.writer.flush(log_file)
+        return read_range(log_file, start, end)
+
+    def resolve_command(self, config):
+        """替换命令中的{pid}：使用配置的pid，或在远程执行pid_command获取"""
+        command = config.command
+        if "{pid}" not in command:
+            return command
+        pid = config.pid
+        if not pid:
+            result = self.ssh.execute_command(config.pid_command)
+            output = result["stdout"].split() if result["success"] else []
+            if not output:
+                raise Exception(f"无法获取PID: {config.pid_command}")
+            pid = output[0]
+        return command.replace("{pid}", str(pid))
+
+    def deliver(self, source, lines, position):
+        """把一批行放入日志源队列，行之后附带读完这批行的恢复位置"""
+        if position is not None:
+            lines = lines + [position]
+        if lines:
+            source.queue.put_many(lines)
+
+    def save_checkpoints(self, flush=True):
+        """保存各文件源的检查点：先让写入器落盘，保证检查点之前的行都已写入"""
+        pending = {
+            name: source.position
+            for name, source in self.sources.items()
+            if source.position is not None
+        }
+        if not pending:
+            return
+        try:
+            if flush:
+                for name in pending:
+                    self.writer.flush(self.sources[name].log_file)
+            for name, position in pending.items():
+                self.checkpoints.update(name, position)
+            self.checkpoints.save()
+        except Exception as e:
+            self.logger.error(f"保存检查点失败: {e}")
+
+    def backfill(self, source, position, mode):
+        """从检查点并行补齐停机期间的数据，返回实时tail的起始位置"""
+        backfill = Backfill(
+            self.ssh,
+            source.config.path,
+            source.filter,
+            mode,
+            parallel=self.backfill_parallel,
+        )
         self.logger.info(
-            "监控命令: tail -f /var/log/suricata/suricata.log | grep '当前流'"
+            f"从检查点补齐{source.label}: inode {position['inode']}, "
+            f"偏移 {position['offset']}"
         )
+        delivered = [position]  # 最后一批已交付的行之后的恢复位置
 
-        try:
-            # 先获取一些历史日志并保存
-            result = self.ssh.execute_command(
-                'tail -n 10 /var/log/suricata/suricata.log | grep "当前流"'
-            )
-            if result["success"] and result["stdout"].strip():
-                self.logger.info("保存历史Suricata日志...")
-                lines = result["stdout"].strip().split("\n")
-                for line in lines:
-                    if line.strip():
-                        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
-                        log_entry = f"[**] [{timestamp}] Suricata(历史): {line}"
-                        self.write_to_file(
-                            self.suricata_log_file,
-                            log_entry,
-                            self.suricata_lock,
-                        )
-
-            # 启动实时监控
-            thread = self.ssh.start_tail_command(
-                'tail -f /var/log/suricata/suricata.log | grep "当前流"',
-                self.suricata_log_callback,
-            )
-            self.threads.append(thread)
-            self.logger.info("✓ Suricata日志收集已启动")
+        def deliver(lines, pos):
+            self.deliver(source, lines, pos)
+            delivered[0] = pos
 
+        try:
+            live = backfill.run(position, deliver)
         except Exception as e:
-            self.logger.error(f"✗ 启动Suricata收集失败: {e}")
-
-    def start_dtrace_collection(self):
-        """启动DTrace日志收集"""
-        self.logger.info("启动DTrace日志收集...")
+            # 实时tail本身也能从该位置继续，只是单通道读取；已交付的块不再重复
+            self.logger.error(
+                f"✗ 补齐{source.label}失败，由实时tail从已补齐的位置继续: {e}"
+            )
+            return delivered[0]
+        stats = backfill.get_stats()
         self.logger.info(
-            "监控命令: /data/su7/dtraceattach -P /data/su7/dtraceattach.bpf.o -B /data/su7/bin/suricata -p 3372788"
+            f"✓ {source.label}补齐完成: {stats['lines']} 行, {stats['bytes']} 字节, "
+            f"{stats['chunks']} 块, {stats['elapsed']} 秒"
         )
+        return live
+
+    @staticmethod
+    def resume_offset(position, mode):
+        """把检查点中的偏移转换为指定含义"""
+        offset = position["offset"]
+        if position["mode"] == mode:
+            return offset
+        # 下次读取的偏移 -> 上一行末尾换行符的位置（tail从该处读取并去重）
+        return offset - 1 if mode == LINE_START else offset
+
+    def start_source(self, source):
+        """启动单个日志源的收集"""
+        config = source.config
+        self.logger.info(f"启动{source.label}日志收集...")
 
         try:
-            command = "cd /data/su7 && /data/su7/dtraceattach -P /data/su7/dtraceattach.bpf.o -B /data/su7/bin/suricata -p 3372788"
-            thread = self.ssh.start_tail_command(command, self.dtrace_callback)
+            if config.type == FILE:
+                self.logger.info(
+                    f"监控文件: {config.path} "
+                    f"(过滤: {self.describe_filter(source.filter)})"
+                )
+                mode = NEXT_BYTE if self.use_agent else LINE_START
+                position = self.checkpoints.get(source.name)
+                if position and position["path"] == config.path:
+                    # 补齐可能很慢，在独立线程中进行：各日志源的补齐并行
+                    # （读取通道受流式额度限制），不推迟其他日志源的实时跟随
+                    thread = threading.Thread(
+                        target=self.resume_file_source,
+                        args=(source, position, mode),
+                        name=f"backfill-{source.name}",
+                        daemon=True,
+                    )
+                    thread.start()
+                    self.threads.append(thread)
+                    self.logger.info(f"✓ {source.label}日志收集已启动，补齐后实时跟随")
+                    return
+                thread = self.start_file_tail(source, mode)
+            else:
+                command = self.resolve_command(config)
+                self.logger.info(
+                    f"监控命令: {command} (过滤: {self.describe_filter(source.filter)})"
+                )
+                if self.use_agent:
+                    thread = self.ssh.start_agent_tail(
+                        source.queue.put_many,
+                        command=command,
+                        log_filter=source.filter,
+                        batch=True,
+                    )
+                else:
+                    thread = self.ssh.start_tail_command(
+                        command,
+                        source.queue.put_many,
+                        batch=True,
+                        log_filter=source.filter,
+                    )
             self.threads.append(thread)
-            self.logger.info("✓ DTrace日志收集已启动")
+            self.logger.info(f"✓ {source.label}日志收集已启动")
+
+        except Exception as e:
+            self.logger.error(f"✗ 启动{source.label}收集失败: {e}")
 
+    def resume_file_source(self, source, position, mode):
+        """从检查点补齐文件源，然后从补齐结束的位置开始实时跟随"""
+        position = self.backfill(source, position, mode)
+        if not self.running:
+            return
+        try:
+            thread = self.start_file_tail(
+                source, mode, self.resume_offset(position, mode), position["inode"]
+            )
+            self.threads.append(thread)
+            self.logger.info(f"✓ {source.label}实时跟随已启动")
         except Exception as e:
-            self.logger.error(f"✗ 启动DTrace收集失败: {e}")
-
-    def rotate_logs_if_needed(self):
-        """如果日志文件过大，进行轮转"""
-        max_size = 100 * 1024 * 1024  # 100MB
-
-        for log_file in [self.suricata_log_file, self.dtrace_log_file]:
-            if log_file.exists() and log_file.stat().st_size > max_size:
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                backup_name = f"{log_file.stem}_{timestamp}.txt"
-                backup_path = log_file.parent / backup_name
-
-                try:
-                    log_file.rename(backup_path)
-                    self.logger.info(f"日志文件已轮转: {log_file} -> {backup_path}")
-                except Exception as e:
-                    self.logger.error(f"日志轮转失败: {e}")
-
-    def start_collection(self, collect_suricata=True, collect_dtrace=True):
-        """启动日志收集"""
+            self.logger.error(f"✗ 启动{source.label}实时跟随失败: {e}")
+
+    def start_file_tail(self, source, mode, offset=None, inode=None):
+        """启动文件源的实时监控，断线重连后从上次的字节偏移继续"""
+        config = source.config
+        if mode == NEXT_BYTE:
+            tail = AgentTail(
+                path=config.path,
+                log_filter=source.filter,
+                offset=offset,
+                inode=inode,
+            )
+        else:
+            tail = FileTail(config.path, source.filter, offset, inode)
+        return self.ssh.start_tail(
+            tail,
+            lambda lines: self.deliver(source, lines, tail.position()),
+            batch=True,
+        )
+
+    def describe_filter(self, log_filter):
+        """过滤规则的可读描述，并说明是否能下推到远程"""
+        if not log_filter:
+            return "无"
+        where = "远程" if log_filter.remote_capable else "本地"
+        return f"{log_filter.describe()} [{where}]"
+
+    def start_collection(self, names=None):
+        """启动日志收集，names为要收集的日志源名称（默认全部）"""
         self.logger.info("=" * 80)
         self.logger.info("实时日志收集系统启动")
         self.logger.info(f"日志保存目录: {self.log_dir.absolute()}")
         self.logger.info("=" * 80)
 
-        # 检查SSH连接
-        if not self.ssh.connected:
-            self.logger.error("✗ SSH连接失败，无法进行日志收集")
+        if not self.start(names):
             return
 
-        self.logger.info("✓ SSH连接正常")
-
-        # 创建日志文件并写入开始标记
-        if collect_suricata:
-            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
-            start_marker = f"[**] [{timestamp}] === Suricata日志收集开始 ==="
-            self.write_to_file(self.suricata_log_file, start_marker, self.suricata_lock)
-            self.start_suricata_collection()
-
-        if collect_dtrace:
-            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
-            start_marker = f"[**] [{timestamp}] === DTrace日志收集开始 ==="
-            self.write_to_file(self.dtrace_log_file, start_marker, self.dtrace_lock)
-            self.start_dtrace_collection()
-
         self.logger.info("\n日志收集已启动，按 Ctrl+C 停止收集")
         self.logger.info("=" * 80)
 
         # 主循环
         try:
-            last_status_time = time.time()
             while self.running:
                 time.sleep(1)
-
-                # 每60秒显示一次状态和检查日志轮转
-                current_time = time.time()
-                if current_time - last_status_time >= 60:
-                    self.logger.info(
-                        f"[状态] Suricata: {self.suricata_count} 行, "
-                        f"DTrace: {self.dtrace_count} 行"
-                    )
-                    self.rotate_logs_if_needed()
-                    last_status_time = current_time
+                self.periodic()
 
         except KeyboardInterrupt:
             self.logger.info("\n收到键盘中断，正在停止...")
             self.stop()
 
+    def start(self, names=None):
+        """检查连接并启动各日志源的收集（不阻塞），连接不可用时返回False"""
+        # 检查SSH连接
+        if not self.ssh.connected:
+            self.logger.error("✗ SSH连接失败，无法进行日志收集")
+            return False
+
+        self.logger.info("✓ SSH连接正常")
+
+        # 每个日志源的tail长期占用一个流式通道，超出上限的日志源无法启动
+        names = list(names or self.sources)
+        capacity = self.ssh.scheduler.capacity(STREAMING)
+        if len(names) > capacity:
+            self.logger.warning(
+                f"✗ 日志源数量 {len(names)} 超过流式通道上限 {capacity}，"
+                f"不启动: {', '.join(names[capacity:])}"
+                "（可在[[hosts]]中调整max_channels/reserved）"
+            )
+            names = names[:capacity]
+
+        # 启动队列消费线程
+        self.drainer.start()
+
+        # 创建日志文件并写入开始标记
+        for name in names:
+            source = self.sources[name]
+            self.write_marker(name, f"=== {source.label}日志收集开始 ===")
+            self.start_source(source)
+
+        self.last_status_time = self.last_checkpoint_time = time.time()
+        return True
+
+    def periodic(self):
+        """主循环中每秒调用：定期保存检查点并输出状态"""
+        current_time = time.time()
+        # 没有新行的日志源也按间隔输出汇总
+        for source in self.sources.values():
+            if source.aggregator is not None:
+                self.emit_summary(source)
+
+        if current_time - self.last_checkpoint_time >= self.checkpoint_interval:
+            self.save_checkpoints()
+            self.last_checkpoint_time = current_time
+
+        # 每60秒显示一次状态
+        if current_time - self.last_status_time >= 60:
+            self.logger.info(
+                "[状态] "
+                + ", ".join(
+                    f"{source.label}: {source.stats.lines} 行"
+                    for source in self.sources.values()
+                )
+            )
+            for stat in self.ssh.get_tail_stats():
+                self.logger.info(
+                    f"[读取] {stat['command'][:40]}: "
+                    f"{stat.get('lines_per_sec', 0)} 行/秒, "
+                    f"{stat.get('bytes_per_sec', 0)} 字节/秒"
+                )
+                if "filter" in stat:
+                    self.logger.info(
+                        f"[过滤] 匹配: {stat['filter']['include']}, "
+                        f"排除: {stat['filter']['excluded']}"
+                    )
+            for name, stat in self.drainer.get_stats().items():
+                self.logger.info(
+                    f"[队列] {name}: 深度 {stat['depth']}/{stat['maxsize']}, "
+                    f"最大 {stat['max_depth']}, 丢弃 {stat['dropped']}, "
+                    f"阻塞 {stat['blocked_time']} 秒"
+                )
+            writer_stats = self.writer.get_stats()
+            if writer_stats["compressor"]:
+                self.logger.info(
+                    f"[分段] 已轮转 {writer_stats['rotations']} 次, "
+                    f"待压缩 {writer_stats['compressor']['pending']}, "
+                    f"压缩比 {writer_stats['compressor']['ratio']}"
+                )
+            self.last_status_time = current_time
+
     def get_log_stats(self):
         """获取日志统计信息"""
-        stats = {
-            "suricata_count": self.suricata_count,
-            "dtrace_count": self.dtrace_count,
-            "suricata_file": str(self.suricata_log_file),
-            "dtrace_file": str(self.dtrace_log_file),
-            "suricata_size": self.suricata_log_file.stat().st_size
-            if self.suricata_log_file.exists()
-            else 0,
-            "dtrace_size": self.dtrace_log_file.stat().st_size
-            if self.dtrace_log_file.exists()
-            else 0,
+        sources = {}
+        for name, source in self.sources.items():
+            stats = source.stats.as_dict()
+            stats["file"] = str(source.log_file)
+            stats["size"] = (
+                source.log_file.stat().st_size if source.log_file.exists() else 0
+            )
+            if source.filter:
+                stats["filter"] = source.filter.get_stats()
+            if source.aggregator is not None:
+                stats["aggregate"] = source.aggregator.get_stats()
+            sources[name] = stats
+
+        return {
+            "output_format": self.output_format,
+            "sources": sources,
+            "queues": self.drainer.get_stats(),
+            "writer": self.writer.get_stats(),
+            "enrich": self.enrich.get_stats(),
+            "multiplexer": self.multiplexer.get_stats() if self.multiplexer else None,
         }
-        return stats
 
 
 def test_connection():
@@ -280,10 +666,10 @@ def test_connection():
 def main():
     """主函数"""
     print("实时日志收集器")
-    print("支持的收集类型:")
-    print("1. Suricata日志收集")
-    print("2. DTrace日志收集")
-    print("3. 同时收集两者")
+    options, sources = load_config()
+    print("配置的日志源:")
+    for i, config in enumerate(sources, 1):
+        print(f"{i}. {config.label} ({config.type}: {config.path or config.command})")
     print()
 
     # 测试连接
@@ -291,23 +677,29 @@ def main():
         print("连接测试失败，退出")
         return
 
-    # 选择收集类型
+    # 选择日志源
     try:
-        choice = input("请选择收集类型 (1/2/3，默认3): ").strip()
-        if not choice:
-            choice = "3"
-
-        collect_suricata = choice in ["1", "3"]
-        collect_dtrace = choice in ["2", "3"]
+        choice = input("请选择要收集的日志源 (编号，逗号分隔，默认全部): ").strip()
+        if choice:
+            names = [sources[int(i) - 1].name for i in choice.split(",")]
+        else:
+            names = None
 
         # 选择日志保存目录
-        log_dir = input("请输入日志保存目录 (默认: logs): ").strip()
-        if not log_dir:
-            log_dir = "logs"
+        log_dir = input(
+            f"请输入日志保存目录 (默认: {options.get('log_dir', 'logs')}): "
+        ).strip()
+        if log_dir:
+            options["log_dir"] = log_dir
+
+        # 选择输出格式
+        output_format = input("请选择输出格式 (text/ndjson，默认按配置): ").strip()
+        if output_format:
+            options["output_format"] = output_format
 
         # 创建收集器并启动
-        collector = LogCollector(log_dir)
-        collector.start_collection(collect_suricata, collect_dtrace)
+        collector = LogCollector(sources=sources, **options)
+        collector.start_collection(names)
 
     except KeyboardInterrupt:
         print("\n用户取消操作")
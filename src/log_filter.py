@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+日志过滤规则
+每个日志源可以配置多个include/exclude正则。规则会尽量下推到远程执行
+(grep -E --line-buffered 或远程代理)，只让需要的行经过网络；
+本地始终再按同一规则过滤一遍并统计各规则的匹配次数，远程无法表达的正则在本地兜底
+"""
+
+import re
+import shlex
+
+# grep -E 不支持的Python正则语法，出现时改为本地过滤
+_PYTHON_ONLY_SYNTAX = re.compile(r"\(\?|\\[dD]|[*+?}]\?")
+
+
+def _split_branches(pattern):
+    """按顶层的|拆分正则（跳过转义、方括号和括号内的|）"""
+    branches = []
+    start = depth = 0
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == "\\":
+            i += 1
+        elif char == "[":
+            # 方括号内的字符按字面处理，]紧跟在[或[^之后时属于字符集
+            i += 2 if pattern[i + 1 : i + 2] == "^" else 1
+            if pattern[i : i + 1] == "]":
+                i += 1
+            while i < len(pattern) and pattern[i] != "]":
+                i += 1
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "|" and depth == 0:
+            branches.append(pattern[start:i])
+            start = i + 1
+        i += 1
+    branches.append(pattern[start:])
+    return branches
+
+
+def _skip_offset_prefix(pattern):
+    """把作用于行内容的正则改写为作用于grep -b输出（偏移:内容）的正则
+
+    每个顶层分支单独处理：以^锚定的分支紧接在偏移前缀之后匹配，其余分支可在内容任意位置匹配，
+    也不会误匹配偏移前缀中的数字；嵌套分组内的^无法改写，远程少排除的行由本地过滤兜底
+    """
+    branches = [
+        branch[1:] if branch.startswith("^") else ".*" + branch
+        for branch in _split_branches(pattern)
+    ]
+    return "^[0-9]+:(" + "|".join(branches) + ")"
+
+
+class FilterSpec:
+    """日志过滤规则 - 命中任一include且不命中任何exclude的行被保留"""
+
+    def __init__(self, include=None, exclude=None):
+        self.include = list(include or [])
+        self.exclude = list(exclude or [])
+        self.include_res = [re.compile(pattern) for pattern in self.include]
+        self.exclude_res = [re.compile(pattern) for pattern in self.exclude]
+
+        # 匹配统计
+        self.counts = {pattern: 0 for pattern in self.include}
+        self.seen = 0
+        self.passed = 0
+        self.excluded = 0
+
+    @classmethod
+    def from_config(cls, value):
+        """从配置构造：None、单个正则、正则列表或 {"include": [...], "exclude": [...]}"""
+        if value is None or isinstance(value, cls):
+            return value
+        if isinstance(value, str):
+            return cls(include=[value])
+        if isinstance(value, (list, tuple)):
+            return cls(include=value)
+        if isinstance(value, dict):
+            return cls(value.get("include"), value.get("exclude"))
+        raise Exception(f"无法识别的过滤配置: {value!r}")
+
+    @property
+    def remote_capable(self):
+        """规则能否下推到远程grep -E执行"""
+        return not any(
+            _PYTHON_ONLY_SYNTAX.search(pattern)
+            for pattern in self.include + self.exclude
+        )
+
+    def grep_pipeline(self, with_offsets=False):
+        """编译为远程grep管道（以" | "开头）；无法下推时返回不过滤的管道
+
+        with_offsets为True时第一段grep带-b输出字节偏移（供文件tail断点恢复），
+        exclude改写为跳过偏移前缀后再匹配
+        """
+        remote = self.remote_capable
+        offsets = " -b" if with_offsets else ""
+        if remote and self.include:
+            patterns = " ".join(f"-e {shlex.quote(p)}" for p in self.include)
+            pipeline = f" | grep --line-buffered{offsets} -E {patterns}"
+        elif with_offsets:
+            pipeline = " | grep --line-buffered -b -E ''"
+        else:
+            pipeline = ""
+
+        if remote and self.exclude:
+            excludes = []
+            for pattern in self.exclude:
+                if with_offsets:
+                    pattern = _skip_offset_prefix(pattern)
+                excludes.append(f"-e {shlex.quote(pattern)}")
+            pipeline += f" | grep --line-buffered -v -E {' '.join(excludes)}"
+        return pipeline
+
+    def agent_args(self):
+        """远程代理的过滤参数（代理使用Python正则，无需本地兜底之外的处理）"""
+        args = []
+        for pattern in self.include:
+            args += ["--pattern", pattern]
+        for pattern in self.exclude:
+            args += ["--exclude", pattern]
+        return args
+
+    def apply(self, lines):
+        """本地过滤一批行，并统计各include规则的匹配次数"""
+        kept = []
+        for line in lines:
+            self.seen += 1
+            if self.include_res:
+                matched = False
+                for pattern, regex in zip(self.include, self.include_res):
+                    if regex.search(line):
+                        self.counts[pattern] += 1
+                        matched = True
+                if not matched:
+                    continue
+            if any(regex.search(line) for regex in self.exclude_res):
+                self.excluded += 1
+                continue
+            self.passed += 1
+            kept.append(line)
+        return kept
+
+    def get_stats(self):
+        return {
+            "include": dict(self.counts),
+            "exclude": list(self.exclude),
+            "remote": self.remote_capable,
+            "seen": self.seen,
+            "passed": self.passed,
+            "excluded": self.excluded,
+        }
+
+    def describe(self):
+        parts = [f"include={self.include}"] if self.include else []
+        if self.exclude:
+            parts.append(f"exclude={self.exclude}")
+        return " ".join(parts) or "全部"
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+日志时间索引
+写入器在每个输出文件旁维护一个稀疏索引（<文件名>.idx），每隔N行或每秒记录一条
+(写入时间毫秒, 字节偏移)，每条16字节。查询时对mmap后的索引二分查找，
+直接定位到时间范围对应的字节区间，无需从头读取整个文件
+"""
+
+import bisect
+import mmap
+import struct
+import time
+from pathlib import Path
+
+from src.log_parser import collected_time
+from src.segments import SegmentManifest
+from src.timestamp import format_timestamp
+
+# 索引条目: 写入时间（毫秒）, 该批第一行的字节偏移
+INDEX_ENTRY = struct.Struct(">QQ")
+
+# 收集时间早于写入时间的最大延迟（队列排队），查询结束位置时额外多读这段时间
+LATENESS = 5.0
+
+
+def index_path(log_path):
+    log_path = Path(log_path)
+    return log_path.with_name(log_path.name + ".idx")
+
+
+class _Column:
+    """把mmap中的索引条目按列暴露为序列，供bisect使用"""
+
+    def __init__(self, data, field):
+        self.data = data
+        self.field = field
+
+    def __len__(self):
+        return len(self.data) // INDEX_ENTRY.size
+
+    def __getitem__(self, i):
+        return INDEX_ENTRY.unpack_from(self.data, i * INDEX_ENTRY.size)[self.field]
+
+
+class LogIndex:
+    """单个日志文件的稀疏时间索引"""
+
+    def __init__(self, log_path):
+        self.log_path = Path(log_path)
+        self.path = index_path(log_path)
+
+    def offsets(self, start=None, end=None):
+        """返回覆盖[start, end]（epoch秒）的字节区间 (起始偏移, 结束偏移或None)"""
+        try:
+            f = open(self.path, "rb")
+        except FileNotFoundError:
+            return 0, None
+        with f:
+            if f.seek(0, 2) < INDEX_ENTRY.size:
+                return 0, None
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                times = _Column(data, 0)
+                begin = 0
+                if start is not None:
+                    # 最后一个早于start的条目：其后写入的行都不早于该条目
+                    i = bisect.bisect_left(times, int(start * 1000)) - 1
+                    if i >= 0:
+                        begin = INDEX_ENTRY.unpack_from(data, i * INDEX_ENTRY.size)[1]
+                finish = None
+                if end is not None:
+                    i = bisect.bisect_right(times, int((end + LATENESS) * 1000))
+                    if i < len(times):
+                        finish = INDEX_ENTRY.unpack_from(data, i * INDEX_ENTRY.size)[1]
+                return begin, finish
+
+    def read_range(self, start=None, end=None):
+        """读取收集时间在[start, end]内的行"""
+        low = format_timestamp(start) if start is not None else None
+        high = format_timestamp(end) if end is not None else None
+        begin, finish = self.offsets(start, end)
+
+        with open(self.log_path, "rb") as f:
+            f.seek(begin)
+            data = f.read() if finish is None else f.read(finish - begin)
+        lines = data.decode("utf-8", errors="replace").split("\n")
+        # 最后一段可能是未写完的行
+        if finish is None and lines:
+            lines.pop()
+        return [line for line in lines if _in_range(line, low, high)]
+
+
+def _in_range(line, low, high):
+    ts = collected_time(line)
+    if ts is None:
+        return False
+    return (low is None or ts >= low) and (high is None or ts <= high)
+
+
+def read_range(log_path, start=None, end=None):
+    """读取时间范围内的行，包括已封存（可能已压缩）的分段
+
+    分段按清单中的时间范围筛选后顺序读取，当前文件使用索引定位
+    """
+    low = format_timestamp(start) if start is not None else None
+    high = format_timestamp(end) if end is not None else None
+
+    lines = []
+    manifest = SegmentManifest(log_path)
+    for segment in manifest.find(low, high):
+        with manifest.open_segment(segment) as f:
+            lines.extend(line.rstrip("\n") for line in f if _in_range(line, low, high))
+    if Path(log_path).exists():
+        lines.extend(LogIndex(log_path).read_range(start, end))
+    return lines
+
+
+def read_last(log_path, seconds):
+    """读取最近seconds秒内收集的行"""
+    now = time.time()
+    return read_range(log_path, now - seconds, now)
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+日志行解析
+在收集时对每行只解析一次（正则均预编译），提取来源、真实时间戳和字段，
+结构化输出模式下以NDJSON写入，下游无需再解析文本
+"""
+
+import json
+import re
+from datetime import datetime
+
+# Suricata旧格式: [pid] 16/10/2026 -- 10:00:00 - (file.c:12) <Info> (Func) -- 消息
+SURICATA_CLASSIC_RE = re.compile(
+    r"^(?:\[(?P<pid>\d+)\]\s+)?"
+    r"(?P<day>\d{2})/(?P<month>\d{2})/(?P<year>\d{4}) -- "
+    r"(?P<time>\d{2}:\d{2}:\d{2})\s+-\s+"
+    r"(?:\((?P<location>[^)]*)\)\s+)?"
+    r"<(?P<level>\w+)>\s+"
+    r"(?:\((?P<function>[^)]*)\)\s+)?"
+    r"-+\s*(?P<message>.*)$"
+)
+
+# Suricata 7格式: [pid - 线程] 2026-10-16 10:00:00 Info: 模块: 消息
+SURICATA_MODERN_RE = re.compile(
+    r"^\[(?P<pid>\d+)(?:\s+-\s+(?P<thread>[^\]]+))?\]\s+"
+    r"(?P<date>\d{4}-\d{2}-\d{2}) (?P<time>\d{2}:\d{2}:\d{2})\s+"
+    r"(?P<level>\w+):\s+(?:(?P<module>[\w-]+):\s+)?(?P<message>.*)$"
+)
+
+# “当前流”消息中的五元组
+FLOW_RE = re.compile(
+    r"(?P<src_ip>[0-9a-fA-F.:]+?):(?P<src_port>\d+)\s*->\s*"
+    r"(?P<dst_ip>[0-9a-fA-F.:]+?):(?P<dst_port>\d+)"
+)
+
+# dtraceattach输出: 可选的[pid]和单调时间戳，随后是探针/函数名与键值对
+DTRACE_RE = re.compile(
+    r"^(?:\[(?P<pid>\d+)\]\s*)?"
+    r"(?:(?P<ktime>\d+\.\d+):?\s+)?"
+    r"(?:(?P<name>[A-Za-z_][\w.:]*?):\s+)?"
+    r"(?P<body>.*)$"
+)
+
+# 收集器文本格式: [**] [2026-10-16 10:00:00.123] 标签: 内容
+COLLECTED_RE = re.compile(r"^\[\*\*\] \[(?P<ts>[^\]]+)\] (?P<rest>.*)$")
+# NDJSON记录中的收集时间（无需完整解析JSON）
+COLLECTED_FIELD_RE = re.compile(r'"collected":"([^"]+)"')
+
+
+def _number(value):
+    """键值对中的数字转为int/float，其余保持字符串"""
+    if value.isdigit():
+        return int(value)
+    if value[0] in "-.0123456789":
+        try:
+            return float(value)
+        except ValueError:
+            pass
+    return value
+
+
+def _fields(text):
+    """提取以空白分隔的key=value字段（按空白切分比逐字符正则扫描更快）"""
+    fields = {}
+    if "=" not in text:
+        return fields
+    for token in text.split():
+        key, sep, value = token.partition("=")
+        value = value.rstrip(",;")
+        if sep and value and key.isidentifier():
+            fields[key] = _number(value)
+    return fields
+
+
+def parse_suricata(line):
+    """解析suricata.log的一行，返回(时间戳, 字段)；时间戳为ISO格式或None"""
+    match = SURICATA_CLASSIC_RE.match(line) or SURICATA_MODERN_RE.match(line)
+    if not match:
+        return None, {"message": line}
+
+    groups = match.groupdict()
+    if groups.get("year"):
+        ts = f"{groups['year']}-{groups['month']}-{groups['day']}T{groups['time']}"
+    else:
+        ts = f"{groups['date']}T{groups['time']}"
+
+    message = groups["message"]
+    fields = {
+        key: value
+        for key, value in groups.items()
+        if value and key not in ("day", "month", "year", "date", "time", "message")
+    }
+    fields["message"] = message
+    if "当前流" in message:
+        fields["event"] = "当前流"
+        flow = FLOW_RE.search(message)
+        if flow:
+            fields.update(flow.groupdict())
+    fields.update(_fields(message))
+    return ts, fields
+
+
+def parse_dtrace(line):
+    """解析dtraceattach输出的一行；输出不含墙钟时间，时间戳为None"""
+    match = DTRACE_RE.match(line)
+    groups = match.groupdict()
+    fields = _fields(groups["body"])
+    name = fields.get("func") or fields.get("probe") or groups["name"]
+    if name:
+        fields["function"] = name
+    if groups["pid"]:
+        fields["pid"] = int(groups["pid"])
+    if groups["ktime"]:
+        fields["ktime"] = float(groups["ktime"])
+    return None, fields
+
+
+PARSERS = {
+    "suricata": parse_suricata,
+    "dtrace": parse_dtrace,
+}
+
+
+def parse_line(source, line, collected, parser=None):
+    """解析一行为结构化记录；collected为收集时间，无法得到真实时间时作为ts
+
+    parser为解析器名称，默认与日志源同名
+    """
+    parser = PARSERS.get(parser or source)
+    ts, fields = parser(line) if parser else (None, {})
+    return {
+        "source": source,
+        "ts": ts or collected.replace(" ", "T"),
+        "collected": collected,
+        "fields": fields,
+        "raw": line,
+    }
+
+
+def to_ndjson(record):
+    return json.dumps(record, ensure_ascii=False, separators=(",", ":"))
+
+
+def read_entry(line, log_type):
+    """读取已收集的一行（NDJSON或文本格式），返回推送给前端的日志条目
+
+    时间戳取记录中的真实时间，文本格式取收集时写入的时间，都没有时使用当前时间
+    """
+    if line.startswith("{"):
+        try:
+            record = json.loads(line)
+            return {
+                "timestamp": record["ts"],
+                "content": record.get("raw", line),
+                "type": log_type,
+                "source": log_type.upper(),
+                "fields": record.get("fields", {}),
+            }
+        except (ValueError, KeyError):
+            pass
+
+    match = COLLECTED_RE.match(line)
+    timestamp = match.group("ts").replace(" ", "T") if match else None
+    return {
+        "timestamp": timestamp or datetime.now().isoformat(),
+        "content": line,
+        "type": log_type,
+        "source": log_type.upper(),
+    }
+
+
+def collected_time(line):
+    """已收集行的收集时间（"YYYY-mm-dd HH:MM:SS.mmm"），无法识别时返回None"""
+    if line.startswith("{"):
+        match = COLLECTED_FIELD_RE.search(line)
+        return match.group(1) if match else None
+    match = COLLECTED_RE.match(line)
+    return match.group("ts") if match else None
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+远程tail状态
+描述一个远程tail任务如何生成命令、如何处理读到的行；
+文件tail会记录inode和字节偏移，断线重连后从上次位置继续，不丢行也不重复
+"""
+
+import shlex
+from pathlib import Path
+
+from src.line_reader import ChannelFrameReader, ChannelLineReader
+from src.log_filter import FilterSpec
+
+# 远程批量tail代理
+AGENT_LOCAL_PATH = Path(__file__).resolve().parent / "tail_agent.py"
+AGENT_REMOTE_PATH = "/tmp/suricata_tail_agent.py"
+
+# 恢复位置中offset的含义
+LINE_START = "line-start"  # 最后交付行的起始偏移（FileTail，恢复时去重）
+NEXT_BYTE = "next-byte"  # 下次读取的字节偏移（AgentTail）
+
+
+class CommandTail:
+    """普通命令tail（如dtraceattach），重连后重新执行命令"""
+
+    use_pty = True  # 伪终端保证通道关闭时远程进程随之退出
+    reader_class = ChannelLineReader
+
+    def __init__(self, command, log_filter=None):
+        self.command = command
+        self.log_filter = FilterSpec.from_config(log_filter)
+        self.name = command
+        self.reader = None  # 当前通道的行读取器
+        self.restarts = 0
+        self.needs_restart = False
+
+    def build_command(self, ssh):
+        """生成本次要执行的远程命令，过滤规则尽量下推为grep管道"""
+        if self.log_filter:
+            return self.command + self.log_filter.grep_pipeline()
+        return self.command
+
+    def process(self, lines):
+        """处理读到的一批行，返回需要交给回调的行"""
+        return self.filter(lines)
+
+    def filter(self, lines):
+        """本地按过滤规则再筛一遍并计数（远程无法执行的规则在此兜底）"""
+        if self.log_filter and lines:
+            return self.log_filter.apply(lines)
+        return lines
+
+    def position(self):
+        """恢复位置，用于保存检查点；命令输出无法恢复，返回None"""
+        return None
+
+    def get_stats(self):
+        stats = {"command": self.name, "restarts": self.restarts}
+        if self.reader:
+            stats.update(self.reader.get_stats())
+        if self.log_filter:
+            stats["filter"] = self.log_filter.get_stats()
+        return stats
+
+
+class FileTail(CommandTail):
+    """远程文件tail - 按字节偏移恢复
+
+    远程命令为 tail -c +N -f 文件 | grep -b，grep输出每行相对起点的字节偏移，
+    由此得到每行在文件中的起始偏移。恢复时从最后一行的起始偏移重新读取，
+    并丢弃起始偏移不大于该值的行
+    """
+
+    def __init__(self, path, log_filter=None, offset=None, inode=None):
+        super().__init__(None, log_filter)
+        self.path = path
+        self.name = f"tail {path}"
+        if self.log_filter:
+            self.name += f" ({self.log_filter.describe()})"
+        self.inode = inode
+        self.offset = offset  # 最后交付行的起始偏移
+        self.base = 0  # 本次tail起点在文件中的偏移
+
+    def build_command(self, ssh):
+        """根据远程文件当前的inode与大小决定起点"""
+        path = shlex.quote(self.path)
+        result = ssh.execute_command(f"stat -c '%i %s' {path}")
+        if not result["success"]:
+            raise Exception(f"获取文件状态失败: {result['stderr'].strip()}")
+        inode, size = (int(value) for value in result["stdout"].split())
+
+        if self.offset is None:
+            # 首次启动：从文件末尾开始跟随；恢复位置随即定在起点，
+            # 读到第一行之前断线也从这里恢复，而不是跳到新的末尾
+            self.base = size
+            self.offset = self.base - 1
+        elif inode != self.inode or size < self.offset:
+            # 文件已轮转或被截断：从新文件开头读取
+            print(f"检测到{self.path}已轮转或截断，从头读取")
+            self.base = 0
+            self.offset = -1
+        else:
+            # 从最后交付行的起点重读，该行在process中被去重
+            # （offset为-1表示从文件开头读取且没有需要去重的行；
+            # 尚未读到行时offset为起点前一字节，重读的只是上一行的换行符）
+            self.base = max(self.offset, 0)
+        self.inode = inode
+        self.needs_restart = False
+
+        if self.log_filter:
+            pipeline = self.log_filter.grep_pipeline(with_offsets=True)
+        else:
+            pipeline = " | grep --line-buffered -b -E ''"
+        return f"tail -c +{self.base + 1} -f {path}{pipeline}"
+
+    def process(self, lines):
+        delivered = []
+        for line in lines:
+            position, sep, content = line.partition(":")
+            if not sep or not position.isdigit():
+                # tail的提示信息（PTY下stderr与stdout合并）
+                if "truncated" in line:
+                    self.needs_restart = True
+                print(f"[{self.path}] {line}")
+                continue
+
+            start = self.base + int(position)
+            if self.offset is not None and start <= self.offset:
+                continue  # 已经交付过的行
+            self.offset = start
+            delivered.append(content)
+        return self.filter(delivered)
+
+    def position(self):
+        """当前恢复位置，用于保存检查点；尚未确定起点时返回None"""
+        if self.offset is None:
+            return None
+        return {
+            "path": self.path,
+            "inode": self.inode,
+            "offset": self.offset,
+            "mode": LINE_START,
+        }
+
+    def get_stats(self):
+        stats = super().get_stats()
+        stats.update({"path": self.path, "inode": self.inode, "offset": self.offset})
+        return stats
+
+
+class AgentTail(CommandTail):
+    """远程代理tail - 在传感器上运行tail_agent.py，按帧接收压缩的批量行
+
+    代理输出二进制帧，不能经过伪终端；代理定期发送心跳帧，
+    通道关闭后写入失败即退出。文件模式下帧携带下次读取的偏移，恢复时无需去重
+    """
+
+    use_pty = False
+    reader_class = ChannelFrameReader
+
+    def __init__(
+        self, path=None, command=None, log_filter=None, offset=None, inode=None
+    ):
+        super().__init__(command, log_filter)
+        if not path and not command:
+            raise Exception("代理tail必须指定文件或命令")
+        self.path = path
+        self.name = f"agent {path or command}"
+        self.offset = offset  # 下次读取的字节偏移
+        self.inode = inode
+
+    def build_command(self, ssh):
+        ssh.upload_agent()
+        args = ["python3", AGENT_REMOTE_PATH]
+        if self.path:
+            args += ["--file", self.path]
+            if self.offset is not None:
+                args += ["--offset", str(self.offset), "--inode", str(self.inode or 0)]
+        else:
+            args += ["--command", self.command]
+        if self.log_filter:
+            args += self.log_filter.agent_args()
+        return " ".join(shlex.quote(arg) for arg in args)
+
+    def process(self, lines):
+        if self.path and self.reader.offset is not None:
+            self.offset = self.reader.offset
+            self.inode = self.reader.inode
+        return self.filter(lines)
+
+    def position(self):
+        """当前恢复位置，用于保存检查点；命令模式或尚未收到偏移时返回None"""
+        if not self.path or self.offset is None:
+            return None
+        return {
+            "path": self.path,
+            "inode": self.inode,
+            "offset": self.offset,
+            "mode": NEXT_BYTE,
+        }
+
+    def get_stats(self):
+        stats = super().get_stats()
+        if self.path:
+            stats.update(
+                {"path": self.path, "inode": self.inode, "offset": self.offset}
+            )
+        return stats
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+日志分段与清单
+输出文件达到大小阈值时由写入器封存为分段，分段在后台线程中gzip压缩，
+每个日志文件旁有一个清单（*.manifest.json）记录各分段的时间范围、行数和大小，
+读取方按清单定位数据，无需扫描目录
+"""
+
+import gzip
+import json
+import os
+import queue
+import shutil
+import threading
+from pathlib import Path
+
+
+class SegmentManifest:
+    """单个日志文件的分段清单，写入时先写临时文件再原子替换"""
+
+    def __init__(self, log_path):
+        self.log_path = Path(log_path)
+        self.path = self.log_path.with_name(f"{self.log_path.stem}.manifest.json")
+        self.lock = threading.Lock()
+
+    def load(self):
+        """读取清单中的分段列表（按封存顺序）"""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)["segments"]
+        except FileNotFoundError:
+            return []
+
+    def _save(self, segments):
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {"log": self.log_path.name, "segments": segments},
+                f,
+                ensure_ascii=False,
+                indent=2,
+            )
+        os.replace(tmp_path, self.path)
+
+    def add(self, segment):
+        with self.lock:
+            segments = self.load()
+            segments.append(segment)
+            self._save(segments)
+
+    def update(self, name, **changes):
+        """更新文件名为name的分段"""
+        with self.lock:
+            segments = self.load()
+            for segment in segments:
+                if segment["file"] == name:
+                    segment.update(changes)
+            self._save(segments)
+
+    def find(self, start=None, end=None):
+        """返回与[start, end]时间范围重叠的分段
+
+        时间为 "YYYY-mm-dd HH:MM:SS.mmm" 字符串，可直接按字典序比较；
+        起始时间未知（续写了已有文件）的分段视为从最早开始
+        """
+        result = []
+        for segment in self.load():
+            if start is not None and segment["end"] and segment["end"] < start:
+                continue
+            if end is not None and segment["start"] and segment["start"] > end:
+                continue
+            result.append(segment)
+        return result
+
+    def open_segment(self, segment):
+        """以文本方式打开分段（自动识别是否已压缩）"""
+        path = self.log_path.parent / segment["file"]
+        if segment.get("compressed"):
+            return gzip.open(path, "rt", encoding="utf-8")
+        return open(path, "r", encoding="utf-8")
+
+
+class SegmentCompressor:
+    """后台压缩线程 - 依次gzip压缩已封存的分段并更新清单"""
+
+    def __init__(self, level=6):
+        self.level = level
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(
+            target=self._run, name="segment-compressor", daemon=True
+        )
+        self.thread.start()
+
+        # 统计
+        self.compressed = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.errors = 0
+
+    def submit(self, manifest, segment_path):
+        self.queue.put((manifest, Path(segment_path)))
+
+    def recover(self, manifest):
+        """重新提交清单中尚未压缩完成的分段（上次退出时被中断）"""
+        for segment in manifest.load():
+            path = manifest.log_path.parent / segment["file"]
+            if not segment.get("compressed") and path.exists():
+                self.submit(manifest, path)
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            self._compress(*item)
+
+    def _compress(self, manifest, path):
+        gz_path = path.with_name(path.name + ".gz")
+        tmp_path = path.with_name(path.name + ".gz.tmp")
+        try:
+            with open(path, "rb") as src:
+                with gzip.open(tmp_path, "wb", compresslevel=self.level) as dst:
+                    shutil.copyfileobj(src, dst, 1024 * 1024)
+            os.replace(tmp_path, gz_path)
+
+            size = path.stat().st_size
+            compressed_size = gz_path.stat().st_size
+            # 先更新清单再删除原文件，读取方始终能找到分段
+            manifest.update(
+                path.name,
+                file=gz_path.name,
+                compressed=True,
+                compressed_bytes=compressed_size,
+            )
+            path.unlink()
+
+            self.compressed += 1
+            self.bytes_in += size
+            self.bytes_out += compressed_size
+        except Exception as e:
+            self.errors += 1
+            print(f"压缩分段 {path} 失败: {e}")
+
+    def close(self, timeout=60):
+        """处理完已提交的分段后停止"""
+        self.queue.put(None)
+        self.thread.join(timeout)
+
+    def get_stats(self):
+        return {
+            "pending": self.queue.qsize(),
+            "compressed": self.compressed,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "ratio": round(self.bytes_in / self.bytes_out, 2) if self.bytes_out else 0,
+            "errors": self.errors,
+        }
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+SFTP会话池
+在同一SSH传输上复用长期存在的SFTP客户端，避免每次读写规则文件都重新打开SFTP子系统；
+空闲的会话仍占用一个通道，由open_sftp/close_sftp在会话的整个生命周期内持有通道额度
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+
+
+class SFTPPool:
+    """SFTP会话池 - 健康检查、出错后惰性重建、限制并发使用"""
+
+    def __init__(
+        self, open_sftp, max_size=2, acquire_timeout=30, ping_after=60, close_sftp=None
+    ):
+        self.open_sftp = open_sftp  # 打开新SFTP客户端的函数
+        self.close_sftp = close_sftp or (lambda sftp: sftp.close())  # 关闭会话的函数
+        self.max_size = max_size
+        self.acquire_timeout = acquire_timeout
+        self.ping_after = ping_after  # 空闲超过该秒数后使用前先ping一次
+
+        self.idle = []  # [(sftp, 归还时间)]
+        self.lock = threading.Lock()
+        self.semaphore = threading.BoundedSemaphore(max_size)
+
+        # 计时统计
+        self.opens = 0
+        self.open_time = 0.0
+        self.reuses = 0
+        self.discards = 0
+        self.operations = 0
+        self.operation_time = 0.0
+
+    def _open(self):
+        """打开一个新的SFTP客户端并计时"""
+        start = time.perf_counter()
+        sftp = self.open_sftp()
+        elapsed = time.perf_counter() - start
+        with self.lock:
+            self.opens += 1
+            self.open_time += elapsed
+        return sftp
+
+    def _is_healthy(self, sftp, idle_since=None):
+        """检查SFTP通道是否可用"""
+        try:
+            channel = sftp.get_channel()
+            if channel is None or channel.closed:
+                return False
+            transport = channel.get_transport()
+            if transport is None or not transport.is_active():
+                return False
+            # 空闲较久的会话做一次往返确认
+            if (
+                idle_since is not None
+                and time.monotonic() - idle_since > self.ping_after
+            ):
+                sftp.normalize(".")
+            return True
+        except Exception:
+            return False
+
+    def _discard(self, sftp):
+        with self.lock:
+            self.discards += 1
+        self._close(sftp)
+
+    def _close(self, sftp):
+        try:
+            self.close_sftp(sftp)
+        except Exception:
+            pass
+
+    def _checkout(self):
+        """取出一个健康的空闲会话，没有则新建"""
+        while True:
+            with self.lock:
+                if not self.idle:
+                    break
+                sftp, idle_since = self.idle.pop()
+            if self._is_healthy(sftp, idle_since):
+                with self.lock:
+                    self.reuses += 1
+                return sftp
+            self._discard(sftp)
+        return self._open()
+
+    def _checkin(self, sftp):
+        with self.lock:
+            self.idle.append((sftp, time.monotonic()))
+
+    def _record(self, start):
+        with self.lock:
+            self.operations += 1
+            self.operation_time += time.perf_counter() - start
+
+    @contextmanager
+    def _slot(self):
+        """限制同时借出的会话数"""
+        if not self.semaphore.acquire(timeout=self.acquire_timeout):
+            raise Exception("SFTP会话池繁忙，获取会话超时")
+        try:
+            yield
+        finally:
+            self.semaphore.release()
+
+    def run(self, func):
+        """在会话上执行func(sftp)；若因陈旧通道失败则用新会话重试一次"""
+        for attempt in range(2):
+            with self._slot():
+                sftp = self._checkout()
+                start = time.perf_counter()
+                try:
+                    result = func(sftp)
+                except Exception:
+                    if self._is_healthy(sftp):
+                        self._checkin(sftp)
+                        raise
+                    self._discard(sftp)
+                    if attempt:
+                        raise
+                    continue
+                finally:
+                    self._record(start)
+                self._checkin(sftp)
+                return result
+
+    def close(self):
+        """关闭所有空闲会话（SSH连接关闭或重建、需要回收通道时调用）"""
+        with self.lock:
+            idle, self.idle = self.idle, []
+        for sftp, _ in idle:
+            self._close(sftp)
+
+    def get_stats(self):
+        """获取会话池计时统计"""
+        with self.lock:
+            avg_open = self.open_time / self.opens if self.opens else 0.0
+            return {
+                "max_size": self.max_size,
+                "idle": len(self.idle),
+                "opens": self.opens,
+                "reuses": self.reuses,
+                "discards": self.discards,
+                "operations": self.operations,
+                "avg_open_ms": round(avg_open * 1000, 2),
+                "avg_operation_ms": round(
+                    self.operation_time / self.operations * 1000, 2
+                )
+                if self.operations
+                else 0.0,
+                # 每次复用省下一次SFTP子系统握手
+                "saved_ms": round(self.reuses * avg_open * 1000, 2),
+            }
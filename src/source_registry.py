@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+日志源注册表
+日志源在TOML配置文件（标准库tomllib解析）中声明，数量不限，每个日志源包含
+采集方式（远程文件或命令）、过滤规则、输出文件和批量参数；
+收集器对所有日志源使用同一套代码路径
+"""
+
+import os
+import time
+import tomllib
+from pathlib import Path
+
+from src.log_filter import FilterSpec
+
+# 默认配置文件，可通过环境变量 LOG_COLLECTOR_CONFIG 指定
+CONFIG_PATH = "collector.toml"
+
+FILE = "file"  # 跟随远程文件（断线后按字节偏移续传）
+COMMAND = "command"  # 运行长期输出的命令（如dtraceattach）
+SOURCE_TYPES = (FILE, COMMAND)
+
+# [collector] 段中允许的收集器参数
+COLLECTOR_OPTIONS = (
+    "log_dir",
+    "use_agent",
+    "queue_size",
+    "overflow",
+    "fsync",
+    "output_format",
+    "max_log_size",
+    "compress",
+    "checkpoint_interval",
+    "backfill_parallel",
+    "tail_engine",
+    "enrich_workers",
+)
+
+# [fleet] 段中允许的多主机参数
+FLEET_OPTIONS = ("parallel", "merge", "lateness")
+
+# 没有配置[[hosts]]时使用的主机
+DEFAULT_HOSTS = [
+    {
+        "name": "sensor",
+        "hostname": "10.168.27.239",
+        "port": 7722,
+        "username": "root",
+        "private_key_path": "box",
+    },
+]
+
+# 没有配置文件时使用的日志源，与collector.toml示例一致
+DEFAULT_SOURCES = [
+    {
+        "name": "suricata",
+        "label": "Suricata",
+        "type": FILE,
+        "path": "/var/log/suricata/suricata.log",
+        "output": "suricata_logs.log",
+        "filter": {"include": ["当前流"]},
+    },
+    {
+        "name": "dtrace",
+        "label": "DTrace",
+        "type": COMMAND,
+        "command": (
+            "cd /data/su7 && /data/su7/dtraceattach -P /data/su7/dtraceattach.bpf.o "
+            "-B /data/su7/bin/suricata -p {pid}"
+        ),
+        "pid_command": "pidof -s suricata",
+        "output": "dtrace_logs.log",
+    },
+]
+
+
+class SourceConfig:
+    """单个日志源的配置"""
+
+    def __init__(
+        self,
+        name,
+        type=FILE,
+        label=None,
+        path=None,
+        command=None,
+        pid=None,
+        pid_command=None,
+        output=None,
+        parser=None,
+        filter=None,
+        batch_size=1000,
+        queue_size=None,
+        overflow=None,
+        aggregate=None,
+    ):
+        if type not in SOURCE_TYPES:
+            raise Exception(f"日志源{name}的类型无效: {type}")
+        if type == FILE and not path:
+            raise Exception(f"日志源{name}缺少path")
+        if type == COMMAND and not command:
+            raise Exception(f"日志源{name}缺少command")
+        if command and "{pid}" in command and not (pid or pid_command):
+            raise Exception(f"日志源{name}的命令需要pid或pid_command")
+
+        self.name = name
+        self.type = type
+        self.label = label or name
+        self.path = path
+        self.command = command
+        self.pid = pid  # 命令中{pid}的固定值
+        self.pid_command = pid_command  # 未指定pid时在远程执行以获取PID
+        self.output = output or f"{name}_logs.log"
+        self.parser = parser or name  # 结构化输出使用的解析器（见log_parser.PARSERS）
+        self.filter = FilterSpec.from_config(filter)
+        self.batch_size = batch_size  # 每次从队列取出处理的最大行数
+        self.queue_size = queue_size  # 未指定时使用收集器的默认值
+        self.overflow = overflow
+        # 流式聚合参数（见aggregator.StreamAggregator），启用后只抽样保留原始行
+        self.aggregate = aggregate
+
+    @classmethod
+    def from_dict(cls, value):
+        value = dict(value)
+        if "name" not in value:
+            raise Exception(f"日志源缺少name: {value!r}")
+        try:
+            return cls(**value)
+        except TypeError as e:
+            raise Exception(f"日志源{value['name']}配置错误: {e}")
+
+
+class HostConfig:
+    """一台传感器主机的SSH连接配置"""
+
+    def __init__(
+        self,
+        name,
+        hostname,
+        port=22,
+        username="root",
+        private_key_path="box",
+        max_channels=10,
+        reserved=None,
+    ):
+        self.name = name  # 同时用作该主机日志目录名
+        self.hostname = hostname
+        self.port = port
+        self.username = username
+        self.private_key_path = private_key_path
+        # 该连接上同时打开的通道数上限（应与服务端MaxSessions一致）和各优先级通道的预留额度；
+        # 每个日志源的tail长期占用一个流式通道，日志源数量不能超过 max_channels - 交互预留
+        self.max_channels = max_channels
+        self.reserved = dict(reserved) if reserved else None
+
+    @classmethod
+    def from_dict(cls, value):
+        value = dict(value)
+        if "name" not in value or "hostname" not in value:
+            raise Exception(f"主机缺少name或hostname: {value!r}")
+        try:
+            return cls(**value)
+        except TypeError as e:
+            raise Exception(f"主机{value['name']}配置错误: {e}")
+
+
+def read_config(path=None):
+    """读取配置文件内容
+
+    未指定路径时依次使用环境变量LOG_COLLECTOR_CONFIG和collector.toml，
+    文件不存在时返回空配置
+    """
+    path = Path(path or os.getenv("LOG_COLLECTOR_CONFIG") or CONFIG_PATH)
+    if not path.exists():
+        return {}
+    with open(path, "rb") as f:
+        return tomllib.load(f)
+
+
+def load_config(path=None):
+    """读取收集器配置，返回 (收集器参数, [SourceConfig])
+
+    配置文件不存在时使用内置的默认日志源
+    """
+    config = read_config(path) or {"sources": DEFAULT_SOURCES}
+
+    options = config.get("collector", {})
+    unknown = set(options) - set(COLLECTOR_OPTIONS)
+    if unknown:
+        raise Exception(f"未知的收集器参数: {', '.join(sorted(unknown))}")
+
+    sources = [SourceConfig.from_dict(value) for value in config.get("sources", [])]
+    names = [source.name for source in sources]
+    if len(set(names)) != len(names):
+        raise Exception("日志源名称重复")
+    return options, sources
+
+
+def load_hosts(path=None):
+    """读取多主机配置，返回 ([fleet]参数, [HostConfig])
+
+    未配置[[hosts]]时只有内置的默认主机
+    """
+    config = read_config(path)
+    options = config.get("fleet", {})
+    unknown = set(options) - set(FLEET_OPTIONS)
+    if unknown:
+        raise Exception(f"未知的多主机参数: {', '.join(sorted(unknown))}")
+
+    hosts = [
+        HostConfig.from_dict(value) for value in config.get("hosts", DEFAULT_HOSTS)
+    ]
+    names = [host.name for host in hosts]
+    if not hosts or len(set(names)) != len(names):
+        raise Exception("主机列表为空或主机名称重复")
+    return options, hosts
+
+
+class SourceStats:
+    """单个日志源的吞吐统计"""
+
+    def __init__(self):
+        self.lines = 0
+        self.bytes = 0
+        self.batches = 0
+        self.started = time.monotonic()
+        self.last_seen = None  # 最近一次收到数据的时间（epoch秒）
+
+    def record(self, lines):
+        self.lines += len(lines)
+        self.bytes += sum(len(line) for line in lines)
+        self.batches += 1
+        self.last_seen = time.time()
+
+    def as_dict(self):
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        return {
+            "lines": self.lines,
+            "bytes": self.bytes,
+            "batches": self.batches,
+            "lines_per_sec": round(self.lines / elapsed, 1),
+            "bytes_per_sec": round(self.bytes / elapsed, 1),
+            "last_seen": self.last_seen,
+        }
@@ -7,13 +7,64 @@ SSH连接管理器 - 用于Web应用
 
 import paramiko
 import os
+import shlex
 import threading
-import socket
+import time
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
 from paramiko import AuthenticationException
 
+from src.channel_scheduler import ChannelScheduler, INTERACTIVE, STREAMING
+from src.remote_tail import (
+    AGENT_LOCAL_PATH,
+    AGENT_REMOTE_PATH,
+    AgentTail,
+    CommandTail,
+    FileTail,
+)
+from src.sftp_pool import SFTPPool
+from src.source_registry import load_hosts
+
+
+class OperationHandle:
+    """异步操作句柄 - 取消时关闭正在使用的通道，使阻塞的工作线程尽快返回"""
+
+    def __init__(self):
+        self.cancelled = False
+        self.channel = None
+
+    def attach(self, channel):
+        self.channel = channel
+        if self.cancelled:
+            channel.close()
+
+    def check(self):
+        if self.cancelled:
+            raise Exception("操作已取消")
+
+    def cancel(self):
+        self.cancelled = True
+        if self.channel is not None:
+            try:
+                self.channel.close()
+            except Exception:
+                pass
+
 
 class SSHManager:
-    def __init__(self, hostname, port, username, private_key_path):
+    def __init__(
+        self,
+        hostname,
+        port,
+        username,
+        private_key_path,
+        max_channels=10,
+        reserved=None,
+        io_workers=4,
+        keepalive_interval=15,
+        reconnect_max_delay=60,
+    ):
         self.hostname = hostname
         self.port = port
         self.username = username
@@ -22,6 +73,37 @@ class SSHManager:
         self.connected = False
         self.lock = threading.Lock()
         self.tail_threads = []  # 存储tail线程
+        self.tails = []  # 存储tail状态，用于吞吐统计和断线恢复
+        self.tail_stop_event = threading.Event()
+        self.agent_lock = threading.Lock()
+        self.agent_transport = None  # 已上传tail代理的传输
+        # 多路复用tail引擎（TailMultiplexer），为None时每个tail使用独立线程
+        self.multiplexer = None
+
+        # 断线重连
+        self.keepalive_interval = keepalive_interval
+        self.reconnect_max_delay = reconnect_max_delay
+        self.key_password = None
+        self.ssh_password = None
+        self.reconnect_lock = threading.Lock()
+        self.closed = threading.Event()
+        self.monitor_thread = None
+
+        # 重连统计
+        self.reconnect_count = 0
+        self.total_downtime = 0.0
+        self.down_since = None
+        self.last_error = None
+        # 复用的SFTP会话，每个会话在整个生命周期内占用一个交互通道额度
+        self.sftp_pool = SFTPPool(self._open_sftp, close_sftp=self._close_sftp)
+        # 共享传输上的通道调度，额度不足时先关闭池中空闲的SFTP会话
+        self.scheduler = ChannelScheduler(
+            max_channels, reserved, reclaim=self.sftp_pool.close
+        )
+        # 异步接口专用的有界线程池，阻塞的SSH操作不占用事件循环
+        self.io_executor = ThreadPoolExecutor(
+            max_workers=io_workers, thread_name_prefix="ssh-io"
+        )
 
     def load_private_key(self, key_password=None):
         """加载私钥文件"""
@@ -58,12 +140,38 @@ class SSHManager:
             raise Exception(f"加载私钥时出错: {e}")
 
     def connect(self, key_password=None, ssh_password=None):
-        """建立SSH连接"""
+        """建立SSH连接，成功后启动连接监控线程"""
+        # 保存认证信息，供断线重连使用
+        self.key_password = key_password
+        self.ssh_password = ssh_password
+        self.closed.clear()
+        self._connect()
+        self._start_monitor()
+        return True
+
+    def is_alive(self):
+        """连接是否可用（传输层仍然活跃）"""
+        client = self.client
+        if not self.connected or client is None:
+            return False
+        transport = client.get_transport()
+        return transport is not None and transport.is_active()
+
+    def _connect(self):
+        """建立SSH连接并开启传输层keepalive"""
+        key_password = self.key_password
+        ssh_password = self.ssh_password
         with self.lock:
             try:
-                if self.connected and self.client:
+                if self.is_alive():
                     return True
 
+                # 关闭失效的旧连接
+                self.connected = False
+                if self.client:
+                    self.client.close()
+                    self.client = None
+
                 # 加载私钥
                 private_key = self.load_private_key(key_password)
 
@@ -79,8 +187,6 @@ class SSHManager:
                         pkey=private_key,
                         timeout=10,
                     )
-                    self.connected = True
-                    return True
                 except AuthenticationException:
                     # 如果私钥认证失败，尝试密码认证
                     if ssh_password:
@@ -91,11 +197,14 @@ class SSHManager:
                             password=ssh_password,
                             timeout=10,
                         )
-                        self.connected = True
-                        return True
                     else:
                         raise Exception("私钥认证失败，且未提供SSH密码")
 
+                # 定期发送keepalive，及时发现断开的传输
+                self.client.get_transport().set_keepalive(self.keepalive_interval)
+                self.connected = True
+                return True
+
             except Exception as e:
                 self.connected = False
                 if self.client:
@@ -103,19 +212,118 @@ class SSHManager:
                     self.client = None
                 raise Exception(f"SSH连接失败: {e}")
 
-    def execute_command(self, command, timeout=30):
+    def _start_monitor(self):
+        """启动连接监控线程，传输断开时主动重连"""
+        if self.monitor_thread and self.monitor_thread.is_alive():
+            return
+
+        def monitor_worker():
+            while not self.closed.wait(self.keepalive_interval):
+                if not self.is_alive():
+                    self.ensure_connected()
+
+        self.monitor_thread = threading.Thread(target=monitor_worker, daemon=True)
+        self.monitor_thread.start()
+
+    def ensure_connected(self, stop_event=None, retry=True):
+        """确保连接可用，断开时按指数退避重连
+
+        连接被关闭或stop_event被设置时返回False；retry为False时只尝试一次，
+        其他线程正在重连或本次连接失败时立即返回False，由调用方安排稍后重试
+        """
+        if self.is_alive():
+            return True
+
+        if not self.reconnect_lock.acquire(blocking=retry):
+            return False
+        try:
+            if self.is_alive():
+                return True
+
+            if self.down_since is None:
+                self.down_since = time.monotonic()
+                print("SSH连接已断开，开始重连...")
+            self.connected = False
+            self.sftp_pool.close()
+
+            delay = 1
+            while not self.closed.is_set():
+                if stop_event is not None and stop_event.is_set():
+                    return False
+                try:
+                    self._connect()
+                    downtime = time.monotonic() - self.down_since
+                    self.reconnect_count += 1
+                    self.total_downtime += downtime
+                    self.down_since = None
+                    print(
+                        f"SSH已重连 (第{self.reconnect_count}次，中断{downtime:.1f}秒)"
+                    )
+                    return True
+                except Exception as e:
+                    self.last_error = str(e)
+                    if not retry:
+                        print(e)
+                        break
+                    print(f"{e}，{delay}秒后重试")
+                    if self.closed.wait(delay):
+                        break
+                    delay = min(delay * 2, self.reconnect_max_delay)
+            return False
+        finally:
+            self.reconnect_lock.release()
+
+    def get_connection_stats(self):
+        """获取连接与重连统计"""
+        downtime = self.total_downtime
+        if self.down_since is not None:
+            downtime += time.monotonic() - self.down_since
+        return {
+            "alive": self.is_alive(),
+            "reconnect_count": self.reconnect_count,
+            "total_downtime": round(downtime, 3),
+            "down": self.down_since is not None,
+            "last_error": self.last_error,
+        }
+
+    def _open_sftp(self):
+        """在当前连接上打开新的SFTP客户端（供会话池使用），占用一个交互通道额度"""
+        if not self.connected or not self.client:
+            raise Exception("SSH未连接")
+        self.scheduler.acquire(INTERACTIVE, timeout=30)
+        try:
+            return self.client.open_sftp()
+        except Exception:
+            self.scheduler.release(INTERACTIVE)
+            raise
+
+    def _close_sftp(self, sftp):
+        """关闭会话池中的SFTP客户端并归还通道额度"""
+        try:
+            sftp.close()
+        finally:
+            self.scheduler.release(INTERACTIVE)
+
+    def execute_command(self, command, timeout=30, lane=INTERACTIVE, handle=None):
         """执行命令并返回结果"""
         if not self.connected or not self.client:
             raise Exception("SSH未连接")
 
         try:
-            stdin, stdout, stderr = self.client.exec_command(command, timeout=timeout)
+            with self.scheduler.lease(lane, timeout=timeout):
+                if handle:
+                    handle.check()
+                stdin, stdout, stderr = self.client.exec_command(
+                    command, timeout=timeout
+                )
+                if handle:
+                    handle.attach(stdout.channel)
 
-            # 等待命令执行完成
-            exit_status = stdout.channel.recv_exit_status()
+                # 等待命令执行完成
+                exit_status = stdout.channel.recv_exit_status()
 
-            output = stdout.read().decode("utf-8", errors="ignore")
-            error = stderr.read().decode("utf-8", errors="ignore")
+                output = stdout.read().decode("utf-8", errors="ignore")
+                error = stderr.read().decode("utf-8", errors="ignore")
 
             return {
                 "exit_status": exit_status,
@@ -126,110 +334,273 @@ class SSHManager:
         except Exception as e:
             raise Exception(f"执行命令失败: {e}")
 
-    def read_file(self, file_path):
+    def read_bytes(self, file_path, offset, length, lane=STREAMING):
+        """读取远程文件[offset, offset+length)的原始字节，每次调用使用独立的通道
+
+        用于补齐大段数据，多个调用可以并行执行
+        """
+        path = shlex.quote(file_path)
+        command = f"tail -c +{offset + 1} {path} | head -c {length}"
+        with self.scheduler.lease(lane, timeout=60):
+            stdin, stdout, stderr = self.client.exec_command(command, timeout=60)
+            data = stdout.read()
+            if stdout.channel.recv_exit_status() != 0:
+                error = stderr.read().decode("utf-8", errors="ignore").strip()
+                raise Exception(f"读取{file_path}失败: {error}")
+        return data
+
+    def read_file(self, file_path, handle=None):
         """读取远程文件内容"""
-        try:
-            sftp = self.client.open_sftp()
+
+        def read(sftp):
+            if handle:
+                handle.check()
             with sftp.file(file_path, "r") as f:
-                content = f.read().decode("utf-8", errors="ignore")
-            sftp.close()
-            return content
+                return f.read().decode("utf-8", errors="ignore")
+
+        try:
+            return self.sftp_pool.run(read)
         except Exception as e:
             raise Exception(f"读取文件失败: {e}")
 
-    def write_file(self, file_path, content):
+    def write_file(self, file_path, content, handle=None):
         """写入远程文件"""
-        try:
-            sftp = self.client.open_sftp()
+
+        def write(sftp):
+            if handle:
+                handle.check()
             with sftp.file(file_path, "w") as f:
                 f.write(content.encode("utf-8"))
-            sftp.close()
             return True
+
+        try:
+            return self.sftp_pool.run(write)
         except Exception as e:
             raise Exception(f"写入文件失败: {e}")
 
-    def start_tail_command(self, command, callback):
-        """启动tail命令并持续读取输出"""
+    async def _run_async(self, func, *args, timeout=None):
+        """在专用线程池中执行阻塞操作，支持超时与取消"""
+        handle = OperationHandle()
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(
+            self.io_executor, functools.partial(func, *args, handle=handle)
+        )
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            handle.cancel()
+            raise Exception(f"SSH操作超时 ({timeout}秒)")
+        except asyncio.CancelledError:
+            handle.cancel()
+            raise
+
+    async def aexecute_command(self, command, timeout=30, lane=INTERACTIVE):
+        """异步执行命令"""
+        return await self._run_async(
+            self.execute_command, command, timeout, lane, timeout=timeout
+        )
 
-        def tail_worker():
-            try:
-                # 使用get_pty=True来获得伪终端，这对于tail -f很重要
-                stdin, stdout, stderr = self.client.exec_command(command, get_pty=True)
-
-                # 设置非阻塞模式
-                stdout.channel.settimeout(1.0)
-
-                while True:
-                    try:
-                        # 逐字符读取，直到遇到换行符
-                        line = ""
-                        while True:
-                            char = stdout.read(1)
-                            if not char:
-                                break
-                            char = char.decode("utf-8", errors="ignore")
-                            if char == "\n":
-                                if line.strip():  # 只处理非空行
-                                    callback(line.strip())
-                                line = ""
-                                break
-                            else:
-                                line += char
-
-                    except socket.timeout:
-                        # 超时是正常的，继续循环
-                        continue
-                    except Exception as e:
-                        callback(f"读取错误: {e}")
-                        break
+    async def aread_file(self, file_path, timeout=30):
+        """异步读取远程文件"""
+        return await self._run_async(self.read_file, file_path, timeout=timeout)
 
-            except Exception as e:
-                callback(f"命令执行错误: {e}")
+    async def awrite_file(self, file_path, content, timeout=30):
+        """异步写入远程文件"""
+        return await self._run_async(
+            self.write_file, file_path, content, timeout=timeout
+        )
+
+    def get_sftp_stats(self):
+        """获取SFTP会话池的计时统计"""
+        return self.sftp_pool.get_stats()
+
+    def get_scheduler_stats(self):
+        """获取通道调度的排队统计"""
+        return self.scheduler.get_stats()
+
+    def start_tail_command(self, command, callback, batch=False, log_filter=None):
+        """启动tail命令并持续读取输出，断线重连后自动重新执行
+
+        batch为True时回调接收一批行（列表），否则逐行回调；
+        log_filter为过滤规则（正则、正则列表、include/exclude字典或FilterSpec）
+        """
+        tail = CommandTail(command, log_filter)
+        return self.start_tail(tail, callback, batch)
+
+    def start_file_tail(
+        self, path, callback, log_filter=None, batch=False, offset=None, inode=None
+    ):
+        """跟随远程文件，断线重连后从最后读到的字节偏移继续
+
+        过滤规则下推为远程grep，只传输匹配的行；offset/inode用于从已知位置恢复
+        """
+        tail = FileTail(path, log_filter, offset, inode)
+        return self.start_tail(tail, callback, batch)
+
+    def start_agent_tail(
+        self,
+        callback,
+        path=None,
+        command=None,
+        log_filter=None,
+        batch=False,
+        offset=None,
+        inode=None,
+    ):
+        """通过远程代理跟随文件或命令输出，批量压缩传输
+
+        需要传感器上有python3；文件模式下断线后从代理报告的偏移继续
+        """
+        tail = AgentTail(path, command, log_filter, offset, inode)
+        return self.start_tail(tail, callback, batch)
+
+    def upload_agent(self):
+        """通过SFTP上传远程tail代理（每个连接只上传一次）"""
+        with self.agent_lock:
+            transport = self.client.get_transport()
+            if self.agent_transport is transport:
+                return
+            source = AGENT_LOCAL_PATH.read_text(encoding="utf-8")
+            self.write_file(AGENT_REMOTE_PATH, source)
+            self.agent_transport = transport
+
+    def start_tail(self, tail, callback, batch=False):
+        """在后台线程中运行tail任务（CommandTail/FileTail/AgentTail），断线后自动恢复
+
+        设置了多路复用引擎时交给引擎的事件循环读取，返回引擎线程
+        """
+        stop_event = self.tail_stop_event
+
+        def deliver(lines):
+            if batch:
+                callback(lines)
+            else:
+                for line in lines:
+                    callback(line)
+
+        if self.multiplexer is not None:
+            self.tails.append(tail)
+            return self.multiplexer.add(self, tail, deliver)
+
+        def tail_worker():
+            while not stop_event.is_set():
+                if not self.ensure_connected(stop_event):
+                    break
+                started = time.monotonic()
+                try:
+                    command = tail.build_command(self)
+                    # tail通道长期占用一个流式额度；额度用满时等待超时后报错并稍后重试
+                    with self.scheduler.lease(STREAMING, timeout=30):
+                        # 文本tail使用伪终端，这对于tail -f很重要
+                        stdin, stdout, stderr = self.client.exec_command(
+                            command, get_pty=tail.use_pty
+                        )
+                        try:
+                            # 设置非阻塞模式
+                            stdout.channel.settimeout(1.0)
+
+                            # 按块读取，避免逐字符读取
+                            tail.reader = tail.reader_class(stdout.channel)
+                            for lines in tail.reader.iter_batches(stop_event):
+                                lines = tail.process(lines)
+                                if lines:
+                                    deliver(lines)
+                                if tail.needs_restart:
+                                    break
+                        finally:
+                            # 出错时也关闭通道（结束远程进程），与归还的额度保持一致
+                            stdout.channel.close()
+                except Exception as e:
+                    print(f"[{tail.name}] 读取错误: {e}")
+
+                if stop_event.is_set() or self.closed.is_set():
+                    break
+                # 通道结束：检查连接后恢复；命令很快退出时稍等片刻，避免空转
+                tail.restarts += 1
+                if time.monotonic() - started < 5:
+                    stop_event.wait(5)
 
         thread = threading.Thread(target=tail_worker)
         thread.daemon = True
         thread.start()
         self.tail_threads.append(thread)  # 添加到线程列表
+        self.tails.append(tail)
         return thread
 
+    def get_tail_stats(self):
+        """获取各tail命令的读取吞吐统计（行/秒、字节/秒）与恢复位置"""
+        return [tail.get_stats() for tail in self.tails]
+
     def stop_tail_command(self):
         """停止所有tail命令"""
+        self.tail_stop_event.set()
+        self.tail_stop_event = threading.Event()
+        if self.multiplexer is not None:
+            self.multiplexer.discard(self)
+        self.agent_lock = threading.Lock()
+        self.agent_transport = None  # 已上传tail代理的传输
         # 清理线程列表，移除已结束的线程
         self.tail_threads = [t for t in self.tail_threads if t.is_alive()]
 
     def close(self):
         """关闭SSH连接"""
+        self.closed.set()
+        self.tail_stop_event.set()
+        if self.multiplexer is not None:
+            self.multiplexer.discard(self)
         with self.lock:
             self.connected = False
+            self.sftp_pool.close()
             if self.client:
                 self.client.close()
                 self.client = None
             # 清理tail线程
             self.tail_threads = []
-
-
-# 全局SSH管理器实例
-ssh_manager = None
-
-
-def get_ssh_manager():
-    """获取SSH管理器实例"""
-    global ssh_manager
-    if ssh_manager is None:
-        # 使用与ssh_simulator.py相同的连接参数
-        ssh_manager = SSHManager(
-            hostname="10.168.27.239",
-            port=7722,
-            username="root",
-            private_key_path="box",
+            self.tails = []
+
+
+# 每台主机一个SSH管理器（一个连接），按主机名索引
+ssh_managers = {}
+ssh_managers_lock = threading.Lock()
+host_locks = {}  # 每台主机一把锁，创建并连接管理器期间持有
+
+
+def get_ssh_manager(host=None):
+    """获取主机的SSH管理器实例，首次获取时连接
+
+    host为HostConfig，未指定时使用配置中的第一台主机（未配置时为默认主机）；
+    管理器在主机锁内创建并完成首次连接后才放入缓存，并发获取同一主机时
+    等待连接结束，不会拿到尚未连接的实例；不同主机的连接可以在多个线程中并行建立
+    """
+    if host is None:
+        host = load_hosts()[1][0]
+
+    with ssh_managers_lock:
+        ssh = ssh_managers.get(host.name)
+        if ssh is not None:
+            return ssh
+        host_lock = host_locks.setdefault(host.name, threading.Lock())
+
+    # 连接时只持有该主机的锁，其他主机的连接不受影响
+    with host_lock:
+        ssh = ssh_managers.get(host.name)
+        if ssh is not None:
+            return ssh
+        ssh = SSHManager(
+            hostname=host.hostname,
+            port=host.port,
+            username=host.username,
+            private_key_path=host.private_key_path,
+            max_channels=host.max_channels,
+            reserved=host.reserved,
         )
-
-        # 尝试连接
         try:
             key_password = os.getenv("KEY_PASSWORD")
             ssh_password = os.getenv("SSH_PASSWORD")
-            ssh_manager.connect(key_password, ssh_password)
+            ssh.connect(key_password, ssh_password)
         except Exception as e:
-            print(f"SSH连接失败: {e}")
+            print(f"SSH连接失败 ({host.name}): {e}")
+        with ssh_managers_lock:
+            ssh_managers[host.name] = ssh
 
-    return ssh_manager
+    return ssh
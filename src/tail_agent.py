@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+远程批量tail代理
+通过SFTP上传到传感器执行，仅依赖标准库。
+跟随文件或命令输出，将多行打包为带长度前缀、zlib压缩的帧写到标准输出：
+
+    帧头 (struct ">IIQQ"): 压缩数据长度, 行数, 下次读取的字节偏移, 文件inode
+    帧体: zlib.compress(b"\\n".join(lines))
+
+行数为0的帧为心跳帧，用于携带最新偏移并及时发现通道关闭
+"""
+
+import argparse
+import os
+import re
+import select
+import struct
+import subprocess
+import sys
+import time
+import zlib
+
+FRAME_HEADER = struct.Struct(">IIQQ")
+
+
+def encode_frame(lines, offset=0, inode=0, level=6):
+    """将一批行(bytes)编码为一帧"""
+    payload = zlib.compress(b"\n".join(lines), level) if lines else b""
+    return FRAME_HEADER.pack(len(payload), len(lines), offset, inode) + payload
+
+
+class Batcher:
+    """按行数或等待时间打包输出"""
+
+    def __init__(self, out, max_lines, max_delay, heartbeat, level):
+        self.out = out
+        self.max_lines = max_lines
+        self.max_delay = max_delay
+        self.heartbeat = heartbeat
+        self.level = level
+        self.pending = []
+        self.first_pending = None
+        self.last_write = time.time()
+
+    def add(self, line):
+        if not self.pending:
+            self.first_pending = time.time()
+        self.pending.append(line)
+
+    def maybe_flush(self, offset=0, inode=0):
+        now = time.time()
+        if self.pending:
+            if (
+                len(self.pending) >= self.max_lines
+                or now - self.first_pending >= self.max_delay
+            ):
+                self.flush(offset, inode)
+        elif now - self.last_write >= self.heartbeat:
+            self.flush(offset, inode)
+
+    def flush(self, offset=0, inode=0):
+        self.out.write(encode_frame(self.pending, offset, inode, self.level))
+        self.out.flush()
+        self.pending = []
+        self.last_write = time.time()
+
+
+def make_matcher(patterns, excludes=()):
+    """多个正则任一匹配且不命中exclude即为匹配；都未指定时返回None（全部匹配）"""
+    if not patterns and not excludes:
+        return None
+
+    def compile_any(items):
+        return re.compile(
+            b"|".join(b"(?:" + item.encode("utf-8") + b")" for item in items)
+        )
+
+    include = compile_any(patterns) if patterns else None
+    exclude = compile_any(excludes) if excludes else None
+
+    def matcher(line):
+        if include is not None and not include.search(line):
+            return False
+        return exclude is None or not exclude.search(line)
+
+    return matcher
+
+
+def follow_file(args, batcher, matcher):
+    """跟随文件，按字节偏移读取，轮转或截断时从新文件开头读取"""
+    f = open(args.file, "rb")
+    inode = os.fstat(f.fileno()).st_ino
+    size = os.fstat(f.fileno()).st_size
+    if args.offset is None:
+        offset = size
+    elif (args.inode and args.inode != inode) or args.offset > size:
+        offset = 0
+    else:
+        offset = args.offset
+    f.seek(offset)
+
+    buf = b""
+    while True:
+        chunk = f.read(65536)
+        if chunk:
+            buf += chunk
+            end = buf.rfind(b"\n")
+            if end >= 0:
+                complete, buf = buf[: end + 1], buf[end + 1 :]
+                for line in complete.split(b"\n")[:-1]:
+                    # 每行结束后的偏移，保证帧内偏移不超过已发送的行
+                    offset += len(line) + 1
+                    line = line.rstrip(b"\r")
+                    if line and (matcher is None or matcher(line)):
+                        batcher.add(line)
+                        if len(batcher.pending) >= batcher.max_lines:
+                            batcher.flush(offset, inode)
+            batcher.maybe_flush(offset, inode)
+            continue
+
+        batcher.maybe_flush(offset, inode)
+        try:
+            st = os.stat(args.file)
+        except OSError:
+            st = None
+        rotated = st is not None and (
+            st.st_ino != inode or st.st_size < offset + len(buf)
+        )
+        if rotated:
+            # 文件轮转或截断
+            f.close()
+            f = open(args.file, "rb")
+            inode = os.fstat(f.fileno()).st_ino
+            offset = 0
+            buf = b""
+            continue
+        time.sleep(args.poll)
+
+
+def follow_command(args, batcher, matcher):
+    """执行命令并跟随其输出"""
+    proc = subprocess.Popen(
+        args.command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT
+    )
+    fd = proc.stdout.fileno()
+    buf = b""
+    while True:
+        ready, _, _ = select.select([fd], [], [], args.poll)
+        if ready:
+            chunk = os.read(fd, 65536)
+            if not chunk:
+                break
+            buf += chunk
+            end = buf.rfind(b"\n")
+            if end >= 0:
+                complete, buf = buf[: end + 1], buf[end + 1 :]
+                for line in complete.split(b"\n")[:-1]:
+                    line = line.rstrip(b"\r")
+                    if line and (matcher is None or matcher(line)):
+                        batcher.add(line)
+                        if len(batcher.pending) >= batcher.max_lines:
+                            batcher.flush()
+        batcher.maybe_flush()
+
+    if buf.strip():
+        batcher.add(buf.strip())
+    if batcher.pending:
+        batcher.flush()
+    proc.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="批量tail代理")
+    parser.add_argument("--file")
+    parser.add_argument("--command")
+    parser.add_argument("--pattern", action="append", default=[])
+    parser.add_argument("--exclude", action="append", default=[])
+    parser.add_argument("--offset", type=int)
+    parser.add_argument("--inode", type=int, default=0)
+    parser.add_argument("--max-lines", type=int, default=500)
+    parser.add_argument("--max-delay", type=float, default=0.2)
+    parser.add_argument("--heartbeat", type=float, default=5.0)
+    parser.add_argument("--poll", type=float, default=0.1)
+    parser.add_argument("--level", type=int, default=6)
+    args = parser.parse_args()
+
+    out = getattr(sys.stdout, "buffer", sys.stdout)
+    batcher = Batcher(out, args.max_lines, args.max_delay, args.heartbeat, args.level)
+    matcher = make_matcher(args.pattern, args.exclude)
+
+    try:
+        if args.file:
+            follow_file(args, batcher, matcher)
+        elif args.command:
+            follow_command(args, batcher, matcher)
+        else:
+            parser.error("必须指定 --file 或 --command")
+    except (BrokenPipeError, KeyboardInterrupt):
+        # 通道已关闭，退出
+        pass
+
+
+if __name__ == "__main__":
+    main()
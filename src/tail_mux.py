@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多路复用tail引擎
+所有tail通道的fileno()注册到同一个selectors事件循环，由一个线程读取全部日志源；
+空闲时线程阻塞在select上不产生唤醒，日志源和主机数量增加时CPU占用基本不变。
+打开通道（检查连接、stat、exec_command）是阻塞操作，放在少量后台线程中完成，
+打开后交给事件循环；通道结束后按与线程引擎相同的规则恢复。
+后台线程每次只尝试打开一次：主机不可达或流式额度用满时不占着线程等待，
+而是按指数退避在事件循环的定时器中重新排队，其他主机的tail不受影响
+"""
+
+import heapq
+import itertools
+import selectors
+import socket
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from src.channel_scheduler import STREAMING
+
+
+class MuxEntry:
+    """事件循环中的一个tail任务"""
+
+    def __init__(self, ssh, tail, deliver):
+        self.ssh = ssh
+        self.tail = tail
+        self.deliver = deliver
+        self.channel = None
+        self.started = None  # 当前通道的打开时间
+        self.retry_delay = 0  # 打开失败后的重试间隔，打开成功后清零
+        self.stop_event = threading.Event()
+
+
+class TailMultiplexer:
+    """单线程多路复用tail引擎，可同时服务多台主机的SSHManager
+
+    回调在事件循环线程中执行，不应长时间阻塞；队列溢出策略为block时，
+    队列满会暂停所有日志源的读取（背压传递到各SSH通道的窗口）
+    """
+
+    def __init__(
+        self,
+        chunk_size=64 * 1024,
+        open_workers=2,
+        restart_delay=5,
+        max_retry_delay=60,
+        acquire_timeout=5,
+    ):
+        self.chunk_size = chunk_size  # 每次唤醒每个通道最多读取的字节数
+        self.restart_delay = restart_delay
+        self.max_retry_delay = max_retry_delay
+        self.acquire_timeout = acquire_timeout  # 等待流式额度的上限，超时后重新排队
+        self.selector = selectors.DefaultSelector()
+        # 其他线程通过该socket对唤醒事件循环
+        self.wake_r, self.wake_w = socket.socketpair()
+        self.wake_r.setblocking(False)
+        self.wake_w.setblocking(False)
+        self.selector.register(self.wake_r, selectors.EVENT_READ)
+
+        self.calls = deque()  # 需要在事件循环线程中执行的操作
+        self.timers = []  # (到期时间, 序号, entry) 延迟重启
+        self.counter = itertools.count()
+        self.entries = []
+        self.running = False
+        self.thread = None
+        self.opener = ThreadPoolExecutor(
+            max_workers=open_workers, thread_name_prefix="tail-open"
+        )
+
+        # 统计
+        self.wakeups = 0
+        self.reads = 0
+        self.opened = 0
+        self.open_retries = 0  # 打开失败后重新排队的次数
+
+    def start(self):
+        if self.thread and self.thread.is_alive():
+            return self.thread
+        self.running = True
+        self.thread = threading.Thread(target=self._loop, name="tail-mux", daemon=True)
+        self.thread.start()
+        return self.thread
+
+    def add(self, ssh, tail, deliver):
+        """添加一个tail任务（CommandTail/FileTail/AgentTail），返回事件循环线程"""
+        entry = MuxEntry(ssh, tail, deliver)
+        self.entries.append(entry)
+        thread = self.start()
+        self.opener.submit(self._open, entry)
+        return thread
+
+    def discard(self, ssh):
+        """停止某个SSHManager的所有tail任务"""
+        entries = [entry for entry in self.entries if entry.ssh is ssh]
+        for entry in entries:
+            entry.stop_event.set()
+        self.entries = [entry for entry in self.entries if entry.ssh is not ssh]
+        self._call(lambda: [self._close(entry) for entry in entries])
+
+    def stop(self):
+        """停止事件循环并关闭所有通道"""
+        for entry in self.entries:
+            entry.stop_event.set()
+        self.running = False
+        self._wake()
+        if self.thread:
+            self.thread.join(timeout=3)
+        self.opener.shutdown(wait=False, cancel_futures=True)
+
+    def _call(self, func):
+        self.calls.append(func)
+        self._wake()
+
+    def _wake(self):
+        try:
+            self.wake_w.send(b"\0")
+        except (BlockingIOError, OSError):
+            pass  # 缓冲区已满说明事件循环尚未处理之前的唤醒
+
+    def _open(self, entry):
+        """在后台线程中尝试打开一次通道，成功后交给事件循环，失败时稍后重新排队"""
+        ssh, tail = entry.ssh, entry.tail
+        if entry.stop_event.is_set() or not self.running or ssh.closed.is_set():
+            return
+        if not ssh.ensure_connected(entry.stop_event, retry=False):
+            self._retry(entry)
+            return
+        try:
+            command = tail.build_command(ssh)
+            # tail通道长期占用一个流式额度，通道关闭时归还
+            ssh.scheduler.acquire(STREAMING, timeout=self.acquire_timeout)
+            try:
+                # 文本tail使用伪终端，这对于tail -f很重要
+                stdin, stdout, stderr = ssh.client.exec_command(
+                    command, get_pty=tail.use_pty
+                )
+            except Exception:
+                ssh.scheduler.release(STREAMING)
+                raise
+        except Exception as e:
+            print(f"[{tail.name}] 读取错误: {e}")
+            tail.restarts += 1
+            self._retry(entry)
+            return
+
+        channel = stdout.channel
+        channel.setblocking(False)
+        tail.reader = tail.reader_class(channel)
+        entry.channel = channel
+        entry.started = time.monotonic()
+        entry.retry_delay = 0
+        self._call(lambda: self._register(entry))
+
+    def _retry(self, entry):
+        """打开失败：按指数退避重新排队（可在任意线程调用）"""
+        entry.retry_delay = min(
+            entry.retry_delay * 2 or self.restart_delay, self.max_retry_delay
+        )
+        self.open_retries += 1
+        delay = entry.retry_delay
+        self._call(lambda: self._schedule(entry, delay))
+
+    def _schedule(self, entry, delay):
+        """delay秒后重新打开entry的通道（在事件循环线程中调用）"""
+        heapq.heappush(
+            self.timers, (time.monotonic() + delay, next(self.counter), entry)
+        )
+
+    def _register(self, entry):
+        if entry.stop_event.is_set() or not self.running:
+            self._close(entry)
+            return
+        self.opened += 1
+        self.selector.register(entry.channel.fileno(), selectors.EVENT_READ, entry)
+
+    def _close(self, entry, restart=False):
+        """关闭entry的通道；restart为True时按线程引擎的规则安排重新打开"""
+        channel = entry.channel
+        if channel is None:
+            return
+        entry.channel = None
+        try:
+            self.selector.unregister(channel.fileno())
+        except (KeyError, ValueError):
+            pass
+        try:
+            channel.close()
+        except Exception:
+            pass
+        entry.ssh.scheduler.release(STREAMING)
+
+        if not restart or entry.stop_event.is_set() or entry.ssh.closed.is_set():
+            return
+        entry.tail.restarts += 1
+        # 命令很快退出时稍等片刻，避免空转
+        delay = self.restart_delay if time.monotonic() - entry.started < 5 else 0
+        self._schedule(entry, delay)
+
+    def _read(self, entry):
+        """读取一个就绪通道，每次唤醒最多读取chunk_size字节，保证各通道公平"""
+        tail = entry.tail
+        try:
+            data = entry.channel.recv(self.chunk_size)
+        except socket.timeout:
+            return  # 非阻塞通道上暂时没有数据
+        except Exception as e:
+            print(f"[{tail.name}] 读取错误: {e}")
+            self._close(entry, restart=True)
+            return
+
+        self.reads += 1
+        try:
+            batches = tail.reader.feed(data) if data else tail.reader.finish()
+            for lines in batches:
+                lines = tail.process(lines)
+                if lines:
+                    entry.deliver(lines)
+                if tail.needs_restart:
+                    break
+        except Exception as e:
+            print(f"[{tail.name}] 处理错误: {e}")
+            self._close(entry, restart=True)
+            return
+
+        if not data or tail.needs_restart:
+            self._close(entry, restart=True)
+
+    def _loop(self):
+        while self.running:
+            timeout = None
+            if self.timers:
+                timeout = max(self.timers[0][0] - time.monotonic(), 0)
+            events = self.selector.select(timeout)
+            self.wakeups += 1
+
+            for key, _ in events:
+                if key.fileobj is self.wake_r:
+                    try:
+                        while self.wake_r.recv(4096):
+                            pass
+                    except BlockingIOError:
+                        pass
+                elif key.data.channel is not None:
+                    self._read(key.data)
+
+            while self.calls:
+                self.calls.popleft()()
+
+            now = time.monotonic()
+            while self.timers and self.timers[0][0] <= now:
+                entry = heapq.heappop(self.timers)[2]
+                if not entry.stop_event.is_set():
+                    self.opener.submit(self._open, entry)
+
+        for entry in self.entries:
+            self._close(entry)
+        while self.calls:
+            self.calls.popleft()()
+        self.selector.close()
+        self.wake_r.close()
+        self.wake_w.close()
+
+    def get_stats(self):
+        """事件循环统计：唤醒次数、读取次数与当前注册的通道数"""
+        registered = self.selector.get_map()  # 关闭后为None
+        return {
+            "tails": len(self.entries),
+            "channels": len(registered) - 1 if registered else 0,
+            "opened": self.opened,
+            "open_retries": self.open_retries,
+            "wakeups": self.wakeups,
+            "reads": self.reads,
+            "pending_restarts": len(self.timers),
+        }
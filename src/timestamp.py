@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+时间戳格式化
+日志条目时间戳格式为 "%Y-%m-%d %H:%M:%S.mmm"。同一秒内的前缀只格式化一次，
+之后只重新生成毫秒部分，避免每行调用datetime.now().strftime()
+"""
+
+import time
+
+
+class TimestampFormatter:
+    """缓存秒级前缀的时间戳格式化器（线程安全）"""
+
+    def __init__(self):
+        # (秒, 已格式化的秒级前缀)，整体替换以保证多线程下一致
+        self.cache = (None, "")
+        self.renders = 0  # 秒级前缀实际格式化的次数
+
+    def format(self, now=None):
+        """返回本地时间的 "YYYY-mm-dd HH:MM:SS.mmm" 字符串"""
+        if now is None:
+            now = time.time()
+        second = int(now)
+        cached_second, prefix = self.cache
+        if second != cached_second:
+            prefix = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(second))
+            self.cache = (second, prefix)
+            self.renders += 1
+        return f"{prefix}.{int((now - second) * 1000):03d}"
+
+
+# 收集器共享的格式化器
+timestamps = TimestampFormatter()
+
+
+def format_timestamp(now=None):
+    """使用共享格式化器生成时间戳"""
+    return timestamps.format(now)